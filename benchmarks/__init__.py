@@ -0,0 +1,10 @@
+"""Reproducible performance benchmarks for crispr_check.
+
+`synth` writes seeded synthetic genomes with planted off-targets, `run`
+times the scanner, every registered scorer and the CLI on them and writes
+the results as JSON, and `compare` fails when a result regresses past a
+stored baseline. Run from the repository root::
+
+    python -m benchmarks.run --sizes 1M,10M --out bench.json
+    python -m benchmarks.compare baseline.json bench.json
+"""
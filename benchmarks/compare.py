@@ -0,0 +1,65 @@
+"""Regression gate: compare benchmark results with a stored baseline.
+
+Throughput (``bp_per_second``, ``hits_per_second``) regresses when it
+drops by more than `tolerance` of the baseline, peak RSS when it grows by
+more than `rss_tolerance`, and ``planted_recall`` whenever it drops at
+all. Cases missing from either side are ignored. Exits with status 1 if
+anything regressed::
+
+    python -m benchmarks.compare baseline.json bench.json --tolerance 0.15
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_TOLERANCE = 0.15
+DEFAULT_RSS_TOLERANCE = 0.25
+
+_THROUGHPUT = ("bp_per_second", "hits_per_second")
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float = DEFAULT_TOLERANCE, rss_tolerance: float = DEFAULT_RSS_TOLERANCE) -> List[Tuple[str, str, float, float]]:
+    """``(case, metric, baseline_value, current_value)`` for every regressed metric."""
+    regressions = []
+    old_results, new_results = baseline["results"], current["results"]
+    for case in sorted(set(old_results) & set(new_results)):
+        old, new = old_results[case], new_results[case]
+        for metric in _THROUGHPUT:
+            if old.get(metric) and new.get(metric) is not None and new[metric] < old[metric] * (1 - tolerance):
+                regressions.append((case, metric, old[metric], new[metric]))
+        if old.get("peak_rss_bytes") and new.get("peak_rss_bytes") and new["peak_rss_bytes"] > old["peak_rss_bytes"] * (1 + rss_tolerance):
+            regressions.append((case, "peak_rss_bytes", old["peak_rss_bytes"], new["peak_rss_bytes"]))
+        if "planted_recall" in old and new.get("planted_recall", 0.0) < old["planted_recall"]:
+            regressions.append((case, "planted_recall", old["planted_recall"], new.get("planted_recall", 0.0)))
+    return regressions
+
+
+def format_regressions(regressions: List[Tuple[str, str, float, float]]) -> str:
+    if not regressions:
+        return "No regressions."
+    lines = [f"{len(regressions)} regression(s):"]
+    for case, metric, old, new in regressions:
+        change = (new - old) / old * 100 if old else float("inf")
+        lines.append(f"  {case}: {metric} {old:.4g} -> {new:.4g} ({change:+.1f}%)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare", description="Fail when benchmark results regress past a baseline")
+    parser.add_argument("baseline", help="Baseline results JSON (from benchmarks.run)")
+    parser.add_argument("current", help="Current results JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help=f"Allowed relative throughput drop (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--rss-tolerance", type=float, default=DEFAULT_RSS_TOLERANCE, help=f"Allowed relative peak RSS growth (default: {DEFAULT_RSS_TOLERANCE})")
+    args = parser.parse_args(argv)
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    with open(args.current) as fh:
+        current = json.load(fh)
+    regressions = compare(baseline, current, tolerance=args.tolerance, rss_tolerance=args.rss_tolerance)
+    print(format_regressions(regressions))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""Time the scanner, the scorers and the CLI on synthetic genomes.
+
+Every case runs in a fresh child process, so its peak RSS is its own; the
+fastest of `--repeat` runs is kept. Cases:
+
+- ``scan/<size>``: `search.scan_fasta_for_guide` with the planted guide.
+  Reports bp/s and hits/s, and the share of planted sites found with the
+  planted mismatch count (``planted_recall``, always 1.0 unless the
+  scanner is broken).
+- ``score/<name>`` and ``score/<name>/scalar``: every scorer registered in
+  `scoring.SCORERS`, batch and scalar, on random targets within 4
+  mismatches of the guide; hits/s counts targets scored.
+- ``cli/<size>``: ``crispr-check search`` end to end in a subprocess, with
+  its default scoring and sorting.
+
+Results are written as JSON (see `compare` for the regression gate)::
+
+    python -m benchmarks.run --sizes 1M,10M --out bench.json --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from . import compare, synth
+
+DEFAULT_SIZES = "1M,10M"
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+MAX_MISMATCHES = 4
+# targets per scorer case; scalar scorers get a tenth as many
+SCORE_TARGETS = 200_000
+
+
+def _peak_rss(children: bool = False) -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _scan_case(genome: str) -> Dict:
+    from crispr_check import search
+
+    manifest = synth.load_manifest(genome)
+    t0 = time.perf_counter()
+    hits = search.scan_fasta_for_guide(manifest["guide"], genome, max_mismatches=MAX_MISMATCHES)
+    seconds = time.perf_counter() - t0
+    found = {(h["seq_id"], h["start"], h["strand"], h["mismatches"]) for h in hits}
+    planted = [(p["seq_id"], p["start"], p["strand"], p["mismatches"]) for p in manifest["planted"]]
+    recall = sum(p in found for p in planted) / len(planted) if planted else 1.0
+    return {"seconds": seconds, "bases": manifest["size"], "hits": len(hits), "planted_recall": recall, "peak_rss_bytes": _peak_rss()}
+
+
+def _score_case(name: str, scalar: bool, seed: int) -> Dict:
+    from crispr_check import scoring
+
+    guide = synth.DEFAULT_GUIDE
+    rng = np.random.default_rng(seed)
+    n = SCORE_TARGETS // 10 if scalar else SCORE_TARGETS
+    acgt = np.frombuffer(b"ACGT", dtype=np.uint8)
+    targets = np.tile(np.frombuffer(guide.encode("ascii"), dtype=np.uint8), (n, 1))
+    for _ in range(MAX_MISMATCHES):
+        rows, cols = np.arange(n), rng.integers(0, len(guide), n)
+        targets[rows, cols] = acgt[rng.integers(0, 4, n)]
+    texts = [t.tobytes().decode("ascii") for t in targets]
+    scorer = scoring.get_scorer(name)
+    kwargs = {"pam": "NGG"} if "pam" in scorer.options else {}
+    t0 = time.perf_counter()
+    if scalar or not scorer.supports_batch:
+        for t in texts:
+            scorer.score(guide, t, **kwargs)
+    else:
+        scorer.batch(guide, scoring.encode_targets(texts), **kwargs)
+    seconds = time.perf_counter() - t0
+    return {"seconds": seconds, "hits": n, "peak_rss_bytes": _peak_rss()}
+
+
+def _cli_case(genome: str, out_dir: str) -> Dict:
+    manifest = synth.load_manifest(genome)
+    out = os.path.join(out_dir, "bench_cli.csv")
+    cmd = [sys.executable, "-m", "crispr_check.cli", "search", "--guide", manifest["guide"], "--fasta", genome, "--out", out, "--max-mismatches", str(MAX_MISMATCHES)]
+    t0 = time.perf_counter()
+    done = subprocess.run(cmd, capture_output=True, text=True)
+    seconds = time.perf_counter() - t0
+    if done.returncode != 0:
+        raise RuntimeError(f"CLI failed: {done.stderr.strip()}")
+    # "Wrote N hits to ..."
+    hits = int(done.stdout.split("Wrote ", 1)[1].split()[0])
+    os.remove(out)
+    return {"seconds": seconds, "bases": manifest["size"], "hits": hits, "peak_rss_bytes": _peak_rss(children=True)}
+
+
+def run_case(case: Dict) -> Dict:
+    """Run one case description (as built by `plan`) in this process."""
+    kind = case["kind"]
+    if kind == "scan":
+        return _scan_case(case["genome"])
+    if kind == "score":
+        return _score_case(case["scorer"], case["scalar"], case["seed"])
+    if kind == "cli":
+        return _cli_case(case["genome"], case["out_dir"])
+    raise ValueError(f"unknown benchmark kind {kind!r}")
+
+
+def _in_child(case: Dict) -> Dict:
+    cmd = [sys.executable, "-m", "benchmarks.run", "--case", json.dumps(case)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    done = subprocess.run(cmd, capture_output=True, text=True, cwd=root)
+    if done.returncode != 0:
+        raise RuntimeError(f"benchmark {case['name']} failed:\n{done.stderr.strip()}")
+    return json.loads(done.stdout)
+
+
+def _rates(result: Dict) -> Dict:
+    seconds = result["seconds"]
+    if "bases" in result:
+        result["bp_per_second"] = result["bases"] / seconds if seconds > 0 else 0.0
+    result["hits_per_second"] = result["hits"] / seconds if seconds > 0 else 0.0
+    return result
+
+
+def plan(sizes: List[int], data_dir: str, seed: int = 0, repeat_fraction: float = 0.1, scorers: bool = True, cli: bool = True) -> List[Dict]:
+    """Case descriptions for the given genome sizes, generating missing genomes under `data_dir`."""
+    from crispr_check import scoring
+
+    cases = []
+    for size in sizes:
+        genome = synth.ensure_genome(data_dir, size, seed=seed, repeat_fraction=repeat_fraction, max_mismatches=MAX_MISMATCHES)
+        label = synth.format_size(size)
+        cases.append({"name": f"scan/{label}", "kind": "scan", "genome": genome})
+        if cli:
+            cases.append({"name": f"cli/{label}", "kind": "cli", "genome": genome, "out_dir": data_dir})
+    if scorers:
+        for name, scorer in scoring.SCORERS.items():
+            if scorer.supports_batch:
+                cases.append({"name": f"score/{name}", "kind": "score", "scorer": name, "scalar": False, "seed": seed})
+            cases.append({"name": f"score/{name}/scalar", "kind": "score", "scorer": name, "scalar": True, "seed": seed})
+    return cases
+
+
+def run(cases: List[Dict], repeat: int = 3, log=None) -> Dict:
+    """Run every case `repeat` times in child processes; keep the fastest run and the largest peak RSS."""
+    results = {}
+    for case in cases:
+        runs = [_in_child(case) for _ in range(repeat)]
+        best = min(runs, key=lambda r: r["seconds"])
+        rss = [r["peak_rss_bytes"] for r in runs if r["peak_rss_bytes"] is not None]
+        best["peak_rss_bytes"] = max(rss) if rss else None
+        results[case["name"]] = _rates(best)
+        if log is not None:
+            log(f"{case['name']:<24} {best['seconds']:9.3f} s  {best.get('bp_per_second', 0) / 1e6:9.2f} Mbp/s  {best['hits_per_second']:12.0f} hits/s")
+    return results
+
+
+def _meta(seed: int, repeat_fraction: float, repeat: int) -> Dict:
+    import crispr_check
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "version": crispr_check.__version__,
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "repeat_fraction": repeat_fraction,
+        "repeat": repeat,
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Run the crispr_check benchmarks and write the results as JSON")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma-separated genome sizes, from 1M up to 1G (default: {DEFAULT_SIZES})")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for genomes and targets (default: 0)")
+    parser.add_argument("--repeat-fraction", type=float, default=0.1, help="Share of each genome covered by repeats (default: 0.1)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest is kept (default: 3)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Where generated genomes are kept between runs (default: benchmarks/data)")
+    parser.add_argument("--only", default=None, help="Comma-separated case name prefixes to run, e.g. scan,score/cfd")
+    parser.add_argument("--out", default=None, help="Write the results JSON here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="Compare against this results JSON and exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=compare.DEFAULT_TOLERANCE, help=f"Allowed relative slowdown for --baseline (default: {compare.DEFAULT_TOLERANCE})")
+    parser.add_argument("--rss-tolerance", type=float, default=compare.DEFAULT_RSS_TOLERANCE, help=f"Allowed relative peak RSS growth for --baseline (default: {compare.DEFAULT_RSS_TOLERANCE})")
+    parser.add_argument("--case", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        # child process: run one case and report it on stdout
+        print(json.dumps(run_case(json.loads(args.case))))
+        return 0
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    sizes = [synth.parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    cases = plan(sizes, args.data_dir, seed=args.seed, repeat_fraction=args.repeat_fraction)
+    if args.only:
+        prefixes = tuple(p.strip() for p in args.only.split(",") if p.strip())
+        cases = [c for c in cases if c["name"].startswith(prefixes)]
+    report = {"meta": _meta(args.seed, args.repeat_fraction, args.repeat), "results": run(cases, args.repeat, log=lambda line: print(line, file=sys.stderr))}
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        regressions = compare.compare(baseline, report, tolerance=args.tolerance, rss_tolerance=args.rss_tolerance)
+        print(compare.format_regressions(regressions), file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""Seeded synthetic genomes with repeats and planted off-targets.
+
+The background is uniform random sequence. A share of it
+(`repeat_fraction`) is then overwritten with diverged copies of a few
+repeat families, and off-targets of a guide are planted on a regular grid:
+each site is the guide with a known number of substitutions followed by an
+NGG PAM, on a random strand. The planted sites are listed in a JSON
+manifest written next to the FASTA, as the hits a scan must report.
+
+The same parameters always give the same genome, byte for byte. Genomes
+are generated and written in blocks, so a 1 Gb genome needs little memory.
+
+    python -m benchmarks.synth --size 10M --out genome.fa --repeat-fraction 0.3
+"""
+import argparse
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+
+DEFAULT_GUIDE = "GAGTCCGAGCAGAAGAAGAA"
+
+_ACGT = np.frombuffer(b"ACGT", dtype=np.uint8)
+_COMPLEMENT = np.zeros(256, dtype=np.uint8)
+_COMPLEMENT[np.frombuffer(b"ACGT", dtype=np.uint8)] = np.frombuffer(b"TGCA", dtype=np.uint8)
+
+# FASTA line width; blocks are a whole number of lines
+_WIDTH = 60
+_BLOCK = _WIDTH * (1 << 16)
+_REPEAT_LEN = 300
+_REPEAT_FAMILIES = 8
+_REPEAT_DIVERGENCE = 0.1
+
+
+def parse_size(text: str) -> int:
+    """``"1M"`` -> 1_000_000; accepts K, M and G suffixes (powers of 1000)."""
+    text = text.strip().upper()
+    scale = {"K": 10**3, "M": 10**6, "G": 10**9}.get(text[-1:], 1)
+    number = text[:-1] if scale > 1 else text
+    return int(float(number) * scale)
+
+
+def format_size(n: int) -> str:
+    for suffix, scale in (("G", 10**9), ("M", 10**6), ("K", 10**3)):
+        if n >= scale and n % scale == 0:
+            return f"{n // scale}{suffix}"
+    return str(n)
+
+
+def _mutate(rng: np.random.Generator, seq: np.ndarray, rate: float) -> np.ndarray:
+    seq = seq.copy()
+    hit = rng.random(len(seq)) < rate
+    # adding 1-3 to the base code always changes the base
+    codes = np.searchsorted(_ACGT, seq[hit])
+    seq[hit] = _ACGT[(codes + rng.integers(1, 4, hit.sum())) % 4]
+    return seq
+
+
+def _block(rng: np.random.Generator, n: int, families: np.ndarray, repeat_fraction: float, guide: np.ndarray, planted_per_mb: float, max_mismatches: int, offset: int, seq_id: str, planted: List[Dict]) -> np.ndarray:
+    seq = _ACGT[rng.integers(0, 4, n)]
+    for _ in range(int(round(repeat_fraction * n / _REPEAT_LEN))):
+        if n <= _REPEAT_LEN:
+            break
+        at = int(rng.integers(0, n - _REPEAT_LEN))
+        seq[at : at + _REPEAT_LEN] = _mutate(rng, families[rng.integers(0, len(families))], _REPEAT_DIVERGENCE)
+    L = len(guide)
+    site_len = L + 3
+    count = int(round(planted_per_mb * n / 1e6))
+    slot = n // count if count else 0
+    if slot < 2 * site_len:
+        return seq
+    for i in range(count):
+        at = i * slot + int(rng.integers(0, slot - site_len))
+        m = int(rng.integers(0, max_mismatches + 1))
+        target = guide.copy()
+        where = rng.choice(L, size=m, replace=False)
+        codes = np.searchsorted(_ACGT, target[where])
+        target[where] = _ACGT[(codes + rng.integers(1, 4, m)) % 4]
+        site = np.concatenate([target, _ACGT[rng.integers(0, 4, 1)], np.frombuffer(b"GG", dtype=np.uint8)])
+        if rng.random() < 0.5:
+            seq[at : at + site_len] = site
+            planted.append({"seq_id": seq_id, "start": offset + at, "strand": "+", "mismatches": m})
+        else:
+            seq[at : at + site_len] = _COMPLEMENT[site[::-1]]
+            planted.append({"seq_id": seq_id, "start": offset + at + 3, "strand": "-", "mismatches": m})
+    return seq
+
+
+def write_genome(path: str, size: int, seed: int = 0, guide: str = DEFAULT_GUIDE, repeat_fraction: float = 0.1, planted_per_mb: float = 100.0, max_mismatches: int = 4, contig_size: int = 50_000_000) -> Dict:
+    """Write a synthetic genome of `size` bases to `path` and its manifest to ``path + ".json"``.
+
+    The genome is split into contigs of at most `contig_size` bases.
+    Returns the manifest: the parameters and the planted sites (``seq_id``,
+    ``start``, ``strand``, ``mismatches``, in the coordinates scan hits use).
+    """
+    if not 0 <= repeat_fraction <= 1:
+        raise ValueError("repeat_fraction must be between 0 and 1")
+    rng = np.random.default_rng(seed)
+    guide_codes = np.frombuffer(guide.upper().encode("ascii"), dtype=np.uint8).copy()
+    families = _ACGT[rng.integers(0, 4, (_REPEAT_FAMILIES, _REPEAT_LEN))]
+    planted = []
+    with open(path, "wb") as fh:
+        for c, first in enumerate(range(0, size, contig_size)):
+            seq_id = f"chr{c + 1}"
+            n = min(contig_size, size - first)
+            fh.write(f">{seq_id} synthetic\n".encode("ascii"))
+            for offset in range(0, n, _BLOCK):
+                seq = _block(rng, min(_BLOCK, n - offset), families, repeat_fraction, guide_codes, planted_per_mb, max_mismatches, offset, seq_id, planted)
+                full = len(seq) // _WIDTH * _WIDTH
+                lines = np.hstack([seq[:full].reshape(-1, _WIDTH), np.full((full // _WIDTH, 1), ord("\n"), dtype=np.uint8)])
+                fh.write(lines.tobytes())
+                if full < len(seq):
+                    fh.write(seq[full:].tobytes() + b"\n")
+    manifest = {
+        "size": size,
+        "seed": seed,
+        "guide": guide.upper(),
+        "repeat_fraction": repeat_fraction,
+        "planted_per_mb": planted_per_mb,
+        "max_mismatches": max_mismatches,
+        "contig_size": contig_size,
+        "planted": planted,
+    }
+    with open(path + ".json", "w") as fh:
+        json.dump(manifest, fh)
+    return manifest
+
+
+def ensure_genome(data_dir: str, size: int, seed: int = 0, repeat_fraction: float = 0.1, **options) -> str:
+    """Path of the genome for these parameters under `data_dir`, generating it if missing."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"synth_{format_size(size)}_s{seed}_r{repeat_fraction:g}.fa")
+    if not (os.path.exists(path) and os.path.exists(path + ".json")):
+        write_genome(path, size, seed=seed, repeat_fraction=repeat_fraction, **options)
+    return path
+
+
+def load_manifest(path: str) -> Dict:
+    with open(path + ".json") as fh:
+        return json.load(fh)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.synth", description="Write a seeded synthetic genome with planted off-targets")
+    parser.add_argument("--size", default="1M", help="Genome size, e.g. 1M, 100M, 1G (default: 1M)")
+    parser.add_argument("--out", required=True, help="Output FASTA; the manifest goes to <out>.json")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--guide", default=DEFAULT_GUIDE, help="Guide whose off-targets are planted")
+    parser.add_argument("--repeat-fraction", type=float, default=0.1, help="Share of the genome covered by repeat copies (default: 0.1)")
+    parser.add_argument("--planted-per-mb", type=float, default=100.0, help="Planted off-targets per Mb (default: 100)")
+    parser.add_argument("--max-mismatches", type=int, default=4, help="Largest number of substitutions in a planted site (default: 4)")
+    args = parser.parse_args(argv)
+    manifest = write_genome(args.out, parse_size(args.size), seed=args.seed, guide=args.guide, repeat_fraction=args.repeat_fraction, planted_per_mb=args.planted_per_mb, max_mismatches=args.max_mismatches)
+    print(f"Wrote {format_size(manifest['size'])} genome with {len(manifest['planted'])} planted sites to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Bulge-aware verification of PAM-anchored targets.
+
+A DNA bulge is an extra target base with no guide partner; an RNA bulge is
+a guide base with no target partner. A target with `d` DNA bulges is
+``L + d`` bases long, one with `r` RNA bulges ``L - r``; like Cas-OFFinder,
+a hit carries bulges of one kind only, and bulges are internal: the first
+and last guide bases are always paired. Gapless hits are left to the
+Hamming scan.
+
+Targets are anchored at their PAM-proximal end, so every anchor is checked
+with one anchored edit-distance computation against the guide, read away
+from the PAM. The distances come from Myers' bit-parallel algorithm with
+Hyyrö's global-alignment boundary, run on the packed sequence for all
+anchors at once (one 64-bit word per anchor); a bulged alignment with at
+most `k` substitutions has edit distance at most ``k + bulges``, so only
+targets within that bound are aligned exactly, by a small dynamic program
+over bulge placements. Anchors whose span touches an ambiguous base skip the
+filter and are aligned on the text, which compares characters literally as
+the Hamming scan does.
+"""
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from . import genome
+
+# guides are held in one 64-bit word per anchor
+MAX_GUIDE_LEN = 64
+
+_ONE = np.uint64(1)
+
+
+def _pattern_masks(pattern: str) -> np.ndarray:
+    """Myers' match masks: bit ``i`` of entry ``c`` is set when ``pattern[i]`` has 2-bit code ``c``."""
+    peq = np.zeros(4, dtype=np.uint64)
+    for i, c in enumerate(pattern):
+        code = genome.BASES.find(c.encode("ascii"))
+        if code >= 0:
+            peq[code] |= _ONE << np.uint64(i)
+    return peq
+
+
+def anchored_distances(peq: np.ndarray, m: int, text: np.ndarray) -> np.ndarray:
+    """Edit distances of an `m`-base pattern against every prefix of each row of `text`.
+
+    `text` is an ``(n, c)`` matrix of 2-bit codes, already read away from the
+    anchor; entry ``[:, j]`` of the result is the distance of the whole
+    pattern to the first ``j + 1`` columns.
+    """
+    n, cols = text.shape
+    pv = np.full(n, np.uint64(0xFFFFFFFFFFFFFFFF))
+    mv = np.zeros(n, dtype=np.uint64)
+    score = np.full(n, m, dtype=np.int64)
+    top = np.uint64(m - 1)
+    out = np.empty((n, cols), dtype=np.int64)
+    for j in range(cols):
+        eq = peq[text[:, j]]
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        score += ((ph >> top) & _ONE).astype(np.int64) - ((mh >> top) & _ONE).astype(np.int64)
+        # the anchored text start adds one per column along the top row
+        ph = (ph << _ONE) | _ONE
+        mh = mh << _ONE
+        pv = mh | ~(xv | ph)
+        mv = ph & xv
+        out[:, j] = score
+    return out
+
+
+def _align_dna(guide: str, target: str, max_mismatches: int) -> Optional[Tuple[List[int], str, str]]:
+    """Best alignment of every guide base to `target`, which has ``len(target) - len(guide)`` extra bases.
+
+    Returns ``(mismatch_positions, aligned_guide, aligned_target)`` or None
+    when every placement has more than `max_mismatches` substitutions. Ties
+    go to the placement with its bulges furthest 5'.
+    """
+    L, d = len(guide), len(target) - len(guide)
+    inf = L + 1
+    # cost[i][b]: guide[i] paired with target[i + b]
+    cost = [[inf] * (d + 1) for _ in range(L)]
+    back = [[0] * (d + 1) for _ in range(L)]
+    cost[0][0] = int(guide[0] != target[0])
+    for i in range(1, L):
+        row, prev = cost[i], cost[i - 1]
+        for b in range(d + 1):
+            best, arg = inf, 0
+            for b2 in range(b, -1, -1):
+                if prev[b2] < best:
+                    best, arg = prev[b2], b2
+            if best < inf:
+                row[b] = best + (guide[i] != target[i + b])
+                back[i][b] = arg
+        if min(row) > max_mismatches:
+            return None
+    if cost[L - 1][d] > max_mismatches:
+        return None
+    pairs = []
+    b = d
+    for i in range(L - 1, -1, -1):
+        pairs.append(b)
+        b = back[i][b]
+    pairs.reverse()
+    mism, ag, at = [], [], []
+    for i, b in enumerate(pairs):
+        if i:
+            for j in range(i - 1 + pairs[i - 1] + 1, i + b):
+                ag.append("-")
+                at.append(target[j])
+        if guide[i] != target[i + b]:
+            mism.append(i)
+        ag.append(guide[i])
+        at.append(target[i + b])
+    return mism, "".join(ag), "".join(at)
+
+
+def _align_rna(guide: str, target: str, max_mismatches: int) -> Optional[Tuple[List[int], str, str]]:
+    """Best alignment of every base of `target`, which is ``len(guide) - len(target)`` bases short.
+
+    Same return value and tie-breaking as `_align_dna`.
+    """
+    L, r = len(guide), len(guide) - len(target)
+    inf = L + 1
+    # cost[i][u]: guide[i] paired with target[i - u], u guide bases unpaired before it
+    cost = [[inf] * (r + 1) for _ in range(L)]
+    back = [[0] * (r + 1) for _ in range(L)]
+    cost[0][0] = int(guide[0] != target[0])
+    for i in range(1, L):
+        for u in range(min(r, i) + 1):
+            if i - u >= len(target):
+                continue
+            best, arg = inf, 0
+            for u2 in range(u, -1, -1):
+                # the previous paired base, with u - u2 unpaired bases in between
+                prev = i - 1 - (u - u2)
+                if prev >= 0 and cost[prev][u2] < best:
+                    best, arg = cost[prev][u2], u2
+            if best <= max_mismatches:
+                cost[i][u] = best + (guide[i] != target[i - u])
+                back[i][u] = arg
+    if cost[L - 1][r] > max_mismatches:
+        return None
+    paired = {}
+    i, u = L - 1, r
+    while True:
+        paired[i] = u
+        if i == 0:
+            break
+        u2 = back[i][u]
+        i, u = i - 1 - (u - u2), u2
+    mism, at = [], []
+    for i in range(L):
+        if i not in paired:
+            at.append("-")
+            continue
+        t = target[i - paired[i]]
+        if guide[i] != t:
+            mism.append(i)
+        at.append(t)
+    return mism, guide, "".join(at)
+
+
+def target_lengths(guide_len: int, max_dna_bulges: int, max_rna_bulges: int) -> List[int]:
+    """Bulged target lengths to check, DNA bulges first, by bulge count."""
+    dna = [guide_len + d for d in range(1, max_dna_bulges + 1)]
+    # internal RNA bulges leave at least two paired bases
+    rna = [guide_len - r for r in range(1, max_rna_bulges + 1) if guide_len - r >= 2]
+    return dna + rna
+
+
+def verify_anchors(seq: genome.PackedSequence, guide: str, anchors, max_mismatches: int, max_dna_bulges: int, max_rna_bulges: int, reverse: bool = False, owned: Tuple[int, int] = (0, None)) -> Iterator[Tuple[int, int, str, List[int], str, str]]:
+    """Yield bulged targets next to `anchors` within the budgets.
+
+    Plus-strand anchors are the position just past a target's 3' end,
+    minus-strand anchors (`reverse`) the forward start of the target. Only
+    targets whose forward start lies in ``owned = [a, b)`` are reported.
+    Yields ``(rank, start, target, mismatch_positions, aligned_guide,
+    aligned_target)`` in anchor order, where `rank` orders the bulge kinds
+    as `target_lengths` does; `target` is in guide orientation and the
+    aligned strings carry ``-`` opposite bulged bases.
+    """
+    L = len(guide)
+    if L > MAX_GUIDE_LEN:
+        raise ValueError(f"bulge search supports guides of at most {MAX_GUIDE_LEN} bases")
+    lengths = target_lengths(L, max_dna_bulges, max_rna_bulges)
+    anchors = np.asarray(anchors, dtype=np.int64)
+    if not lengths or not len(anchors):
+        return
+    a, b = owned
+    b = len(seq) if b is None else b
+    cols = max(lengths)
+    step = np.arange(cols)
+    # read away from the PAM: backwards on the plus strand, forwards on the
+    # minus strand against the reverse-complemented guide
+    if reverse:
+        pattern = genome.reverse_complement(guide)
+        pos = anchors[:, None] + step
+        span = anchors
+    else:
+        pattern = guide[::-1]
+        pos = anchors[:, None] - 1 - step
+        span = anchors - cols
+    inside = (pos >= 0) & (pos < len(seq))
+    codes = seq.codes_at(np.clip(pos, 0, len(seq) - 1))
+    dist = anchored_distances(_pattern_masks(pattern), L, codes)
+    ambiguous = seq.is_ambiguous(np.maximum(span, 0), cols)
+    candidates = []
+    for rank, Lt in enumerate(lengths):
+        starts = anchors if reverse else anchors - Lt
+        ok = inside[:, Lt - 1] & (starts >= a) & (starts < b)
+        ok &= (dist[:, Lt - 1] <= max_mismatches + abs(Lt - L)) | ambiguous
+        for i in np.flatnonzero(ok):
+            candidates.append((int(i), rank, Lt))
+    candidates.sort()
+    for i, rank, Lt in candidates:
+        anchor = int(anchors[i])
+        if reverse:
+            start = anchor
+            target = genome.reverse_complement(seq.text(start, start + Lt))
+        else:
+            start = anchor - Lt
+            target = seq.text(start, anchor)
+        found = (_align_dna if Lt > L else _align_rna)(guide, target, max_mismatches)
+        if found is not None:
+            yield (rank + 1, start, target) + found
+
+
+def paired_target(aligned_guide: str, aligned_target: str) -> str:
+    """The aligned target read at guide positions only: one character per guide base, ``-`` at RNA bulges."""
+    return "".join(t for g, t in zip(aligned_guide, aligned_target) if g != "-")
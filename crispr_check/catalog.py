@@ -0,0 +1,152 @@
+"""Genome-wide PAM site catalog, reusable across guides.
+
+A catalog lists every PAM site of one pattern on both strands of every
+record of a FASTA, as leftmost forward-strand coordinates (see
+`search.CompiledPam.sites`). Sites do not depend on the guide, so one
+catalog serves every guide length; a search with a catalog skips PAM
+enumeration and only checks the windows next to the listed sites.
+
+Site arrays are sorted, delta-encoded into the narrowest unsigned integer
+type and stored zlib-compressed in a single ``.npz`` file. The catalog is
+keyed by a SHA-256 checksum of the FASTA and the PAM pattern; the FASTA's
+size and modification time are recorded too, so an unchanged file is
+recognised without re-hashing it, and a changed file makes the catalog
+stale.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .search import compile_pam, iter_records
+
+CATALOG_VERSION = 1
+
+# bases read per step while cataloging a record
+_BUILD_CHUNK = 4_000_000
+
+
+class StaleCatalogError(ValueError):
+    """The catalog was built for another FASTA (or an older version of it) or another PAM."""
+
+
+def genome_checksum(fasta_path: str) -> str:
+    """SHA-256 hex digest of the FASTA file's bytes."""
+    h = hashlib.sha256()
+    with open(fasta_path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_stamp(path: str) -> Dict[str, int]:
+    """Size and modification time (ns) of `path`, recorded to tell whether a file changed."""
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _encode(sites: np.ndarray) -> np.ndarray:
+    deltas = np.diff(sites, prepend=0) if len(sites) else np.zeros(0, dtype=np.int64)
+    return deltas.astype(np.min_scalar_type(int(deltas.max()) if len(deltas) else 0))
+
+
+def _decode(deltas: np.ndarray) -> np.ndarray:
+    return np.cumsum(deltas, dtype=np.int64)
+
+
+class PamCatalog:
+    """PAM sites per record and strand, loaded from a catalog file."""
+
+    def __init__(self, meta: Dict, arrays: Dict[str, np.ndarray]):
+        self.meta = meta
+        self.pam = meta["pam"]
+        self.checksum = meta["checksum"]
+        self.records: List[Dict] = meta["records"]
+        self._index = {rec["id"]: i for i, rec in enumerate(self.records)}
+        self._arrays = arrays
+        self._decoded: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return sum(rec["plus"] + rec["minus"] for rec in self.records)
+
+    def __contains__(self, seq_id: str) -> bool:
+        return seq_id in self._index
+
+    def _strand(self, i: int, strand: str) -> np.ndarray:
+        key = f"r{i}_{strand}"
+        arr = self._decoded.get(key)
+        if arr is None:
+            arr = self._decoded[key] = _decode(self._arrays[key])
+        return arr
+
+    def sites(self, seq_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted ``(plus, minus)`` PAM positions of record `seq_id`."""
+        i = self._index[seq_id]
+        return self._strand(i, "plus"), self._strand(i, "minus")
+
+
+def build_catalog(fasta_path: str, out_path: str, pam: str = "NGG") -> PamCatalog:
+    """Enumerate the PAM sites of `fasta_path` and write the catalog to `out_path`."""
+    compiled = compile_pam(pam)
+    P = len(compiled)
+    stamp = file_stamp(fasta_path)
+    records = []
+    arrays = {}
+    for i, (seq_id, n, read) in enumerate(iter_records(fasta_path)):
+        found = {"plus": [], "minus": []}
+        for a in range(0, n, _BUILD_CHUNK):
+            # overlap by P - 1 so every site starting in [a, a + chunk) is seen once
+            plus, minus = compiled.sites(read(a, min(n, a + _BUILD_CHUNK + P - 1)))
+            found["plus"].append(plus + a)
+            found["minus"].append(minus + a)
+        rec = {"id": seq_id, "length": n}
+        for strand, parts in found.items():
+            sites = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+            arrays[f"r{i}_{strand}"] = _encode(sites)
+            rec[strand] = int(len(sites))
+        records.append(rec)
+    meta = {
+        "version": CATALOG_VERSION,
+        "pam": compiled.pattern,
+        "checksum": genome_checksum(fasta_path),
+        "fasta": stamp,
+        "records": records,
+    }
+    # np.savez_compressed appends .npz to names without it; write to the exact path
+    with open(out_path, "wb") as fh:
+        np.savez_compressed(fh, meta=np.array(json.dumps(meta)), **arrays)
+    return PamCatalog(meta, arrays)
+
+
+def load_catalog(path: str, fasta_path: str = None, pam: str = None) -> PamCatalog:
+    """Open a catalog written by `build_catalog`.
+
+    With `fasta_path` and/or `pam`, check that the catalog matches them and
+    raise `StaleCatalogError` otherwise. The FASTA is only re-hashed when
+    its size or modification time differ from those recorded at build time.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        arrays = {k: data[k] for k in data.files if k != "meta"}
+    if meta.get("version") != CATALOG_VERSION:
+        raise StaleCatalogError(f"{path}: unsupported catalog version {meta.get('version')}")
+    if pam is not None and compile_pam(pam).pattern != meta["pam"]:
+        raise StaleCatalogError(f"{path}: catalog is for PAM {meta['pam']}, not {compile_pam(pam).pattern}")
+    if fasta_path is not None and file_stamp(fasta_path) != meta["fasta"] and genome_checksum(fasta_path) != meta["checksum"]:
+        raise StaleCatalogError(f"{path}: FASTA {fasta_path} has changed since the catalog was built")
+    return PamCatalog(meta, arrays)
+
+
+def ensure_catalog(path: str, fasta_path: str, pam: str = "NGG") -> Tuple[PamCatalog, bool]:
+    """Load the catalog at `path` for `fasta_path` and `pam`, (re)building it if missing or stale.
+
+    Returns ``(catalog, built)``.
+    """
+    if os.path.exists(path):
+        try:
+            return load_catalog(path, fasta_path=fasta_path, pam=pam), False
+        except StaleCatalogError:
+            pass
+    return build_catalog(fasta_path, path, pam=pam), True
@@ -1,19 +1,18 @@
 
 import argparse
-import csv
+import itertools
+import sys
 
-from . import scoring, search
+from . import bulges, catalog, design, hits as hit_tables, index, metrics, resultcache, scoring, search, server, sorting
 from .visualization import plot_efficiency, print_summary_statistics
 
+# hits are scored this many at a time with the vectorized scorers
+_SCORE_BLOCK = 4096
 
-def _write_csv(out_path, rows, fieldnames):
-    with open(out_path, "w", newline="") as fh:
-        writer = csv.DictWriter(fh, fieldnames=fieldnames)
-        writer.writeheader()
-        for r in rows:
-            # filter out any extra keys so DictWriter doesn't raise
-            row_filtered = {k: r.get(k, "") for k in fieldnames}
-            writer.writerow(row_filtered)
+
+def _write_hits(out_path, rows, fieldnames, fmt="csv"):
+    """Write rows (any iterable, consumed lazily) as `fmt` (see `hits.FORMATS`); returns the row count."""
+    return hit_tables.write_hits(out_path, rows, fieldnames, fmt)
 
 
 def _format_rows_for_table(rows, fields):
@@ -44,61 +43,386 @@ def _print_pretty_table(rows, fields):
         print("  ".join(r[i].ljust(widths[i]) for i in range(len(fields))))
 
 
+def _read_guides_file(path):
+    """Read guides from a text file: one guide per line, optionally preceded by an id.
+
+    Blank lines and lines starting with '#' are ignored. Id and sequence may be
+    separated by whitespace or a comma; without an id the sequence is its own id.
+    """
+    guides = {}
+    with open(path, "r", encoding="utf-8") as fh:
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.replace(",", " ").split()
+            if len(parts) == 1:
+                gid, seq = parts[0], parts[0]
+            elif len(parts) == 2:
+                gid, seq = parts
+            else:
+                raise ValueError(f"{path}:{lineno}: expected 'sequence' or 'id sequence'")
+            if gid in guides:
+                raise ValueError(f"{path}:{lineno}: duplicate guide id '{gid}'")
+            guides[gid] = seq.upper()
+    if not guides:
+        raise ValueError(f"{path}: no guides found")
+    return guides
+
+
+def _parse_scores(value):
+    """Split a comma-separated ``--scores`` value into registered scorer names."""
+    if not value:
+        return []
+    names = [v.strip() for v in value.split(",") if v.strip()]
+    for name in names:
+        scoring.get_scorer(name)
+    return list(dict.fromkeys(names))
+
+
 def search_command(args):
-    hits = search.scan_fasta_for_guide(args.guide, args.fasta, pam=args.pam, max_mismatches=args.max_mismatches)
-    # score and sort
-    score_funcs = {
-        "pw": scoring.position_weighted_score,
-        "mit": scoring.mit_like_score,
-        "cfd": scoring.cfd_score,
-        "cfd_full": scoring.cfd_score_full,
-    }
+    # --profile / --metrics-json: per-stage time and memory, scan counters
+    metrics_json = getattr(args, "metrics_json", None)
+    profiler = metrics.Profiler(enabled=getattr(args, "profile", False) or bool(metrics_json))
+    profiler.start()
+    pam = args.pam
+    guides_file = getattr(args, "guides_file", None)
+    guides = _read_guides_file(guides_file) if guides_file else {args.guide: args.guide}
+    workers = getattr(args, "workers", 1)
+    idx = None
+    if getattr(args, "index", None):
+        idx = index.load_index(args.index, fasta_path=args.fasta)
+        # the index fixes the PAM it was built for
+        pam = idx.pam
+
+    # only the selected method and the requested extra columns are computed
     method = getattr(args, "score_method", "pw")
-    func = score_funcs.get(method, scoring.position_weighted_score)
-    for h in hits:
-        # compute all internal scores for completeness
-        h["score_pw"] = scoring.position_weighted_score(args.guide, h["target_seq"])
-        h["score_mit"] = scoring.mit_like_score(args.guide, h["target_seq"])
-        h["score_cfd"] = scoring.cfd_score(args.guide, h["target_seq"], pam=args.pam)
-        # user-facing unified score
-        h["score"] = func(args.guide, h["target_seq"]) if method != "cfd" else func(args.guide, h["target_seq"], pam=args.pam)
-
-    # sort by the selected score descending
-    hits.sort(key=lambda x: x["score"], reverse=True)
-    fields = ["seq_id", "start", "end", "strand", "target_seq", "mismatches", "mismatch_positions", "score"]
+    if method not in scoring.SCORERS:
+        method = "pw"
+    extra = _parse_scores(getattr(args, "scores", None))
+    names = list(dict.fromkeys([method] + extra))
+    cfd_table = getattr(args, "cfd_table", None)
+    context = {"pam": pam, "table": scoring.load_compiled_cfd_table(cfd_table) if cfd_table else None}
+    # repeated targets of a guide are scored once
+    cache = scoring.ScoreCache(names, maxsize=getattr(args, "score_cache_size", scoring.DEFAULT_SCORE_CACHE_SIZE), **context)
+
+    # --min-score / --top: per-guide upper bounds of the score by mismatch
+    # count drop hits before they are scored, and a minimum score also
+    # lowers the mismatch budget of the scan itself
+    top = getattr(args, "top", None)
+    min_score = getattr(args, "min_score", None)
+    max_mismatches = args.max_mismatches
+    max_dna_bulges = getattr(args, "max_dna_bulges", 0)
+    max_rna_bulges = getattr(args, "max_rna_bulges", 0)
+    bulge_budget = {"max_dna_bulges": max_dna_bulges, "max_rna_bulges": max_rna_bulges}
+    bounds = {}
+    if top is not None or min_score is not None:
+        for g in set(guides.values()):
+            # an RNA bulge is scored as a mismatch at the unpaired guide base
+            b = scoring.scorer_bounds(method, g, max_mismatches + max_rna_bulges, **context)
+            if b is not None:
+                bounds[g] = b
+    if min_score is not None and len(bounds) == len(set(guides.values())):
+        max_mismatches = min(max_mismatches, max(scoring.max_mismatches_for(b, min_score) for b in bounds.values()))
+    ranked = sorting.TopK(top, key=lambda x: x["score"]) if top is not None else None
+
+    cat = None
+    if getattr(args, "catalog", None) and idx is None:
+        cat, built = catalog.ensure_catalog(args.catalog, args.fasta, pam=pam)
+        if built:
+            print(f"Built PAM catalog {args.catalog} ({len(cat)} sites)", file=sys.stderr)
+
+    # repeat queries are answered from the on-disk result cache
+    result_cache = None
+    if (getattr(args, "cache", False) or getattr(args, "cache_dir", None)) and idx is None:
+        result_cache = resultcache.ResultCache(args.cache_dir, max_bytes=int(getattr(args, "cache_max_size", resultcache.DEFAULT_MAX_BYTES >> 20) * (1 << 20)))
+
+    prefilter_q = getattr(args, "prefilter_q", 0)
+    scan_stats = {}
+    if max_mismatches < 0:
+        hits = iter(())
+    elif idx is not None:
+
+        def index_hits():
+            for gid, g in guides.items():
+                for h in idx.search(g, max_mismatches=max_mismatches):
+                    h["guide_id"] = gid
+                    yield h
+
+        hits = index_hits()
+    elif result_cache is not None:
+        hits = resultcache.iter_cached_hits(result_cache, guides, args.fasta, pam=pam, max_mismatches=max_mismatches, workers=workers, catalog=cat, prefilter_q=prefilter_q, stats=scan_stats, **bulge_budget)
+    elif guides_file:
+        hits = search.iter_batch_hits(guides, args.fasta, pam=pam, max_mismatches=max_mismatches, workers=workers, catalog=cat, prefilter_q=prefilter_q, stats=scan_stats, **bulge_budget)
+    else:
+        hits = search.iter_hits(args.guide, args.fasta, pam=pam, max_mismatches=max_mismatches, workers=workers, catalog=cat, prefilter_q=prefilter_q, stats=scan_stats, **bulge_budget)
+
+    summary_only = getattr(args, "summary_only", False)
+    if summary_only:
+        # one row per guide: hits are scored and folded into mergeable
+        # per-guide aggregates where they are found, never collected
+        summary_names = list(dict.fromkeys(["mit", "cfd"] + extra))
+        with profiler.stage("scan"):
+            if idx is None and result_cache is None:
+                summaries = search.summarize_batch_hits(guides, args.fasta, summary_names, pam=pam, max_mismatches=max_mismatches, workers=workers, catalog=cat, prefilter_q=prefilter_q, stats=scan_stats, table=context["table"], **bulge_budget)
+            else:
+                summaries = scoring.summarize_hits(hits, guides, summary_names, **context)
+        rows = [{"guide_id": gid, "guide": g, **summaries[gid].row(max_mismatches)} for gid, g in guides.items()]
+        fields = ["guide_id", "guide", "hits", "off_targets"] + [f"mm{m}" for m in range(max_mismatches + 1)] + [f"{name}_{col}" for name in summary_names for col in ("specificity", "sum")]
+    else:
+        def promising(guide, h):
+            b = bounds.get(guide)
+            if b is None:
+                return True
+            best = b[h["mismatches"] + h.get("rna_bulges", 0)]
+            if min_score is not None and best < min_score:
+                return False
+            # a row tying the weakest kept row loses to it, being later
+            cut = ranked.threshold if ranked is not None else None
+            return cut is None or best > cut
+
+        def score_block(block):
+            kept = []
+            by_guide = {}
+            for h in block:
+                guide = guides[h["guide_id"]] if guides_file else args.guide
+                if promising(guide, h):
+                    kept.append(h)
+                    by_guide.setdefault(guide, []).append(h)
+            for guide, group in by_guide.items():
+                # bulged hits are scored on the target bases paired with the guide
+                columns = cache.score(guide, [bulges.paired_target(h["aligned_guide"], h["aligned_target"]) if "aligned_guide" in h else h["target_seq"] for h in group])
+                for name, values in columns.items():
+                    # user-facing unified score, plus a column per requested scorer
+                    keys = (["score"] if name == method else []) + ([f"score_{name}"] if name in extra else [])
+                    for h, v in zip(group, values):
+                        for key in keys:
+                            h[key] = v
+            if min_score is not None:
+                kept = [h for h in kept if h["score"] >= min_score]
+            return kept
+
+        hits = profiler.iterate("scan", hits)
+
+        def scored():
+            # hits are scored a block at a time as they stream in
+            block = []
+            for h in hits:
+                block.append(h)
+                if len(block) >= _SCORE_BLOCK:
+                    yield from score_block(block)
+                    block = []
+            yield from score_block(block)
+
+        rows = profiler.iterate("scoring", scored())
+        if ranked is not None:
+            # the heap holds at most --top rows and yields them best first
+            with profiler.stage("sorting"):
+                for r in rows:
+                    ranked.push(r)
+            rows = ranked.rows()
+        elif not getattr(args, "no_sort", False):
+            # sort by the selected score descending, spilling sorted runs to disk
+            # so memory stays bounded
+            run_size = getattr(args, "sort_run_size", sorting.DEFAULT_RUN_SIZE)
+            rows = profiler.iterate("sorting", sorting.external_sort(rows, key=lambda x: x["score"], reverse=True, run_size=run_size))
+        bulge_fields = ["dna_bulges", "rna_bulges", "aligned_guide", "aligned_target"] if max_dna_bulges or max_rna_bulges else []
+        fields = ["seq_id", "start", "end", "strand", "target_seq", "mismatches", "mismatch_positions"] + bulge_fields + ["score"] + [f"score_{name}" for name in extra]
+        if guides_file:
+            fields.insert(0, "guide_id")
     out = args.out or "results.csv"
-    _write_csv(out, hits, fields)
+    fmt = getattr(args, "format", None) or hit_tables.format_from_path(out)
+    pretty = getattr(args, "pretty", False)
+    if pretty:
+        # the table needs every row to size its columns; they are held in
+        # columnar blocks until it is printed
+        tables = list(hit_tables.iter_tables(rows, fields))
+        rows = itertools.chain.from_iterable(tables)
+    with profiler.stage("writing"):
+        count = _write_hits(out, rows, fields, fmt)
+        if pretty:
+            _print_pretty_table(itertools.chain.from_iterable(tables), fields)
+
+    print(f"Wrote {count} {'guide summaries' if summary_only else 'hits'} to {out}")
+    if prefilter_q and scan_stats.get("candidates"):
+        print(f"Q-gram prefilter (q={prefilter_q}): rejected {scan_stats['prefiltered']} of {scan_stats['candidates']} candidate windows", file=sys.stderr)
+    if cache.hits or cache.misses:
+        print(f"Score cache: {cache.hits} hits, {cache.misses} misses ({len(cache)} entries, max {cache.maxsize})", file=sys.stderr)
+    if result_cache is not None:
+        print(f"Result cache: {result_cache.hits} of {result_cache.hits + result_cache.misses} guides served from {result_cache.path}", file=sys.stderr)
+        result_cache.close()
+    profiler.stop()
+    if profiler.enabled:
+        report = profiler.report(scan_stats)
+        if getattr(args, "profile", False):
+            print(metrics.format_report(report), file=sys.stderr)
+        if metrics_json:
+            metrics.write_report(report, metrics_json)
+
 
-    if getattr(args, "pretty", False):
-        _print_pretty_table(hits, fields)
+def design_command(args):
+    target = index.load_index(args.index, fasta_path=args.fasta) if args.index else args.fasta
+    pam = target.pam if args.index else args.pam
+    cat = None
+    if args.catalog and not args.index:
+        cat, built = catalog.ensure_catalog(args.catalog, args.fasta, pam=pam)
+        if built:
+            print(f"Built PAM catalog {args.catalog} ({len(cat)} sites)", file=sys.stderr)
+    cfd_table = scoring.load_compiled_cfd_table(args.cfd_table) if args.cfd_table else None
+    rows = design.design_guides(target, args.region, pam=pam, guide_length=target.guide_length if args.index else args.guide_length, max_mismatches=args.max_mismatches, workers=args.workers, catalog=cat, cfd_table=cfd_table)
+    rows = design.rank(rows, args.sort_by)
+    fields = ["guide_id", "seq_id", "start", "end", "strand", "guide_seq", "pam_seq", "off_targets"] + [f"mm{m}" for m in range(args.max_mismatches + 1)] + ["mit_specificity", "cfd_specificity", "cfd_sum"]
+    out = args.out
+    count = _write_hits(out, rows, fields, args.format or hit_tables.format_from_path(out))
+    if args.pretty and rows:
+        _print_pretty_table(rows, fields)
+    print(f"Wrote {count} guides for {args.region} to {out}")
 
-    print(f"Wrote {len(hits)} hits to {out}")
+
+def index_command(args):
+    meta = index.build_index(args.fasta, args.out, pam=args.pam, guide_length=args.guide_length, seed_length=args.seed_length)
+    print(f"Indexed {len(meta['records'])} records for PAM {meta['pam']} into {args.out}")
+
+
+def catalog_command(args):
+    cat = catalog.build_catalog(args.fasta, args.out, pam=args.pam)
+    print(f"Cataloged {len(cat)} PAM sites on {len(cat.records)} records for PAM {cat.pam} into {args.out}")
+
+
+def cache_command(args):
+    with resultcache.ResultCache(args.cache_dir) as result_cache:
+        if args.action == "clear":
+            print(f"Removed {result_cache.clear()} cached results from {result_cache.path}")
+        else:
+            st = result_cache.stats()
+            print(f"{st['path']}: {st['entries']} cached results for {st['genomes']} genomes, {st['bytes'] / (1 << 20):.1f} MiB")
+
+
+def serve_command(args):
+    genomes = dict(server.parse_genome_spec(spec) for spec in args.genome)
+    server.serve(genomes, host=args.host, port=args.port, socket_path=args.socket, workers=args.workers, batch_window=args.batch_window_ms / 1000)
 
 
 def main():
     parser = argparse.ArgumentParser(prog="crispr-check")
     sub = parser.add_subparsers(dest="cmd")
     p_search = sub.add_parser("search", help="Search for off-targets for a guide in a FASTA")
-    p_search.add_argument("--guide", required=True, help="Guide RNA sequence (required)")
-    p_search.add_argument("--pam", default="NGG", help="PAM sequence (default: NGG)")
-    p_search.add_argument("--fasta", required=True, help="Path to input FASTA file (required)")
-    p_search.add_argument("--out", default="results.csv", help="Output CSV file (default: results.csv)")
+    p_search.add_argument("--guide", default=None, help="Guide RNA sequence (required unless --guides-file is given)")
+    p_search.add_argument("--guides-file", default=None, help="Text file with one guide per line ('sequence' or 'id sequence'); searched in a single pass")
+    p_search.add_argument("--pam", default="NGG", help="PAM pattern, IUPAC codes allowed (default: NGG)")
+    p_search.add_argument("--fasta", default=None, help="Path to input genome: FASTA, gzip or BGZF FASTA, or .2bit (required unless --index is given)")
+    p_search.add_argument("--index", default=None, help="Path to a seed index directory built with `crispr-check index`; with --fasta, the index is checked against that FASTA")
+    p_search.add_argument("--catalog", default=None, help="PAM catalog file for --fasta and --pam; built (or rebuilt when stale) if needed. See `crispr-check pam-catalog`")
+    p_search.add_argument("--out", default="results.csv", help="Output file (default: results.csv)")
+    p_search.add_argument("--format", choices=hit_tables.FORMATS, default=None, help="Output format; parquet and arrow need pyarrow (default: from the --out extension, .parquet/.arrow/.tsv.gz, else csv)")
     p_search.add_argument("--max-mismatches", type=int, default=4, help="Maximum allowed mismatches (default: 4)")
-    p_search.add_argument("--score-method", choices=["pw", "mit", "cfd", "cfd_full"], default="pw", help="Scoring method: pw=position-weighted, mit=MIT-like, cfd=CFD-like, cfd_full=CFD full table approximation")
+    p_search.add_argument("--score-method", choices=list(scoring.SCORERS), default="pw", help="Scoring method: pw=position-weighted, mit=MIT-like, cfd=CFD-like, cfd_full=CFD full table approximation")
+    p_search.add_argument("--scores", default=None, help=f"Comma-separated extra score columns to write as score_<name> (any of: {','.join(scoring.SCORERS)})")
+    p_search.add_argument("--workers", type=int, default=1, help="Number of worker processes for the genome scan (default: 1)")
+    p_search.add_argument("--top", type=int, default=None, help="Keep only the N best-scoring hits (written best first)")
+    p_search.add_argument("--min-score", type=float, default=None, help="Keep only hits whose score is at least this value")
+    p_search.add_argument("--max-dna-bulges", type=int, default=0, help="Also report targets with up to this many extra DNA bases opposite the guide (default: 0)")
+    p_search.add_argument("--max-rna-bulges", type=int, default=0, help="Also report targets with up to this many unpaired guide bases (default: 0)")
+    p_search.add_argument("--prefilter-q", type=int, default=0, help=f"Screen windows with the q-gram lemma using q-grams of this length before verifying them; lossless, 0 disables (default: 0, max: {search.MAX_PREFILTER_Q})")
+    p_search.add_argument("--no-sort", action="store_true", help="Write hits in scan order as they are found instead of sorting by score")
+    p_search.add_argument("--sort-run-size", type=int, default=sorting.DEFAULT_RUN_SIZE, help=f"Hits held in memory per sorted run before spilling to disk (default: {sorting.DEFAULT_RUN_SIZE})")
+    p_search.add_argument("--score-cache-size", type=int, default=scoring.DEFAULT_SCORE_CACHE_SIZE, help=f"Distinct (guide, target) scores memoized; 0 disables (default: {scoring.DEFAULT_SCORE_CACHE_SIZE})")
+    p_search.add_argument("--cache", action="store_true", help=f"Reuse and store results in the on-disk result cache (default directory: {resultcache.default_cache_dir()}). Results are kept per --max-mismatches and answer any query with the same or a smaller value; raising it rescans the genome")
+    p_search.add_argument("--cache-dir", default=None, help="Result cache directory; implies --cache")
+    p_search.add_argument("--cache-max-size", type=float, default=resultcache.DEFAULT_MAX_BYTES >> 20, help=f"Size limit of the result cache in MiB; least recently used results are evicted beyond it (default: {resultcache.DEFAULT_MAX_BYTES >> 20})")
+    p_search.add_argument("--profile", action="store_true", help="Print wall time, CPU time and peak memory per pipeline stage and scan counters per contig to stderr (memory tracing slows the run)")
+    p_search.add_argument("--metrics-json", default=None, help="Write the --profile measurements to this JSON file")
+    p_search.add_argument("--summary-only", action="store_true", help="Write one row per guide instead of the hits: hit counts by mismatches, and the guide specificity (100*100/(100+sum)) and summed off-target score for mit, cfd and each --scores scorer; one perfect match per guide is taken as its on-target site")
     p_search.add_argument("--pretty", action="store_true", help="Show a human-friendly table on stdout")
-    p_search.add_argument("--cfd-table", default=None, help="Path to CFD table JSON file (optional) for cfd_full scoring")
+    p_search.add_argument("--cfd-table", default=None, help="Path to a CFD table (JSON, or a compiled .npz) used by cfd_full scoring (optional)")
+    p_design = sub.add_parser("design", help="Enumerate every guide in a region and rank them by genome-wide off-target specificity")
+    p_design.add_argument("--region", required=True, help="Target region as chr:start-end (1-based, inclusive)")
+    p_design.add_argument("--fasta", default=None, help="Path to input genome: FASTA, gzip or BGZF FASTA, or .2bit (required unless --index is given)")
+    p_design.add_argument("--index", default=None, help="Path to a seed index directory built with `crispr-check index`; fixes the PAM and guide length. With --fasta, the index is checked against that FASTA")
+    p_design.add_argument("--catalog", default=None, help="PAM catalog file for --fasta and --pam; built (or rebuilt when stale) if needed")
+    p_design.add_argument("--pam", default="NGG", help="PAM pattern, IUPAC codes allowed (default: NGG)")
+    p_design.add_argument("--guide-length", type=int, default=20, help="Protospacer length (default: 20)")
+    p_design.add_argument("--max-mismatches", type=int, default=4, help="Maximum mismatches of a counted off-target (default: 4)")
+    p_design.add_argument("--workers", type=int, default=1, help="Number of worker processes for the genome scan (default: 1)")
+    p_design.add_argument("--cfd-table", default=None, help="CFD table (JSON, or a compiled .npz); CFD scores then use cfd_full with it instead of cfd")
+    p_design.add_argument("--sort-by", choices=design.SORT_KEYS, default="mit_specificity", help="Order of the guides, best first (default: mit_specificity)")
+    p_design.add_argument("--out", default="design.csv", help="Output file (default: design.csv)")
+    p_design.add_argument("--format", choices=hit_tables.FORMATS, default=None, help="Output format (default: from the --out extension, else csv)")
+    p_design.add_argument("--pretty", action="store_true", help="Show a human-friendly table on stdout")
+    p_index = sub.add_parser("index", help="Build a persistent seed index for a FASTA and PAM")
+    p_index.add_argument("--fasta", required=True, help="Path to input genome: FASTA, gzip or BGZF FASTA, or .2bit (required)")
+    p_index.add_argument("--pam", default="NGG", help="PAM pattern, IUPAC codes allowed (default: NGG)")
+    p_index.add_argument("--out", required=True, help="Output index directory (required)")
+    p_index.add_argument("--guide-length", type=int, default=20, help="Protospacer length to index (default: 20)")
+    p_index.add_argument("--seed-length", type=int, default=index.DEFAULT_SEED_LENGTH, help=f"Seed k-mer length (default: {index.DEFAULT_SEED_LENGTH})")
+    p_catalog = sub.add_parser("pam-catalog", help="Write every PAM site of a FASTA to a catalog reusable across guides")
+    p_catalog.add_argument("--fasta", required=True, help="Path to input genome: FASTA, gzip or BGZF FASTA, or .2bit (required)")
+    p_catalog.add_argument("--pam", default="NGG", help="PAM pattern, IUPAC codes allowed (default: NGG)")
+    p_catalog.add_argument("--out", required=True, help="Output catalog file (required)")
+    p_cache = sub.add_parser("cache", help="Show or clear the on-disk search result cache")
+    p_cache.add_argument("action", choices=["stats", "clear"], help="stats: print entry count and size; clear: remove every entry")
+    p_cache.add_argument("--cache-dir", default=None, help=f"Result cache directory (default: {resultcache.default_cache_dir()})")
+    p_serve = sub.add_parser("serve", help="Keep genomes loaded and answer search and score requests over HTTP or a Unix socket")
+    p_serve.add_argument("--genome", action="append", required=True, help="Genome to load, as NAME=PATH or PATH: a FASTA (plain, gzip, BGZF or .2bit) or a seed index directory; repeatable")
+    p_serve.add_argument("--host", default=server.DEFAULT_HOST, help=f"Address to listen on (default: {server.DEFAULT_HOST})")
+    p_serve.add_argument("--port", type=int, default=server.DEFAULT_PORT, help=f"TCP port to listen on (default: {server.DEFAULT_PORT})")
+    p_serve.add_argument("--socket", default=None, help="Listen on this Unix socket instead of a TCP port")
+    p_serve.add_argument("--workers", type=int, default=1, help="Number of search worker processes (default: 1)")
+    p_serve.add_argument("--batch-window-ms", type=float, default=server.DEFAULT_BATCH_WINDOW * 1000, help=f"Search requests for the same genome arriving within this many milliseconds share one genome pass (default: {server.DEFAULT_BATCH_WINDOW * 1000:g})")
     args = parser.parse_args()
 
     # Input validation and helpful error messages
     if args.cmd == "search":
         import os
         errors = []
-        if not args.guide or not isinstance(args.guide, str) or len(args.guide.strip()) == 0:
+        if args.guides_file:
+            if args.guide:
+                errors.append("--guide and --guides-file are mutually exclusive.")
+            if not os.path.isfile(args.guides_file):
+                errors.append(f"--guides-file '{args.guides_file}' does not exist.")
+        elif not args.guide or not isinstance(args.guide, str) or len(args.guide.strip()) == 0:
             errors.append("--guide is required and must be a non-empty string.")
-        if not args.fasta or not os.path.isfile(args.fasta):
+        if args.index:
+            if args.fasta and not os.path.isfile(args.fasta):
+                errors.append(f"--fasta file '{args.fasta}' does not exist.")
+            if not os.path.isfile(os.path.join(args.index, "meta.json")):
+                errors.append(f"--index directory '{args.index}' is not a seed index.")
+            if args.catalog:
+                errors.append("--catalog and --index are mutually exclusive.")
+            if args.prefilter_q:
+                errors.append("--prefilter-q and --index are mutually exclusive.")
+            if args.max_dna_bulges or args.max_rna_bulges:
+                errors.append("--max-dna-bulges/--max-rna-bulges and --index are mutually exclusive.")
+        elif not args.fasta or not os.path.isfile(args.fasta):
             errors.append(f"--fasta file '{args.fasta}' does not exist.")
         if args.max_mismatches < 0:
             errors.append("--max-mismatches must be non-negative.")
+        if args.max_dna_bulges < 0 or args.max_rna_bulges < 0:
+            errors.append("--max-dna-bulges and --max-rna-bulges must be non-negative.")
+        try:
+            search.compile_pam(args.pam)
+        except ValueError as e:
+            errors.append(f"--pam: {e}")
+        if args.workers < 1:
+            errors.append("--workers must be at least 1.")
+        if args.sort_run_size < 1:
+            errors.append("--sort-run-size must be at least 1.")
+        if args.top is not None and args.top < 1:
+            errors.append("--top must be at least 1.")
+        if not 0 <= args.prefilter_q <= search.MAX_PREFILTER_Q:
+            errors.append(f"--prefilter-q must be between 0 and {search.MAX_PREFILTER_Q}.")
+        if args.score_cache_size < 0:
+            errors.append("--score-cache-size must be non-negative.")
+        if args.cache_max_size < 0:
+            errors.append("--cache-max-size must be non-negative.")
+        if args.summary_only and (args.top is not None or args.min_score is not None):
+            errors.append("--summary-only cannot be combined with --top or --min-score.")
+        if args.index and (args.cache or args.cache_dir):
+            errors.append("--cache/--cache-dir and --index are mutually exclusive.")
+        try:
+            _parse_scores(args.scores)
+        except ValueError as e:
+            errors.append(f"--scores: {e}")
         if args.cfd_table and not os.path.isfile(args.cfd_table):
             errors.append(f"--cfd-table file '{args.cfd_table}' does not exist.")
         if errors:
@@ -111,13 +435,130 @@ def main():
         except Exception as e:
             print(f"Error during search: {e}", file=sys.stderr)
             parser.exit(2)
+    elif args.cmd == "design":
+        import os
+        errors = []
+        try:
+            design.parse_region(args.region)
+        except ValueError as e:
+            errors.append(f"--region: {e}")
+        if args.index:
+            if args.fasta and not os.path.isfile(args.fasta):
+                errors.append(f"--fasta file '{args.fasta}' does not exist.")
+            if not os.path.isfile(os.path.join(args.index, "meta.json")):
+                errors.append(f"--index directory '{args.index}' is not a seed index.")
+            if args.catalog:
+                errors.append("--catalog and --index are mutually exclusive.")
+        elif not args.fasta or not os.path.isfile(args.fasta):
+            errors.append(f"--fasta file '{args.fasta}' does not exist.")
+        try:
+            search.compile_pam(args.pam)
+        except ValueError as e:
+            errors.append(f"--pam: {e}")
+        if args.guide_length <= 0:
+            errors.append("--guide-length must be positive.")
+        if args.max_mismatches < 0:
+            errors.append("--max-mismatches must be non-negative.")
+        if args.workers < 1:
+            errors.append("--workers must be at least 1.")
+        if args.cfd_table and not os.path.isfile(args.cfd_table):
+            errors.append(f"--cfd-table file '{args.cfd_table}' does not exist.")
+        if errors:
+            print("Input validation error(s):", file=sys.stderr)
+            for err in errors:
+                print(f"  - {err}", file=sys.stderr)
+            parser.exit(1)
+        try:
+            design_command(args)
+        except Exception as e:
+            print(f"Error during design: {e}", file=sys.stderr)
+            parser.exit(2)
+    elif args.cmd == "index":
+        import os
+        errors = []
+        if not os.path.isfile(args.fasta):
+            errors.append(f"--fasta file '{args.fasta}' does not exist.")
+        try:
+            search.compile_pam(args.pam)
+        except ValueError as e:
+            errors.append(f"--pam: {e}")
+        if args.guide_length <= 0:
+            errors.append("--guide-length must be positive.")
+        if not 0 < args.seed_length <= 31:
+            errors.append("--seed-length must be between 1 and 31.")
+        if errors:
+            print("Input validation error(s):", file=sys.stderr)
+            for err in errors:
+                print(f"  - {err}", file=sys.stderr)
+            parser.exit(1)
+        try:
+            index_command(args)
+        except Exception as e:
+            print(f"Error during indexing: {e}", file=sys.stderr)
+            parser.exit(2)
+    elif args.cmd == "pam-catalog":
+        import os
+        errors = []
+        if not os.path.isfile(args.fasta):
+            errors.append(f"--fasta file '{args.fasta}' does not exist.")
+        try:
+            search.compile_pam(args.pam)
+        except ValueError as e:
+            errors.append(f"--pam: {e}")
+        if errors:
+            print("Input validation error(s):", file=sys.stderr)
+            for err in errors:
+                print(f"  - {err}", file=sys.stderr)
+            parser.exit(1)
+        try:
+            catalog_command(args)
+        except Exception as e:
+            print(f"Error during cataloging: {e}", file=sys.stderr)
+            parser.exit(2)
+    elif args.cmd == "serve":
+        import os
+        errors = []
+        names = []
+        for spec in args.genome:
+            try:
+                name, path = server.parse_genome_spec(spec)
+            except ValueError as e:
+                errors.append(f"--genome: {e}")
+                continue
+            names.append(name)
+            if os.path.isdir(path):
+                if not os.path.isfile(os.path.join(path, "meta.json")):
+                    errors.append(f"--genome directory '{path}' is not a seed index.")
+            elif not os.path.isfile(path):
+                errors.append(f"--genome file '{path}' does not exist.")
+        if len(set(names)) != len(names):
+            errors.append("--genome names must be unique.")
+        if args.workers < 1:
+            errors.append("--workers must be at least 1.")
+        if args.batch_window_ms < 0:
+            errors.append("--batch-window-ms must be non-negative.")
+        if errors:
+            print("Input validation error(s):", file=sys.stderr)
+            for err in errors:
+                print(f"  - {err}", file=sys.stderr)
+            parser.exit(1)
+        try:
+            serve_command(args)
+        except Exception as e:
+            print(f"Error running the server: {e}", file=sys.stderr)
+            parser.exit(2)
+    elif args.cmd == "cache":
+        try:
+            cache_command(args)
+        except Exception as e:
+            print(f"Error accessing the result cache: {e}", file=sys.stderr)
+            parser.exit(2)
     else:
         parser.print_help()
 
 
 if __name__ == "__main__":
     # If the first argument is a click subcommand, use click CLI; else fallback to argparse CLI
-    import sys
     click_commands = {"plot", "stats"}
     if len(sys.argv) > 1 and sys.argv[1] in click_commands:
         import click
@@ -0,0 +1,134 @@
+"""Client for `crispr-check serve`, with an in-process fallback.
+
+`Client.search` sends the request to a running server (see `server`) and,
+when none answers, runs the same search in this process, so callers get
+the same hits either way::
+
+    client = Client()  # $CRISPR_CHECK_SERVER, else http://127.0.0.1:8765
+    hits = client.search(["GAGTCCGAGCAGAAGAAGA"], fasta="genome.fa", scores=["mit", "cfd"])
+
+Addresses are ``http://host:port`` or, for a Unix socket, ``unix:/path``.
+"""
+import http.client
+import json
+import os
+import socket
+from typing import Dict, List, Mapping, Optional, Sequence, Union
+from urllib.parse import urlsplit
+
+DEFAULT_ADDRESS = "http://127.0.0.1:8765"
+
+
+class ServerUnavailable(ConnectionError):
+    """No server answered at the client's address."""
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def default_address() -> str:
+    return os.environ.get("CRISPR_CHECK_SERVER") or DEFAULT_ADDRESS
+
+
+class Client:
+    """Talks to the search server at `address` (default: `default_address()`)."""
+
+    def __init__(self, address: str = None, timeout: float = 600.0):
+        self.address = address or default_address()
+        self.timeout = timeout
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self.address.startswith("unix:"):
+            return _UnixConnection(self.address[len("unix:"):], self.timeout)
+        url = urlsplit(self.address if "//" in self.address else f"http://{self.address}")
+        return http.client.HTTPConnection(url.hostname or "127.0.0.1", url.port or 80, timeout=self.timeout)
+
+    def request(self, method: str, path: str, payload: Dict = None) -> Dict:
+        """Send one request and return the decoded JSON reply.
+
+        Raises `ServerUnavailable` when nothing listens at the address,
+        ValueError for requests the server rejects and RuntimeError for
+        server-side failures.
+        """
+        conn = self._connection()
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        try:
+            try:
+                conn.request(method, path, body=body, headers={"Content-Type": "application/json"} if body is not None else {})
+            except (ConnectionRefusedError, FileNotFoundError, socket.gaierror) as e:
+                raise ServerUnavailable(f"no crispr-check server at {self.address}: {e}") from None
+            response = conn.getresponse()
+            reply = json.loads(response.read() or b"{}")
+        finally:
+            conn.close()
+        if response.status >= 500:
+            raise RuntimeError(reply.get("error", f"server error {response.status}"))
+        if response.status >= 400:
+            raise ValueError(reply.get("error", f"request failed with status {response.status}"))
+        return reply
+
+    def health(self) -> Optional[Dict]:
+        """The server's health report, or None when no server is running."""
+        try:
+            return self.request("GET", "/health")
+        except ServerUnavailable:
+            return None
+
+    def metrics(self) -> Dict:
+        return self.request("GET", "/metrics")
+
+    def search(self, guides: Union[str, Mapping[str, str], Sequence[str]], fasta: str = None, genome: str = None, pam: str = "NGG", max_mismatches: int = 4, max_dna_bulges: int = 0, max_rna_bulges: int = 0, prefilter_q: int = 0, scores: Sequence[str] = (), fallback: bool = True) -> List[Dict]:
+        """Hits of `search.scan_fasta_for_guides`, plus a ``score_<name>`` column per scorer in `scores`.
+
+        The server searches the genome loaded as `genome`, or else the one
+        loaded from `fasta`. When no server is running and `fallback` is
+        true, `fasta` is searched in this process instead.
+        """
+        if isinstance(guides, str):
+            guides = [guides]
+        payload = {
+            "guides": dict(guides) if isinstance(guides, Mapping) else list(guides),
+            "pam": pam,
+            "max_mismatches": max_mismatches,
+            "max_dna_bulges": max_dna_bulges,
+            "max_rna_bulges": max_rna_bulges,
+            "prefilter_q": prefilter_q,
+            "scores": list(scores),
+        }
+        if genome is not None:
+            payload["genome"] = genome
+        if fasta is not None:
+            payload["fasta"] = os.path.abspath(fasta)
+        try:
+            return self.request("POST", "/search", payload)["hits"]
+        except ServerUnavailable:
+            if not fallback or fasta is None:
+                raise
+        from . import search, server
+
+        items = list(guides.items()) if isinstance(guides, Mapping) else [(g, g) for g in guides]
+        per_guide = server.run_search(fasta, [g for _, g in items], pam=search.compile_pam(pam).pattern, max_mismatches=max_mismatches, max_dna_bulges=max_dna_bulges, max_rna_bulges=max_rna_bulges, prefilter_q=prefilter_q, scores=scores)
+        return [{"guide_id": str(gid), **h} for (gid, _), found in zip(items, per_guide) for h in found]
+
+    def score(self, guide: str, targets: Sequence[str], scores: Sequence[str] = None, pam: str = "NGG", fallback: bool = True) -> Dict[str, List[float]]:
+        """Score `targets` against `guide` with each scorer in `scores` (default: all registered)."""
+        from . import scoring
+
+        names = list(scores) if scores is not None else list(scoring.SCORERS)
+        try:
+            return self.request("POST", "/score", {"guide": guide, "targets": list(targets), "scores": names, "pam": pam})["scores"]
+        except ServerUnavailable:
+            if not fallback:
+                raise
+        from . import server
+
+        return server.score_targets(guide, list(targets), names, pam)
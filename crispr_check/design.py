@@ -0,0 +1,140 @@
+"""Guide design: enumerate the guides of a region and rank them by specificity.
+
+Every protospacer of the region with a PAM immediately 3' of it, on either
+strand, is a candidate guide. All candidates are searched together, in one
+batched pass over the genome (`search.summarize_batch_hits`) or through a seed
+index, and every hit other than the guide's own site counts as an
+off-target. Hits are scored with the MIT and CFD scorers as they are
+found and folded into a `scoring.GuideSummary` per guide: off-target
+counts by mismatches and the MIT and CFD guide specificities (see
+`scoring.guide_specificity`).
+"""
+import re
+from typing import Dict, List, Tuple
+
+from . import genome, index, scoring, search
+
+_REGION = re.compile(r"^(.+):([\d,]+)-([\d,]+)$")
+
+SORT_KEYS = ("mit_specificity", "cfd_specificity", "position")
+
+
+def parse_region(text: str) -> Tuple[str, int, int]:
+    """``"chr1:1,001-2,000"`` (1-based, inclusive) -> ``("chr1", 1000, 2000)`` (0-based, half-open)."""
+    m = _REGION.match(text.strip())
+    if not m:
+        raise ValueError(f"invalid region '{text}', expected chr:start-end")
+    start, end = int(m.group(2).replace(",", "")), int(m.group(3).replace(",", ""))
+    if start < 1 or end < start:
+        raise ValueError(f"invalid region '{text}': start must be at least 1 and not after end")
+    return m.group(1), start - 1, end
+
+
+def region_sequence(target, seq_id: str, start: int, end: int) -> str:
+    """Upper-case text of ``[start, end)`` of record `seq_id`, from a FASTA path, `search.ResidentGenome` or `index.SeedIndex`."""
+    if isinstance(target, index.SeedIndex):
+        for rec in target.records:
+            if rec["id"] == seq_id:
+                n = rec["length"]
+                _check_bounds(seq_id, start, end, n)
+                return target.seq.text(rec["offset"] + start, rec["offset"] + end)
+        raise ValueError(f"record '{seq_id}' is not in the index")
+    for name, n, read in search.iter_records(target):
+        if name == seq_id:
+            _check_bounds(seq_id, start, end, n)
+            text = read(start, end)
+            return text.text() if isinstance(text, genome.PackedSequence) else text
+    raise ValueError(f"record '{seq_id}' is not in the genome")
+
+
+def _check_bounds(seq_id: str, start: int, end: int, n: int) -> None:
+    if end > n:
+        raise ValueError(f"region {seq_id}:{start + 1}-{end} extends past the end of {seq_id} ({n} bases)")
+
+
+def enumerate_guides(seq: str, seq_id: str, offset: int = 0, pam: str = "NGG", guide_length: int = 20) -> List[Dict]:
+    """Every PAM-adjacent protospacer of `seq` (record `seq_id`, starting at `offset`) on both strands.
+
+    Returns one dict per guide with ``guide_id``, ``seq_id``, ``start`` and
+    ``end`` (0-based, inclusive, as in search hits), ``strand``,
+    ``guide_seq`` (5'->3' on its strand) and ``pam_seq``, ordered by start
+    and then strand. Protospacers with ambiguous bases are skipped.
+    """
+    compiled = search.compile_pam(pam)
+    P, L = len(compiled), guide_length
+    seq = seq.upper()
+    plus_sites, minus_sites = compiled.sites(seq)
+    found = []
+    for p in plus_sites.tolist():
+        s = p - L
+        if s >= 0:
+            found.append((s, "+", seq[s:p], seq[p : p + P]))
+    for p in minus_sites.tolist():
+        s = p + P
+        if s + L <= len(seq):
+            # the PAM sits 5' of the protospacer in forward coordinates
+            found.append((s, "-", genome.reverse_complement(seq[s : s + L]), genome.reverse_complement(seq[p:s])))
+    guides = []
+    for s, strand, protospacer, pam_seq in sorted(found, key=lambda f: (f[0], f[1] == "-")):
+        if set(protospacer) - set("ACGT"):
+            continue
+        start = offset + s
+        guides.append({"guide_id": f"{seq_id}:{start}{strand}", "seq_id": seq_id, "start": start, "end": start + L - 1, "strand": strand, "guide_seq": protospacer, "pam_seq": pam_seq})
+    return guides
+
+
+def _iter_index_hits(idx: index.SeedIndex, guides: Dict[str, str], max_mismatches: int):
+    for gid, g in guides.items():
+        for h in idx.search(g, max_mismatches=max_mismatches):
+            h["guide_id"] = gid
+            yield h
+
+
+def design_guides(target, region: str, pam: str = "NGG", guide_length: int = 20, max_mismatches: int = 4, workers: int = 1, catalog=None, cfd_table=None, stats: Dict = None) -> List[Dict]:
+    """Enumerate the guides of `region` in `target` and score their off-targets genome-wide.
+
+    `target` is a FASTA path, a `search.ResidentGenome` or a
+    `index.SeedIndex` (whose PAM and protospacer length must match).
+    Returns the rows of `enumerate_guides`, each with ``off_targets``,
+    ``mm0`` ... ``mm<max_mismatches>`` (off-target counts by mismatches),
+    ``mit_specificity``, ``cfd_specificity`` and ``cfd_sum`` (summed
+    off-target CFD scores). CFD uses the ``cfd`` scorer, or ``cfd_full``
+    with `cfd_table` (a `scoring.CfdTable`).
+    """
+    if isinstance(target, index.SeedIndex):
+        if search.compile_pam(pam).pattern != target.pam:
+            raise ValueError(f"the seed index was built for PAM {target.pam}, not {pam}")
+        if guide_length != target.guide_length:
+            raise ValueError(f"the seed index was built for {target.guide_length}-nt protospacers, not {guide_length}")
+    seq_id, start, end = parse_region(region)
+    rows = enumerate_guides(region_sequence(target, seq_id, start, end), seq_id, start, pam, guide_length)
+    if not rows:
+        return rows
+    cfd = "cfd_full" if cfd_table is not None else "cfd"
+    names = ["mit", cfd]
+    guides = {r["guide_id"]: r["guide_seq"] for r in rows}
+    if isinstance(target, index.SeedIndex):
+        summaries = scoring.summarize_hits(_iter_index_hits(target, guides, max_mismatches), guides, names, pam=pam, table=cfd_table)
+    else:
+        summaries = search.summarize_batch_hits(guides, target, names, pam=pam, max_mismatches=max_mismatches, workers=workers, catalog=catalog, stats=stats, table=cfd_table)
+    for r in rows:
+        # every guide's own site is among its perfect matches, and is the
+        # one left out
+        summary = summaries[r["guide_id"]].row(max_mismatches)
+        r["off_targets"] = summary["off_targets"]
+        for m in range(max_mismatches + 1):
+            r[f"mm{m}"] = summary[f"mm{m}"]
+        r["mit_specificity"] = summary["mit_specificity"]
+        r["cfd_specificity"] = summary[f"{cfd}_specificity"]
+        r["cfd_sum"] = summary[f"{cfd}_sum"]
+    return rows
+
+
+def rank(rows: List[Dict], sort_by: str = "mit_specificity") -> List[Dict]:
+    """Rows ordered best first by `sort_by` (one of `SORT_KEYS`), ties by position."""
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"unknown sort key '{sort_by}' (expected one of: {', '.join(SORT_KEYS)})")
+    if sort_by == "position":
+        return list(rows)
+    # sorted() is stable, so equal scores keep their position order
+    return sorted(rows, key=lambda r: -r[sort_by])
@@ -0,0 +1,201 @@
+"""Indexed random-access FASTA reading over a memory-mapped file.
+
+The reader uses a samtools-style ``.fai`` index (NAME, LENGTH, OFFSET,
+LINEBASES, LINEWIDTH per record), reading ``<fasta>.fai`` when it is present
+and up to date or building it otherwise. Contigs are exposed as views over the
+``mmap``: slicing a view reads only the bytes of that slice and strips the
+line breaks, so no full-chromosome string is ever created.
+
+FASTA files that cannot be described by a ``.fai`` (ragged line lengths,
+whitespace inside sequence lines, text before the first header) raise
+`FaiError`; callers fall back to `Bio.SeqIO` for those.
+"""
+import mmap
+import os
+from typing import Callable, Dict, Iterator, List, NamedTuple
+
+
+class FaiError(ValueError):
+    """The FASTA file cannot be indexed as a ``.fai``."""
+
+
+class FaiEntry(NamedTuple):
+    name: str
+    length: int
+    offset: int
+    line_bases: int
+    line_width: int
+
+
+def build_fai(fasta_path: str, opener: Callable = open) -> List[FaiEntry]:
+    """Scan a FASTA file and return its ``.fai`` entries.
+
+    `opener` opens the file for binary reading; offsets are positions in the
+    bytes it returns (e.g. `gzip.open` for a BGZF file).
+    """
+    entries = []
+    name = None
+    length = offset = line_bases = line_width = 0
+    # set once a record has a line shorter than line_bases: it must be the last
+    short_line_seen = False
+    pos = 0
+
+    def finish():
+        if name is not None:
+            entries.append(FaiEntry(name, length, offset, line_bases, line_width))
+
+    with opener(fasta_path, "rb") as fh:
+        for line in fh:
+            start = pos
+            pos += len(line)
+            if line.startswith(b">"):
+                finish()
+                fields = line[1:].decode("ascii", errors="replace").split(None, 1)
+                name = fields[0] if fields else ""
+                length = line_bases = line_width = 0
+                offset = pos
+                short_line_seen = False
+                continue
+            bases = line.rstrip(b"\r\n")
+            if name is None:
+                if bases.strip():
+                    raise FaiError(f"{fasta_path}: sequence data before the first header")
+                continue
+            if not bases:
+                # blank lines are only allowed at the end of a record
+                short_line_seen = True
+                continue
+            if short_line_seen:
+                raise FaiError(f"{fasta_path}: record '{name}' has uneven line lengths at byte {start}")
+            if bases.split() != [bases]:
+                raise FaiError(f"{fasta_path}: record '{name}' has whitespace in a sequence line")
+            if line_bases == 0:
+                line_bases, line_width = len(bases), len(line)
+            # only the final line of the file may lack its line break
+            elif len(bases) > line_bases or (len(bases) == line_bases and len(line) != line_width and line.endswith(b"\n")):
+                raise FaiError(f"{fasta_path}: record '{name}' has uneven line lengths at byte {start}")
+            elif len(bases) < line_bases:
+                short_line_seen = True
+            length += len(bases)
+    finish()
+    return entries
+
+
+def write_fai(entries: List[FaiEntry], fai_path: str) -> None:
+    with open(fai_path, "w", encoding="ascii") as fh:
+        for e in entries:
+            fh.write(f"{e.name}\t{e.length}\t{e.offset}\t{e.line_bases}\t{e.line_width}\n")
+
+
+def read_fai(fai_path: str) -> List[FaiEntry]:
+    entries = []
+    with open(fai_path, "r", encoding="ascii") as fh:
+        for line in fh:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 5:
+                raise FaiError(f"{fai_path}: malformed line {line!r}")
+            entries.append(FaiEntry(fields[0], *(int(x) for x in fields[1:5])))
+    return entries
+
+
+def load_fai(fasta_path: str, write: bool = True, opener: Callable = open) -> List[FaiEntry]:
+    """Return the ``.fai`` entries for `fasta_path`.
+
+    An existing ``<fasta>.fai`` is used when it is at least as new as the
+    FASTA; otherwise the index is built (see `build_fai` for `opener`) and,
+    with `write`, saved next to the FASTA (silently skipped when the
+    directory is not writable).
+    """
+    fai_path = fasta_path + ".fai"
+    try:
+        if os.stat(fai_path).st_mtime_ns >= os.stat(fasta_path).st_mtime_ns:
+            return read_fai(fai_path)
+    except OSError:
+        pass
+    entries = build_fai(fasta_path, opener)
+    if write:
+        try:
+            write_fai(entries, fai_path)
+        except OSError:
+            pass
+    return entries
+
+
+class ContigView:
+    """A zero-copy view of one FASTA record inside a memory-mapped file.
+
+    ``view[a:b]`` returns the bases ``[a, b)`` as ``bytes`` without line
+    breaks; only that slice is read from the map.
+    """
+
+    __slots__ = ("_map", "entry")
+
+    def __init__(self, mapped, entry: FaiEntry):
+        self._map = mapped
+        self.entry = entry
+
+    @property
+    def name(self) -> str:
+        return self.entry.name
+
+    def __len__(self) -> int:
+        return self.entry.length
+
+    def _byte_offset(self, pos: int) -> int:
+        e = self.entry
+        if e.line_bases == 0:
+            return e.offset
+        line, col = divmod(pos, e.line_bases)
+        return e.offset + line * e.line_width + col
+
+    def __getitem__(self, key) -> bytes:
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("ContigView only supports contiguous slices")
+        start, stop, _ = key.indices(self.entry.length)
+        if stop <= start:
+            return b""
+        raw = self._map[self._byte_offset(start) : self._byte_offset(stop - 1) + 1]
+        if self.entry.line_width != self.entry.line_bases:
+            raw = raw.replace(b"\n", b"").replace(b"\r", b"")
+        return raw
+
+
+class FastaFile:
+    """Random access to the records of an indexed, memory-mapped FASTA file.
+
+    Use as a context manager, or call `close` when done.
+    """
+
+    def __init__(self, fasta_path: str, write_fai: bool = True):
+        self.path = fasta_path
+        self.entries = load_fai(fasta_path, write=write_fai)
+        self._fh = open(fasta_path, "rb")
+        size = os.fstat(self._fh.fileno()).st_size
+        self._map = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._by_name: Dict[str, FaiEntry] = {e.name: e for e in self.entries}
+
+    def __enter__(self) -> "FastaFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._fh.close()
+
+    def __iter__(self) -> Iterator[ContigView]:
+        for e in self.entries:
+            yield ContigView(self._map, e)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def contig(self, name: str) -> ContigView:
+        return ContigView(self._map, self._by_name[name])
+
+    def fetch(self, name: str, start: int = 0, stop: int = None) -> str:
+        """Return bases ``[start, stop)`` of record `name` as text."""
+        view = self.contig(name)
+        return view[start : len(view) if stop is None else stop].decode("ascii")
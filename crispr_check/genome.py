@@ -0,0 +1,339 @@
+"""2-bit packed genome representation and vectorized mismatch counting.
+
+Bases are stored four per byte (A=0, C=1, G=2, T=3), a quarter of the memory
+of a Python ``str``. Any other character (N, IUPAC codes, ...) is recorded in a
+run-length ambiguity mask that keeps the original character, so the text can
+be reconstructed exactly.
+
+Mismatches between a guide and many windows are counted at once: each window
+is packed into 64-bit words (32 bases per word), XOR-ed with the packed guide
+and the differing 2-bit lanes are popcounted.
+"""
+import os
+from itertools import combinations, product
+from typing import Tuple, Union
+
+import numpy as np
+
+BASES = b"ACGT"
+AMBIGUOUS = 255
+BASES_PER_WORD = 32
+
+# ASCII byte -> 2-bit code; everything outside ACGT maps to AMBIGUOUS
+CODE = np.full(256, AMBIGUOUS, dtype=np.uint8)
+for _i, _b in enumerate(BASES):
+    CODE[_b] = _i
+
+_DECODE = np.frombuffer(BASES, dtype=np.uint8)
+_LANE_LOW_BITS = np.uint64(0x5555555555555555)
+_SHIFTS = np.array([0, 2, 4, 6], dtype=np.uint8)
+# (shift, mask) steps that squeeze the low bit of every 2-bit lane into a
+# contiguous 32-bit position mask
+_COMPACT_STEPS = [
+    (np.uint64(1), np.uint64(0x3333333333333333)),
+    (np.uint64(2), np.uint64(0x0F0F0F0F0F0F0F0F)),
+    (np.uint64(4), np.uint64(0x00FF00FF00FF00FF)),
+    (np.uint64(8), np.uint64(0x0000FFFF0000FFFF)),
+    (np.uint64(16), np.uint64(0x00000000FFFFFFFF)),
+]
+
+# upper-case complement matching Bio.Seq.reverse_complement, as a str
+# translation table and as a byte lookup table
+_COMPLEMENT = str.maketrans("ABCDGHKMRTUVY", "TVGHCDMKYAABR")
+COMPLEMENT = np.arange(256, dtype=np.uint8)
+for _a, _b in zip(b"ABCDGHKMRTUVY", b"TVGHCDMKYAABR"):
+    COMPLEMENT[_a] = _b
+
+
+def reverse_complement(seq: str) -> str:
+    """Reverse complement of an upper-case sequence, as Bio.Seq would return it."""
+    return seq.translate(_COMPLEMENT)[::-1]
+
+
+def popcount(x: np.ndarray) -> np.ndarray:
+    """Number of set bits per element of a uint64 array."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x).astype(np.int64)
+    # NumPy < 2.0: count per byte through a lookup table
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.int64)
+    as_bytes = np.ascontiguousarray(x).view(np.uint8).reshape(x.shape + (8,))
+    return table[as_bytes].sum(axis=-1)
+
+
+class PackedSequence:
+    """A sequence stored at 2 bits per base plus a run-length ambiguity mask."""
+
+    __slots__ = ("name", "length", "packed", "amb_starts", "amb_ends", "amb_chars")
+
+    def __init__(self, name: str, length: int, packed: np.ndarray, amb_starts: np.ndarray, amb_ends: np.ndarray, amb_chars: np.ndarray):
+        self.name = name
+        self.length = length
+        self.packed = packed
+        self.amb_starts = amb_starts
+        self.amb_ends = amb_ends
+        self.amb_chars = amb_chars
+
+    @classmethod
+    def from_text(cls, name: str, seq: Union[str, bytes]) -> "PackedSequence":
+        """Pack an upper-case sequence."""
+        builder = PackedBuilder(name)
+        builder.append(seq)
+        return builder.finish()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def codes(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """Unpacked 2-bit codes for ``[start, stop)``; ambiguous bases read as 0."""
+        stop = self.length if stop is None else min(stop, self.length)
+        if stop <= start:
+            return np.zeros(0, dtype=np.uint8)
+        first = start // 4
+        block = self.packed[first : -(-stop // 4)]
+        unpacked = ((block[:, None] >> _SHIFTS) & 3).reshape(-1)
+        return unpacked[start - 4 * first : stop - 4 * first]
+
+    def codes_at(self, positions: np.ndarray) -> np.ndarray:
+        """2-bit codes at arbitrary positions, read straight from the packed bytes."""
+        positions = np.asarray(positions, dtype=np.int64)
+        return (self.packed[positions >> 2] >> ((positions & 3) << 1).astype(np.uint8)) & 3
+
+    def is_ambiguous(self, starts: np.ndarray, length: int) -> np.ndarray:
+        """For each window ``[s, s + length)``, whether it overlaps the ambiguity mask."""
+        starts = np.asarray(starts, dtype=np.int64)
+        if not len(self.amb_starts):
+            return np.zeros(len(starts), dtype=bool)
+        k = np.searchsorted(self.amb_ends, starts, side="right")
+        hit = k < len(self.amb_starts)
+        out = np.zeros(len(starts), dtype=bool)
+        out[hit] = self.amb_starts[k[hit]] < starts[hit] + length
+        return out
+
+    def ascii(self, start: int = 0, stop: int = None) -> np.ndarray:
+        """The original bases of ``[start, stop)`` as a uint8 array of ASCII codes."""
+        stop = self.length if stop is None else min(stop, self.length)
+        raw = _DECODE[self.codes(start, stop)]
+        lo = np.searchsorted(self.amb_ends, start, side="right")
+        hi = np.searchsorted(self.amb_starts, stop, side="left")
+        for a, b, c in zip(self.amb_starts[lo:hi], self.amb_ends[lo:hi], self.amb_chars[lo:hi]):
+            raw[max(a, start) - start : min(b, stop) - start] = c
+        return raw
+
+    def text(self, start: int = 0, stop: int = None) -> str:
+        """Reconstruct the original text for ``[start, stop)``."""
+        return self.ascii(start, stop).tobytes().decode("ascii")
+
+    def slice(self, start: int = 0, stop: int = None, name: str = None) -> "PackedSequence":
+        """Bases ``[start, stop)`` as a new in-memory `PackedSequence`, without decoding to text."""
+        stop = self.length if stop is None else min(stop, self.length)
+        start = max(0, min(start, stop))
+        lo = np.searchsorted(self.amb_ends, start, side="right")
+        hi = np.searchsorted(self.amb_starts, stop, side="left")
+        amb_starts = np.maximum(self.amb_starts[lo:hi], start) - start
+        amb_ends = np.minimum(self.amb_ends[lo:hi], stop) - start
+        # an empty slice can still touch a run
+        keep = amb_ends > amb_starts
+        return PackedSequence(self.name if name is None else name, stop - start, _pack_codes(self.codes(start, stop)), amb_starts[keep].astype(np.int64), amb_ends[keep].astype(np.int64), np.array(self.amb_chars[lo:hi][keep], dtype=np.uint8))
+
+
+PACKED_FIELDS = ("packed", "amb_starts", "amb_ends", "amb_chars")
+
+
+def save_packed(seq: PackedSequence, out_dir: str) -> None:
+    """Write the arrays of `seq` to ``<field>.npy`` files in `out_dir`."""
+    for field in PACKED_FIELDS:
+        np.save(os.path.join(out_dir, f"{field}.npy"), getattr(seq, field))
+
+
+def load_packed(path: str, length: int, name: str = "") -> PackedSequence:
+    """Memory-map a sequence of `length` bases written by `save_packed`."""
+    return PackedSequence(name, length, *(np.load(os.path.join(path, f"{field}.npy"), mmap_mode="r") for field in PACKED_FIELDS))
+
+
+class PackedBuilder:
+    """Packs sequences one after another into a single `PackedSequence`.
+
+    Only the packed bytes and ambiguity runs so far are kept, plus up to
+    three bases that do not fill a byte yet, so records can be read, packed
+    and dropped one at a time.
+    """
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.length = 0
+        self._packed = []
+        self._carry = np.zeros(0, dtype=np.uint8)
+        self._runs = []
+
+    def append(self, seq: Union[str, bytes, PackedSequence]) -> None:
+        """Append an upper-case sequence or a `PackedSequence`."""
+        if isinstance(seq, PackedSequence):
+            codes = seq.codes()
+            self._runs.append((seq.amb_starts + self.length, seq.amb_ends + self.length, seq.amb_chars))
+        else:
+            if isinstance(seq, str):
+                seq = seq.encode("ascii")
+            raw = np.frombuffer(seq, dtype=np.uint8)
+            codes = CODE[raw]
+            amb = np.flatnonzero(codes == AMBIGUOUS)
+            if len(amb):
+                chars = raw[amb]
+                # a new run starts wherever positions stop being contiguous or
+                # the ambiguous character changes
+                brk = np.flatnonzero((np.diff(amb) != 1) | (np.diff(chars) != 0)) + 1
+                run_first = np.concatenate(([0], brk))
+                run_last = np.concatenate((brk - 1, [len(amb) - 1]))
+                self._runs.append((amb[run_first].astype(np.int64) + self.length, amb[run_last].astype(np.int64) + 1 + self.length, chars[run_first]))
+                codes[amb] = 0
+        self.length += len(codes)
+        if len(self._carry):
+            # complete the byte left open by the previous sequence first
+            head = np.concatenate((self._carry, codes[: 4 - len(self._carry)]))
+            codes = codes[4 - len(self._carry) :]
+            if len(head) < 4:
+                self._carry = head
+                return
+            self._packed.append(_pack_codes(head))
+        whole = len(codes) // 4 * 4
+        self._packed.append(_pack_codes(codes[:whole]))
+        self._carry = codes[whole:].copy()
+
+    def finish(self) -> PackedSequence:
+        packed = self._packed + [_pack_codes(self._carry)] if len(self._carry) else self._packed
+        starts, ends, chars = (np.concatenate([r[k] for r in self._runs]) if self._runs else np.zeros(0, dtype=np.int64 if k < 2 else np.uint8) for k in range(3))
+        if len(starts):
+            # runs of one character that meet across appended sequences are one run
+            joined = np.flatnonzero((starts[1:] == ends[:-1]) & (chars[1:] == chars[:-1])) + 1
+            if len(joined):
+                keep = np.ones(len(starts), dtype=bool)
+                keep[joined] = False
+                first = np.flatnonzero(keep)
+                last = np.concatenate((first[1:] - 1, [len(starts) - 1]))
+                starts, ends, chars = starts[first], ends[last], chars[first]
+        return PackedSequence(self.name, self.length, np.concatenate(packed) if packed else np.zeros(0, dtype=np.uint8), starts, ends, chars)
+
+
+def _pack_codes(codes: np.ndarray) -> np.ndarray:
+    # 2-bit codes -> bytes of four bases, low bits first; the last byte is
+    # zero-padded
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[: len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    return (quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)).astype(np.uint8)
+
+
+def pack_guide(guide: str) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Pack a guide into 64-bit words.
+
+    Returns ``(words, care, forced)``: the packed guide, a mask of the lanes that
+    hold ACGT bases, and the number of ambiguous guide bases, which mismatch
+    every ACGT target base.
+    """
+    codes = CODE[np.frombuffer(guide.encode("ascii"), dtype=np.uint8)]
+    n_words = max(1, -(-len(codes) // BASES_PER_WORD))
+    words = np.zeros(n_words, dtype=np.uint64)
+    care = np.zeros(n_words, dtype=np.uint64)
+    forced = 0
+    for p, c in enumerate(codes):
+        w, lane = divmod(p, BASES_PER_WORD)
+        if c == AMBIGUOUS:
+            forced += 1
+            continue
+        words[w] |= np.uint64(int(c) << (2 * lane))
+        care[w] |= np.uint64(3 << (2 * lane))
+    return words, care, forced
+
+
+def window_words(seq: PackedSequence, starts: np.ndarray, length: int, reverse: bool = False) -> np.ndarray:
+    """Pack each window ``[s, s + length)`` into a ``(len(starts), n_words)`` uint64 array.
+
+    With `reverse`, windows are packed as their reverse complement (the
+    guide-oriented minus-strand protospacer). A-T and C-G are complementary
+    codes (``3 - c``), so no reverse-complemented copy is needed.
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    n_words = max(1, -(-length // BASES_PER_WORD))
+    words = np.zeros((len(starts), n_words), dtype=np.uint64)
+    for p in range(length):
+        w, lane = divmod(p, BASES_PER_WORD)
+        if reverse:
+            c = 3 - seq.codes_at(starts + (length - 1 - p))
+        else:
+            c = seq.codes_at(starts + p)
+        words[:, w] |= c.astype(np.uint64) << np.uint64(2 * lane)
+    return words
+
+
+def ambiguous_mask(guide: str) -> int:
+    """Bitmask of the guide positions holding a non-ACGT character (bit p = position p)."""
+    codes = CODE[np.frombuffer(guide.encode("ascii"), dtype=np.uint8)]
+    return sum(1 << int(p) for p in np.flatnonzero(codes == AMBIGUOUS))
+
+
+def mismatch_lanes(windows: np.ndarray, guide_words: np.ndarray, care: np.ndarray) -> np.ndarray:
+    """Per row of `windows`, the low bit of every 2-bit lane that differs from the guide's ACGT bases."""
+    x = windows ^ guide_words
+    return (x | (x >> np.uint64(1))) & _LANE_LOW_BITS & care
+
+
+def count_mismatches(windows: np.ndarray, guide_words: np.ndarray, care: np.ndarray, forced: int = 0) -> np.ndarray:
+    """Mismatch count per row of `windows` against a guide packed by `pack_guide`."""
+    return popcount(mismatch_lanes(windows, guide_words, care)).sum(axis=1) + forced
+
+
+def lane_masks(lanes: np.ndarray) -> np.ndarray:
+    """Compress `mismatch_lanes` output to position masks: bit p of word w marks base ``32 * w + p``."""
+    x = lanes.copy()
+    for shift, keep in _COMPACT_STEPS:
+        x = (x | (x >> shift)) & keep
+    return x
+
+
+def qgram_codes(seq: PackedSequence, q: int) -> np.ndarray:
+    """Rolling 2-bit codes of every q-gram of `seq`: entry ``i`` encodes ``seq[i : i + q]``.
+
+    Codes use the lane layout of `window_words`; ambiguous bases read as A.
+    """
+    codes = seq.codes().astype(np.int64)
+    n = max(0, len(codes) - q + 1)
+    out = np.zeros(n, dtype=np.int64)
+    for j in range(q):
+        out |= codes[j : j + n] << (2 * j)
+    return out
+
+
+def seed_keys(seq: PackedSequence, starts: np.ndarray, length: int, seed_length: int, j: int, reverse: bool = False) -> np.ndarray:
+    """Key of the j-th guide-oriented seed of every window, in `window_words` layout."""
+    starts = np.asarray(starts, dtype=np.int64)
+    if reverse:
+        # seed j of a minus-strand target is the reverse complement of the
+        # forward bases ending j seeds before the window end
+        return window_words(seq, starts + length - (j + 1) * seed_length, seed_length, reverse=True)[:, 0]
+    return window_words(seq, starts + j * seed_length, seed_length)[:, 0]
+
+
+def seed_neighbourhood(seed: str, radius: int) -> np.ndarray:
+    """Return the keys of every ACGT k-mer within `radius` substitutions of `seed`.
+
+    Keys use the lane layout of `window_words`. Ambiguous guide bases never
+    equal an ACGT target base, so they are always substituted and count
+    against the radius.
+    """
+    codes = [int(c) for c in CODE[np.frombuffer(seed.encode("ascii"), dtype=np.uint8)]]
+    forced = [p for p, c in enumerate(codes) if c == AMBIGUOUS]
+    free = [p for p, c in enumerate(codes) if c != AMBIGUOUS]
+    if len(forced) > radius:
+        return np.zeros(0, dtype=np.uint64)
+    keys = set()
+    for extra in range(0, radius - len(forced) + 1):
+        for chosen in combinations(free, extra):
+            positions = forced + list(chosen)
+            choices = []
+            for p in positions:
+                choices.append([c for c in range(4) if c != codes[p]])
+            for subst in product(*choices):
+                variant = list(codes)
+                for p, c in zip(positions, subst):
+                    variant[p] = c
+                keys.add(sum(c << (2 * p) for p, c in enumerate(variant)))
+    return np.array(sorted(keys), dtype=np.uint64)
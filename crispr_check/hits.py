@@ -0,0 +1,261 @@
+"""Columnar hit storage and result file formats.
+
+A `HitTable` holds a block of hits column by column instead of one dict per
+hit: integers and scores in NumPy arrays, record and guide ids (few distinct
+values) as integer codes into a list of names, target and alignment strings
+as fixed-width byte arrays, and mismatch positions as one flat array with
+per-hit offsets. A hit costs tens of bytes this way instead of the ~1 KB of
+a dict holding a list.
+
+Results are written as CSV (the default), gzip-compressed TSV, Parquet or
+Arrow IPC (Feather v2). Parquet and Arrow need the optional `pyarrow`
+package; they store mismatch positions as integer lists, so nothing has to
+be re-parsed when the file is loaded again (see `read_results`).
+"""
+import csv
+import gzip
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+FORMATS = ("csv", "tsv.gz", "parquet", "arrow")
+
+# hits converted to a table and written at a time
+DEFAULT_BLOCK_SIZE = 65_536
+
+_INT_FIELDS = {"start": np.int64, "end": np.int64, "mismatches": np.int16, "dna_bulges": np.int16, "rna_bulges": np.int16}
+_CODED_FIELDS = {"guide_id", "seq_id", "strand"}
+_POSITIONS = "mismatch_positions"
+
+
+def _is_score(name: str) -> bool:
+    return name == "score" or name.startswith("score_")
+
+
+class HitTable:
+    """A block of hits with the given `fields`, stored column by column.
+
+    Build one with `from_rows`; iterating yields the hits back as dicts with
+    the same values. Fields missing from some hits are stored as plain
+    object columns and come back as None.
+    """
+
+    __slots__ = ("fields", "_columns", "_names", "_offsets", "_n")
+
+    def __init__(self, fields: Sequence[str], columns: Dict[str, np.ndarray], names: Dict[str, List[str]], offsets: Optional[np.ndarray], n: int):
+        self.fields = list(fields)
+        self._columns = columns
+        self._names = names
+        self._offsets = offsets
+        self._n = n
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict], fields: Sequence[str]) -> "HitTable":
+        rows = rows if isinstance(rows, list) else list(rows)
+        columns, names, offsets = {}, {}, None
+        for name in fields:
+            values = [r.get(name) for r in rows]
+            if any(v is None for v in values):
+                columns[name] = np.array(values, dtype=object)
+            elif name == _POSITIONS:
+                offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+                np.cumsum([len(v) for v in values], out=offsets[1:])
+                columns[name] = np.fromiter((p for v in values for p in v), dtype=np.int16, count=int(offsets[-1]))
+            elif name in _INT_FIELDS:
+                columns[name] = np.array(values, dtype=_INT_FIELDS[name])
+            elif _is_score(name):
+                columns[name] = np.array(values, dtype=np.float64)
+            elif values and all(isinstance(v, (int, np.integer)) and not isinstance(v, bool) for v in values):
+                columns[name] = np.array(values, dtype=np.int64)
+            elif values and all(isinstance(v, (float, np.floating)) for v in values):
+                columns[name] = np.array(values, dtype=np.float64)
+            elif name in _CODED_FIELDS:
+                distinct = {}
+                codes = np.array([distinct.setdefault(v, len(distinct)) for v in values], dtype=np.int32)
+                columns[name], names[name] = codes, list(distinct)
+            else:
+                columns[name] = np.array([v.encode("ascii") for v in values], dtype=bytes)
+        return cls(fields, columns, names, offsets, len(rows))
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays."""
+        return sum(c.nbytes for c in self._columns.values()) + (self._offsets.nbytes if self._offsets is not None else 0)
+
+    def column(self, name: str) -> list:
+        """The values of field `name` as a list of Python objects."""
+        col = self._columns[name]
+        if col.dtype == object:
+            return col.tolist()
+        if name == _POSITIONS:
+            flat = col.tolist()
+            bounds = self._offsets.tolist()
+            return [flat[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+        if name in self._names:
+            labels = self._names[name]
+            return [labels[c] for c in col.tolist()]
+        if col.dtype.kind == "S":
+            return [v.decode("ascii") for v in col.tolist()]
+        return col.tolist()
+
+    def __iter__(self) -> Iterator[Dict]:
+        columns = [self.column(name) for name in self.fields]
+        for values in zip(*columns):
+            yield dict(zip(self.fields, values))
+
+    def to_arrow(self):
+        """The table as a `pyarrow.RecordBatch`."""
+        import pyarrow as pa
+
+        arrays = []
+        for name in self.fields:
+            col = self._columns[name]
+            if col.dtype == object:
+                arrays.append(pa.array(col.tolist()))
+            elif name == _POSITIONS:
+                arrays.append(pa.ListArray.from_arrays(pa.array(self._offsets.astype(np.int32)), pa.array(col)))
+            elif name in self._names or col.dtype.kind == "S":
+                # plain strings: Parquet dictionary-encodes them itself, and
+                # an Arrow IPC file allows one dictionary per column only
+                arrays.append(pa.array(self.column(name), type=pa.string()))
+            else:
+                arrays.append(pa.array(col))
+        return pa.RecordBatch.from_arrays(arrays, names=self.fields)
+
+
+def iter_tables(rows: Iterable[Dict], fields: Sequence[str], block_size: int = DEFAULT_BLOCK_SIZE) -> Iterator[HitTable]:
+    """Group a stream of hit dicts into tables of at most `block_size` hits."""
+    block = []
+    for r in rows:
+        block.append(r)
+        if len(block) >= block_size:
+            yield HitTable.from_rows(block, fields)
+            block = []
+    if block:
+        yield HitTable.from_rows(block, fields)
+
+
+def format_from_path(path: str) -> str:
+    """Output format implied by a file name: ``.parquet``, ``.arrow``/``.feather``, ``.tsv.gz``, else CSV."""
+    lower = path.lower()
+    if lower.endswith(".parquet"):
+        return "parquet"
+    if lower.endswith((".arrow", ".feather", ".ipc")):
+        return "arrow"
+    if lower.endswith(".tsv.gz"):
+        return "tsv.gz"
+    return "csv"
+
+
+def _write_delimited(path: str, tables: Iterable[HitTable], fields: Sequence[str], opener: Callable, delimiter: str, positions: Callable) -> int:
+    count = 0
+    with opener(path, "wt", newline="") as fh:
+        writer = csv.writer(fh, delimiter=delimiter)
+        writer.writerow(fields)
+        for table in tables:
+            columns = [table.column(name) for name in fields]
+            if _POSITIONS in fields:
+                i = fields.index(_POSITIONS)
+                columns[i] = [positions(p) for p in columns[i]]
+            writer.writerows(zip(*columns))
+            count += len(table)
+    return count
+
+
+def _write_arrow(path: str, tables: Iterable[HitTable], fmt: str) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(f"--format {fmt} requires the optional 'pyarrow' package") from e
+    count = 0
+    writer = None
+    try:
+        for table in tables:
+            batch = table.to_arrow()
+            if writer is None:
+                writer = pa.parquet.ParquetWriter(path, batch.schema) if fmt == "parquet" else pa.ipc.new_file(path, batch.schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+            if fmt == "parquet":
+                writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            count += len(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def write_hits(path: str, rows: Iterable[Dict], fields: Sequence[str], fmt: str = "csv", block_size: int = DEFAULT_BLOCK_SIZE) -> int:
+    """Write hit dicts (consumed lazily, `block_size` at a time) to `path` in format `fmt`; returns the count.
+
+    CSV writes mismatch positions as a list literal (``[3, 17]``), TSV as
+    comma-separated integers (``3,17``).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown output format '{fmt}' (expected one of: {', '.join(FORMATS)})")
+    fields = list(fields)
+    tables = iter_tables(rows, fields, block_size)
+    if fmt == "csv":
+        return _write_delimited(path, tables, fields, open, ",", str)
+    if fmt == "tsv.gz":
+        return _write_delimited(path, tables, fields, gzip.open, "\t", lambda p: ",".join(map(str, p)))
+    # an empty result still gets a typed schema
+    first = next(tables, None) or HitTable.from_rows([], fields)
+    return _write_arrow(path, _chain(first, tables), fmt)
+
+
+def _chain(first: HitTable, rest: Iterator[HitTable]) -> Iterator[HitTable]:
+    yield first
+    yield from rest
+
+
+def _sniff(path: str) -> str:
+    with open(path, "rb") as fh:
+        head = fh.read(6)
+    if head[:4] == b"PAR1":
+        return "parquet"
+    if head == b"ARROW1":
+        return "arrow"
+    if head[:2] == b"\x1f\x8b":
+        return "tsv.gz"
+    return "csv"
+
+
+def result_columns(path: str) -> List[str]:
+    """Column names of a results file in any of `FORMATS`, read from its header or schema only."""
+    fmt = _sniff(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+    if fmt == "arrow":
+        import pyarrow.ipc
+
+        with pyarrow.ipc.open_file(path) as reader:
+            return reader.schema.names
+    with (gzip.open(path, "rt", newline="") if fmt == "tsv.gz" else open(path, newline="")) as fh:
+        return next(csv.reader(fh, delimiter="\t" if fmt == "tsv.gz" else ","), [])
+
+
+def read_results(path: str, columns: Sequence[str] = None):
+    """Load a results file in any of `FORMATS` (detected from its contents) as a pandas DataFrame.
+
+    Only `columns` are read, if given; Parquet and Arrow files skip the
+    other columns entirely.
+    """
+    import pandas as pd
+
+    columns = list(columns) if columns is not None else None
+    fmt = _sniff(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    if fmt == "arrow":
+        return pd.read_feather(path, columns=columns)
+    if fmt == "tsv.gz":
+        return pd.read_csv(path, sep="\t", compression="gzip", usecols=columns)
+    return pd.read_csv(path, usecols=columns)
@@ -0,0 +1,197 @@
+"""Persistent seed index for genome-wide off-target search.
+
+An index is built once per genome, PAM and protospacer length. Every
+PAM-adjacent protospacer on both strands is recorded, keyed by the 2-bit
+codes of its non-overlapping seed k-mers. The arrays are stored as ``.npy``
+files in a directory and memory-mapped at search time, so a search only
+touches the windows that share a seed with the guide.
+
+Searches use the pigeonhole principle: with ``s`` disjoint seeds and at most
+``k`` mismatches, at least one seed carries no more than ``k // s``
+mismatches. Each guide seed is expanded to its Hamming neighbourhood of that
+radius, the matching windows are looked up, and candidates are verified
+against the stored sequence. The hits are identical to
+`search.scan_fasta_for_guide` on the same FASTA.
+"""
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+
+from . import genome
+from .catalog import file_stamp, genome_checksum
+from .search import iter_records, mask_positions, pam_windows, verify_windows
+
+INDEX_VERSION = 2
+DEFAULT_SEED_LENGTH = 10
+
+STRANDS = ("plus", "minus")
+
+class StaleIndexError(ValueError):
+    """The index was built from another FASTA, or an older version of it."""
+
+
+def build_index(fasta_path: str, out_dir: str, pam: str = "NGG", guide_length: int = 20, seed_length: int = DEFAULT_SEED_LENGTH) -> Dict:
+    """Build a seed index for `fasta_path` and write it to `out_dir`.
+
+    Returns the index metadata dict (also written to ``meta.json``).
+    """
+    if guide_length <= 0:
+        raise ValueError("guide_length must be positive")
+    if not 0 < seed_length <= genome.BASES_PER_WORD - 1:
+        raise ValueError("seed_length must be between 1 and 31")
+    pam = pam.upper()
+    L = guide_length
+    n_seeds = L // seed_length
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = file_stamp(fasta_path)
+
+    records = []
+    starts = {s: [] for s in STRANDS}
+    offset = 0
+    # records are packed one by one into a single sequence; windows never
+    # span two records because they are enumerated per record
+    builder = genome.PackedBuilder()
+    for seq_id, n, read in iter_records(fasta_path):
+        seq = read(0, n)
+        builder.append(seq)
+        if isinstance(seq, genome.PackedSequence):
+            # .2bit records
+            seq = seq.text()
+        records.append({"id": seq_id, "offset": offset, "length": n})
+        # minus-strand windows are stored by their forward-strand start, in
+        # the order the scanner reports them (increasing rc coordinate)
+        plus, minus = pam_windows(seq, L, pam)
+        starts["plus"].append(plus + offset)
+        starts["minus"].append(minus + offset)
+        offset += n
+        # drop the record's text before the next one is read
+        del seq
+    seq = builder.finish()
+    del builder
+    genome.save_packed(seq, out_dir)
+    for strand in STRANDS:
+        st = np.concatenate(starts[strand]) if starts[strand] else np.zeros(0, dtype=np.int64)
+        np.save(os.path.join(out_dir, f"{strand}_starts.npy"), st)
+        keys = np.zeros((n_seeds, len(st)), dtype=np.uint64)
+        sites = np.zeros((n_seeds, len(st)), dtype=np.int64)
+        for j in range(n_seeds):
+            k = genome.seed_keys(seq, st, L, seed_length, j, reverse=strand == "minus")
+            order = np.argsort(k, kind="stable")
+            keys[j] = k[order]
+            sites[j] = st[order]
+        np.save(os.path.join(out_dir, f"{strand}_seed_keys.npy"), keys)
+        np.save(os.path.join(out_dir, f"{strand}_seed_sites.npy"), sites)
+        # seed keys read ambiguous bases as A, so windows touching the
+        # ambiguity mask are always verified
+        np.save(os.path.join(out_dir, f"{strand}_ambiguous.npy"), st[seq.is_ambiguous(st, L)])
+
+    meta = {
+        "version": INDEX_VERSION,
+        "pam": pam,
+        "guide_length": L,
+        "seed_length": seed_length,
+        "length": seq.length,
+        "checksum": genome_checksum(fasta_path),
+        "fasta": stamp,
+        "records": records,
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, indent=2)
+    return meta
+
+
+class SeedIndex:
+    """A memory-mapped seed index written by `build_index`.
+
+    With `fasta_path`, check that the index was built from that FASTA and
+    raise `StaleIndexError` otherwise. As for PAM catalogs, the FASTA is only
+    re-hashed when its size or modification time differ from those recorded
+    at build time.
+    """
+
+    def __init__(self, path: str, fasta_path: str = None):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"unsupported index version {meta.get('version')!r} in {path}")
+        if fasta_path is not None:
+            if "checksum" not in meta:
+                raise StaleIndexError(f"{path}: the index does not record the FASTA it was built from; rebuild it")
+            if file_stamp(fasta_path) != meta["fasta"] and genome_checksum(fasta_path) != meta["checksum"]:
+                raise StaleIndexError(f"{path}: FASTA {fasta_path} is not the one the index was built from, or has changed since")
+        self.path = path
+        self.meta = meta
+        self.pam = meta["pam"]
+        self.guide_length = meta["guide_length"]
+        self.seed_length = meta["seed_length"]
+        self.records = meta["records"]
+        self._record_offsets = np.array([r["offset"] for r in self.records], dtype=np.int64)
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")
+
+        self.seq = genome.load_packed(path, meta["length"])
+        self.starts = {s: load(f"{s}_starts.npy") for s in STRANDS}
+        self.seed_keys = {s: load(f"{s}_seed_keys.npy") for s in STRANDS}
+        self.seed_sites = {s: load(f"{s}_seed_sites.npy") for s in STRANDS}
+        self.ambiguous = {s: load(f"{s}_ambiguous.npy") for s in STRANDS}
+
+    def _candidates(self, guide: str, strand: str, max_mismatches: int) -> np.ndarray:
+        keys = self.seed_keys[strand]
+        n_seeds = keys.shape[0]
+        if n_seeds == 0:
+            return np.asarray(self.starts[strand])
+        radius = max_mismatches // n_seeds
+        q = self.seed_length
+        found = [np.asarray(self.ambiguous[strand])]
+        for j in range(n_seeds):
+            wanted = genome.seed_neighbourhood(guide[j * q : (j + 1) * q], radius)
+            if not len(wanted):
+                continue
+            row = keys[j]
+            lo = np.searchsorted(row, wanted, side="left")
+            hi = np.searchsorted(row, wanted, side="right")
+            sites = self.seed_sites[strand][j]
+            for a, b in zip(lo, hi):
+                if b > a:
+                    found.append(np.asarray(sites[a:b]))
+        return np.unique(np.concatenate(found))
+
+    def search(self, guide: str, max_mismatches: int = 4) -> List[Dict]:
+        """Return the same hit dicts as `search.scan_fasta_for_guide` would."""
+        guide = guide.upper()
+        L = len(guide)
+        if L != self.guide_length:
+            raise ValueError(f"index was built for {self.guide_length}-nt protospacers, got a {L}-nt guide")
+        rows = []
+        for strand_idx, strand in enumerate(STRANDS):
+            cand = self._candidates(guide, strand, max_mismatches)
+            for start, target, mask, _ in verify_windows(self.seq, guide, cand, max_mismatches, reverse=strand == "minus"):
+                rows.append((start, strand_idx, target, mask_positions(mask)))
+
+        ordered = []
+        for start, strand_idx, target, mism_pos in rows:
+            rec_idx = int(np.searchsorted(self._record_offsets, start, side="right")) - 1
+            rec = self.records[rec_idx]
+            local = start - rec["offset"]
+            hit = {
+                "seq_id": rec["id"],
+                "start": local,
+                "end": local + L - 1,
+                "strand": "+" if strand_idx == 0 else "-",
+                "target_seq": target,
+                "mismatches": len(mism_pos),
+                "mismatch_positions": mism_pos,
+            }
+            # scanner order: per record, plus strand ascending, then minus
+            # strand in reverse-complement order (descending forward start)
+            ordered.append(((rec_idx, strand_idx, local if strand_idx == 0 else -local), hit))
+        ordered.sort(key=lambda item: item[0])
+        return [hit for _, hit in ordered]
+
+
+def load_index(path: str, fasta_path: str = None) -> SeedIndex:
+    """Open a seed index directory written by `build_index`, checked against `fasta_path` if given."""
+    return SeedIndex(path, fasta_path)
@@ -0,0 +1,166 @@
+"""Per-stage profiling of a search run.
+
+A search streams hits from the scan through scoring and sorting into the
+writer, so its stages interleave. `Profiler` keeps a stack of active stages
+and charges elapsed wall time, CPU time (of the calling thread) and peak
+traced memory to the innermost one: wrapping each stage's iterator with
+`Profiler.iterate` makes every stage's numbers exclusive of the stages it
+pulls from. Peak memory is the largest amount of memory traced by
+`tracemalloc` while the stage was active, for the main process only.
+
+The scan reports its own breakdown (``read``, ``pam``, ``prefilter``,
+``verify``, ``bulges``) and counters through the `stats` dict of
+`search.scan_fasta_for_guide`; `Profiler.report` combines both.
+"""
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional
+
+# search stages in pipeline order, for reports
+STAGES = ("setup", "scan", "scoring", "sorting", "writing")
+
+_COUNTERS = ("bases", "windows", "pam_sites", "candidates", "prefiltered", "verified", "hits")
+
+
+def _max_rss_bytes(children: bool = False) -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        # not available on Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class Profiler:
+    """Wall time, CPU time and peak memory per pipeline stage.
+
+    A disabled profiler does nothing: `iterate` returns its argument and
+    `stage` is an empty context, so callers need not check.
+    """
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = True):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._stack = []
+        self._started_tracing = False
+
+    def start(self, stage: str = "setup") -> None:
+        """Start timing, with `stage` active until another is entered."""
+        if not self.enabled:
+            return
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._t0 = self._wall = time.perf_counter()
+        self._c0 = self._cpu = time.thread_time()
+        self._stack = [stage]
+
+    def stop(self) -> None:
+        """Charge the time so far and stop tracing memory."""
+        if not self.enabled or not self._stack:
+            return
+        self._charge()
+        self._stack = []
+        self._elapsed = (time.perf_counter() - self._t0, time.thread_time() - self._c0)
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _charge(self) -> None:
+        wall, cpu = time.perf_counter(), time.thread_time()
+        entry = self.stages.setdefault(self._stack[-1], {"wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_bytes": 0})
+        entry["wall_seconds"] += wall - self._wall
+        entry["cpu_seconds"] += cpu - self._cpu
+        if self.trace_memory:
+            entry["peak_bytes"] = max(entry["peak_bytes"], tracemalloc.get_traced_memory()[1])
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+        self._wall, self._cpu = wall, cpu
+
+    def _enter(self, stage: str) -> None:
+        self._charge()
+        self._stack.append(stage)
+
+    def _exit(self) -> None:
+        self._charge()
+        self._stack.pop()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Charge the time spent in the ``with`` body to stage `name`."""
+        if not self.enabled:
+            yield
+            return
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def iterate(self, name: str, items: Iterable) -> Iterable:
+        """Wrap `items` so that the time spent producing each item is charged to stage `name`."""
+        if not self.enabled:
+            return items
+        return self._iterate(name, iter(items))
+
+    def _iterate(self, name: str, items: Iterator) -> Iterator:
+        while True:
+            self._enter(name)
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                self._exit()
+            yield item
+
+    def report(self, scan_stats: Optional[Dict] = None) -> Dict:
+        """The measurements as a JSON-serialisable dict, with the scan's counters and stages from `scan_stats`."""
+        scan_stats = scan_stats or {}
+        wall, cpu = getattr(self, "_elapsed", (0.0, 0.0))
+        counters = {k: scan_stats.get(k, 0) for k in _COUNTERS}
+        counters["bases_per_second"] = counters["bases"] / wall if wall > 0 else 0.0
+        return {
+            "total": {
+                "wall_seconds": wall,
+                "cpu_seconds": cpu,
+                "max_rss_bytes": _max_rss_bytes(),
+                "children_max_rss_bytes": _max_rss_bytes(children=True),
+            },
+            "stages": {name: self.stages[name] for name in sorted(self.stages, key=lambda n: STAGES.index(n) if n in STAGES else len(STAGES))},
+            "scan_stages": {name: {"wall_seconds": w, "cpu_seconds": c} for name, (w, c) in scan_stats.get("stages", {}).items()},
+            "counters": counters,
+            "contigs": scan_stats.get("contigs", {}),
+        }
+
+
+def format_report(report: Dict) -> str:
+    """A plain-text table of `Profiler.report` output, for stderr."""
+    lines = [f"{'stage':<12} {'wall s':>9} {'cpu s':>9} {'peak MiB':>9}"]
+    for name, st in report["stages"].items():
+        lines.append(f"{name:<12} {st['wall_seconds']:>9.3f} {st['cpu_seconds']:>9.3f} {st['peak_bytes'] / (1 << 20):>9.1f}")
+        if name == "scan":
+            # the scan's own breakdown, summed over worker processes
+            for sub, sst in report["scan_stages"].items():
+                lines.append(f"{'  ' + sub:<12} {sst['wall_seconds']:>9.3f} {sst['cpu_seconds']:>9.3f} {'':>9}")
+    total = report["total"]
+    rss = f"{total['max_rss_bytes'] / (1 << 20):>9.1f} (max RSS)" if total["max_rss_bytes"] is not None else ""
+    lines.append(f"{'total':<12} {total['wall_seconds']:>9.3f} {total['cpu_seconds']:>9.3f} {rss}".rstrip())
+    counters = report["counters"]
+    lines.append(", ".join(f"{k}={counters[k]}" for k in _COUNTERS) + f", bases/s={counters['bases_per_second']:.0f}")
+    for seq_id, c in report["contigs"].items():
+        lines.append(f"  {seq_id}: {c['bases']} bp, {c['windows']} windows, {c['verified']} verified, {c['hits']} hits, {c['bases_per_second']:.0f} bp/s")
+    return "\n".join(lines)
+
+
+def write_report(report: Dict, path: str) -> None:
+    """Write `Profiler.report` output to `path` as JSON."""
+    with open(path, "w") as fh:
+        json.dump(report, fh, indent=2)
+        fh.write("\n")
@@ -0,0 +1,476 @@
+"""Genome input beyond plain FASTA: gzip, BGZF and UCSC ``.2bit``.
+
+`detect_format` tells the formats apart by their magic bytes, whatever the
+file is called, and `iter_records` yields ``(seq_id, length, read)`` for each
+record as `search` expects:
+
+* gzip-compressed FASTA is decompressed as a stream, one record at a time.
+* BGZF-compressed FASTA (``bgzip``) is read with random access, like
+  `fasta.FastaFile`: a ``.fai`` of the uncompressed text locates each
+  record, and the ``.gzi`` block index maps uncompressed offsets to the
+  compressed blocks holding them, so a slice only decompresses its own
+  blocks. Both indexes are read from next to the file (as written by
+  ``samtools faidx``) or built and saved there.
+* ``.2bit`` sequence bytes are translated straight into
+  `genome.PackedSequence` (``read`` returns one instead of text), N blocks
+  becoming its ambiguity mask; soft-masking is ignored, as every reader
+  upper-cases.
+
+`prefetch` runs a generator in a background thread; scanning uses it for
+these formats so decompression overlaps with the scan (zlib releases the
+GIL while it inflates).
+"""
+import gzip
+import mmap
+import os
+import queue
+import struct
+import threading
+import zlib
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, TypeVar
+
+import numpy as np
+
+from . import fasta, genome
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_TWOBIT_MAGIC = 0x1A412743
+
+# chunk tasks read ahead of the scan for compressed input
+DEFAULT_PREFETCH = 2
+
+T = TypeVar("T")
+
+
+class BgzfError(ValueError):
+    """The file is not valid BGZF, or its ``.gzi`` index is malformed."""
+
+
+class TwoBitError(ValueError):
+    """The file is not a valid ``.2bit`` file."""
+
+
+def detect_format(path: str) -> str:
+    """One of ``"fasta"``, ``"gzip"``, ``"bgzf"`` or ``"2bit"``, from the file's first bytes."""
+    with open(path, "rb") as fh:
+        head = fh.read(18)
+    if len(head) >= 4 and _TWOBIT_MAGIC in (struct.unpack("<I", head[:4])[0], struct.unpack(">I", head[:4])[0]):
+        return "2bit"
+    if head[:2] == _GZIP_MAGIC:
+        # BGZF blocks are gzip members with a 'BC' extra subfield
+        if len(head) >= 18 and head[3] & 4 and head[12:14] == b"BC":
+            return "bgzf"
+        return "gzip"
+    return "fasta"
+
+
+def is_compressed(path: str) -> bool:
+    return detect_format(path) != "fasta"
+
+
+# BGZF ----------------------------------------------------------------------
+
+
+def _block_size(header: bytes, extra: bytes) -> int:
+    """Total size of the BGZF block whose 12-byte header and extra field are given."""
+    if header[:2] != _GZIP_MAGIC or not header[3] & 4:
+        raise BgzfError("not a BGZF block")
+    pos = 0
+    while pos + 4 <= len(extra):
+        sub_len = struct.unpack("<H", extra[pos + 2 : pos + 4])[0]
+        if extra[pos : pos + 2] == b"BC" and sub_len == 2:
+            return struct.unpack("<H", extra[pos + 4 : pos + 6])[0] + 1
+        pos += 4 + sub_len
+    raise BgzfError("BGZF block without a BC subfield")
+
+
+def _read_block(fh) -> Tuple[bytes, int]:
+    """Decompress the block at the current position; returns ``(data, compressed_size)``."""
+    header = fh.read(12)
+    if len(header) < 12:
+        raise BgzfError("truncated BGZF block header")
+    xlen = struct.unpack("<H", header[10:12])[0]
+    extra = fh.read(xlen)
+    size = _block_size(header, extra)
+    body = fh.read(size - 12 - xlen)
+    data = zlib.decompress(body[:-8], -15)
+    if len(data) != struct.unpack("<I", body[-4:])[0]:
+        raise BgzfError("BGZF block size mismatch")
+    return data, size
+
+
+def build_gzi(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Compressed and uncompressed start offsets of every block, from the block headers alone."""
+    compressed, uncompressed = [0], [0]
+    with open(path, "rb") as fh:
+        total = os.fstat(fh.fileno()).st_size
+        cpos = upos = 0
+        while cpos < total:
+            header = fh.read(12)
+            if len(header) < 12:
+                raise BgzfError(f"{path}: truncated BGZF block at byte {cpos}")
+            xlen = struct.unpack("<H", header[10:12])[0]
+            size = _block_size(header, fh.read(xlen))
+            # the uncompressed size closes the block
+            fh.seek(cpos + size - 4)
+            upos += struct.unpack("<I", fh.read(4))[0]
+            cpos += size
+            compressed.append(cpos)
+            uncompressed.append(upos)
+    # the last entries mark the end of the data, not a block
+    return np.array(compressed[:-1], dtype=np.int64), np.array(uncompressed[:-1], dtype=np.int64)
+
+
+def write_gzi(offsets: Tuple[np.ndarray, np.ndarray], gzi_path: str) -> None:
+    """Write a samtools-compatible ``.gzi``: a count, then (compressed, uncompressed) pairs after the first block."""
+    compressed, uncompressed = offsets
+    pairs = np.stack([compressed[1:], uncompressed[1:]], axis=1).astype("<u8")
+    with open(gzi_path, "wb") as fh:
+        fh.write(struct.pack("<Q", len(pairs)))
+        fh.write(pairs.tobytes())
+
+
+def read_gzi(gzi_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    data = np.fromfile(gzi_path, dtype="<u8")
+    if not len(data) or len(data) != 1 + 2 * int(data[0]):
+        raise BgzfError(f"{gzi_path}: malformed .gzi index")
+    pairs = data[1:].reshape(-1, 2).astype(np.int64)
+    return np.concatenate(([0], pairs[:, 0])), np.concatenate(([0], pairs[:, 1]))
+
+
+def load_gzi(path: str, write: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """Block offsets for the BGZF file `path`, handled like `fasta.load_fai` handles ``.fai``."""
+    gzi_path = path + ".gzi"
+    try:
+        if os.stat(gzi_path).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            return read_gzi(gzi_path)
+    except OSError:
+        pass
+    offsets = build_gzi(path)
+    if write:
+        try:
+            write_gzi(offsets, gzi_path)
+        except OSError:
+            pass
+    return offsets
+
+
+class BgzfFile:
+    """Random access to the uncompressed bytes of a BGZF file: ``f[a:b]`` returns bytes.
+
+    The most recently decompressed block is kept, so consecutive slices
+    that share a block inflate it once.
+    """
+
+    def __init__(self, path: str, write_gzi: bool = True):
+        self.path = path
+        self._compressed, self._uncompressed = load_gzi(path, write=write_gzi)
+        self._fh = open(path, "rb")
+        self._cached = (-1, b"")
+        self._size = None
+
+    def __enter__(self) -> "BgzfFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._fh.close()
+
+    def _block(self, i: int) -> bytes:
+        if self._cached[0] != i:
+            self._fh.seek(int(self._compressed[i]))
+            self._cached = (i, _read_block(self._fh)[0])
+        return self._cached[1]
+
+    def __len__(self) -> int:
+        if self._size is None:
+            self._size = int(self._uncompressed[-1]) + len(self._block(len(self._compressed) - 1)) if len(self._compressed) else 0
+        return self._size
+
+    def __getitem__(self, key) -> bytes:
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("BgzfFile only supports contiguous slices")
+        start, stop, _ = key.indices(len(self))
+        parts = []
+        i = int(np.searchsorted(self._uncompressed, start, side="right")) - 1
+        pos = start
+        while pos < stop:
+            base = int(self._uncompressed[i])
+            block = self._block(i)
+            parts.append(block[pos - base : stop - base])
+            pos = base + len(block)
+            i += 1
+        return b"".join(parts)
+
+
+class BgzfFasta:
+    """Random access to the records of a BGZF-compressed FASTA; the interface of `fasta.FastaFile`."""
+
+    def __init__(self, path: str, write_index: bool = True):
+        self.path = path
+        self.entries = fasta.load_fai(path, write=write_index, opener=gzip.open)
+        self._data = BgzfFile(path, write_gzi=write_index)
+        self._by_name: Dict[str, fasta.FaiEntry] = {e.name: e for e in self.entries}
+
+    def __enter__(self) -> "BgzfFasta":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __iter__(self) -> Iterator[fasta.ContigView]:
+        for e in self.entries:
+            yield fasta.ContigView(self._data, e)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def contig(self, name: str) -> fasta.ContigView:
+        return fasta.ContigView(self._data, self._by_name[name])
+
+    def fetch(self, name: str, start: int = 0, stop: int = None) -> str:
+        view = self.contig(name)
+        return view[start : len(view) if stop is None else stop].decode("ascii")
+
+
+# gzip ----------------------------------------------------------------------
+
+
+def iter_gzip_records(path: str) -> Iterator[Tuple[str, int, Callable[[int, int], str]]]:
+    """Stream the records of a gzip-compressed FASTA, holding one record at a time."""
+    name = None
+    parts: List[bytes] = []
+
+    def record():
+        seq = b"".join(parts).upper()
+        return name, len(seq), lambda lo, hi: seq[lo:hi].decode("ascii")
+
+    with gzip.open(path, "rb") as fh:
+        for line in fh:
+            if line.startswith(b">"):
+                if name is not None:
+                    yield record()
+                fields = line[1:].decode("ascii", errors="replace").split(None, 1)
+                name = fields[0] if fields else ""
+                parts = []
+            elif name is not None:
+                parts.append(b"".join(line.split()))
+    if name is not None:
+        yield record()
+
+
+# .2bit ---------------------------------------------------------------------
+
+
+def _twobit_table() -> np.ndarray:
+    # .2bit packs T=0, C=1, A=2, G=3 with the first base in the high bits;
+    # PackedSequence packs A=0, C=1, G=2, T=3 with the first base in the low bits
+    to_code = np.array([3, 1, 0, 2], dtype=np.int64)
+    byte = np.arange(256)
+    out = np.zeros(256, dtype=np.int64)
+    for k in range(4):
+        out |= to_code[(byte >> (6 - 2 * k)) & 3] << (2 * k)
+    return out.astype(np.uint8)
+
+
+_TWOBIT_TO_PACKED = _twobit_table()
+
+
+def _shift_packed(packed: np.ndarray, skip: int, n: int) -> np.ndarray:
+    """Drop the first `skip` (< 4) bases of packed bytes and keep `n` bases, unused bits cleared."""
+    if skip:
+        wide = np.append(packed, np.uint8(0)).astype(np.uint16)
+        packed = ((wide[:-1] >> (2 * skip)) | (wide[1:] << (8 - 2 * skip))).astype(np.uint8)
+    packed = packed[: -(-n // 4)].copy()
+    if n % 4:
+        packed[-1] &= (1 << (2 * (n % 4))) - 1
+    return packed
+
+
+def _clear_bases(packed: np.ndarray, a: int, b: int) -> None:
+    """Set bases ``[a, b)`` of packed bytes to code 0, as ambiguous bases are stored."""
+    first, last = -(-a // 4), b // 4
+    if first < last:
+        packed[first:last] = 0
+        edges = list(range(a, 4 * first)) + list(range(4 * last, b))
+    else:
+        edges = range(a, b)
+    for p in edges:
+        packed[p >> 2] &= np.uint8(~(3 << (2 * (p & 3))) & 0xFF)
+
+
+class TwoBitFile:
+    """Random access to the records of a memory-mapped UCSC ``.2bit`` file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "rb")
+        self._map = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        head = self._map[:16]
+        if len(head) < 16:
+            self.close()
+            raise TwoBitError(f"{path}: truncated .2bit header")
+        for order in "<>":
+            if struct.unpack(order + "I", head[:4])[0] == _TWOBIT_MAGIC:
+                break
+        else:
+            self.close()
+            raise TwoBitError(f"{path}: not a .2bit file")
+        self._order = order
+        version, count, _ = struct.unpack(order + "III", head[4:16])
+        if version not in (0, 1):
+            self.close()
+            raise TwoBitError(f"{path}: unsupported .2bit version {version}")
+        offset_format = order + ("Q" if version == 1 else "I")
+        pos = 16
+        self.records: List[Tuple[str, int]] = []
+        self._offsets: Dict[str, int] = {}
+        for _ in range(count):
+            size = self._map[pos]
+            name = self._map[pos + 1 : pos + 1 + size].decode("ascii")
+            pos += 1 + size
+            offset = struct.unpack_from(offset_format, self._map, pos)[0]
+            pos += struct.calcsize(offset_format)
+            self._offsets[name] = offset
+            self.records.append((name, struct.unpack_from(order + "I", self._map, offset)[0]))
+        self._lengths = dict(self.records)
+        self._headers: Dict[str, Tuple[int, np.ndarray, np.ndarray]] = {}
+
+    def __enter__(self) -> "TwoBitFile":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if hasattr(self, "_map"):
+            self._map.close()
+        self._fh.close()
+
+    def _u32(self, pos: int, count: int) -> np.ndarray:
+        return np.frombuffer(self._map, dtype=self._order + "u4", count=count, offset=pos).astype(np.int64)
+
+    def _header(self, name: str) -> Tuple[int, np.ndarray, np.ndarray]:
+        """``(dna_offset, n_starts, n_ends)`` of record `name`, with adjacent N blocks merged."""
+        header = self._headers.get(name)
+        if header is None:
+            pos = self._offsets[name] + 4
+            n_blocks = int(self._u32(pos, 1)[0])
+            starts = self._u32(pos + 4, n_blocks)
+            ends = starts + self._u32(pos + 4 + 4 * n_blocks, n_blocks)
+            pos += 4 + 8 * n_blocks
+            n_masks = int(self._u32(pos, 1)[0])
+            # mask blocks and the reserved word precede the bases
+            pos += 4 + 8 * n_masks + 4
+            order = np.argsort(starts, kind="stable")
+            starts, ends = starts[order], ends[order]
+            if len(starts) > 1:
+                joined = np.flatnonzero(starts[1:] > ends[:-1]) + 1
+                starts = starts[np.concatenate(([0], joined))]
+                ends = np.maximum.reduceat(ends, np.concatenate(([0], joined)))
+            header = self._headers[name] = (pos, starts, ends)
+        return header
+
+    def packed(self, name: str, start: int = 0, stop: int = None) -> genome.PackedSequence:
+        """Bases ``[start, stop)`` of record `name` as a `genome.PackedSequence`, without decoding to text."""
+        length = self._lengths[name]
+        dna, n_starts, n_ends = self._header(name)
+        stop = length if stop is None else min(stop, length)
+        start = max(0, min(start, stop))
+        n = stop - start
+        raw = np.frombuffer(self._map, dtype=np.uint8, count=-(-stop // 4) - start // 4, offset=dna + start // 4)
+        packed = _shift_packed(_TWOBIT_TO_PACKED[raw], start % 4, n)
+        # N blocks read as T in the packed bytes; store them as ambiguity runs
+        lo = np.searchsorted(n_ends, start, side="right")
+        hi = np.searchsorted(n_starts, stop, side="left")
+        amb_starts = np.maximum(n_starts[lo:hi], start) - start
+        amb_ends = np.minimum(n_ends[lo:hi], stop) - start
+        for a, b in zip(amb_starts, amb_ends):
+            _clear_bases(packed, int(a), int(b))
+        amb_chars = np.full(len(amb_starts), ord("N"), dtype=np.uint8)
+        return genome.PackedSequence(name, n, packed, amb_starts.astype(np.int64), amb_ends.astype(np.int64), amb_chars)
+
+
+# records and prefetching ---------------------------------------------------
+
+
+def iter_records(path: str, fmt: str = None) -> Iterator[Tuple[str, int, Callable]]:
+    """Yield ``(seq_id, length, read)`` for a gzip, BGZF or ``.2bit`` genome.
+
+    ``read(lo, hi)`` returns upper-case text, or a `genome.PackedSequence`
+    for ``.2bit``. A BGZF FASTA that cannot be indexed (see `fasta.FaiError`)
+    is streamed like plain gzip.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt == "2bit":
+        with TwoBitFile(path) as tb:
+            for name, n in tb.records:
+                yield name, n, partial(tb.packed, name)
+        return
+    if fmt == "bgzf":
+        try:
+            fa = BgzfFasta(path)
+        except fasta.FaiError:
+            fa = None
+        if fa is not None:
+            with fa:
+                for view in fa:
+                    yield view.name, len(view), lambda lo, hi, view=view: view[lo:hi].decode("ascii").upper()
+            return
+    elif fmt != "gzip":
+        raise ValueError(f"{path}: not a gzip, BGZF or .2bit file")
+    yield from iter_gzip_records(path)
+
+
+def prefetch(items: Iterable[T], depth: int = DEFAULT_PREFETCH) -> Iterator[T]:
+    """Iterate `items` in a background thread, at most `depth` items ahead of the consumer.
+
+    Exceptions raised by `items` are re-raised in the consumer. Closing the
+    returned generator stops the thread and closes `items`.
+    """
+    q: "queue.Queue" = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        it = iter(items)
+        try:
+            for item in it:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except BaseException as e:  # handed to the consumer
+            put((done, e))
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name="crispr_check-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = q.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,339 @@
+"""Persistent cache of search results, shared across runs.
+
+Hits of one guide are stored in an SQLite database under a cache
+directory, keyed by the genome's SHA-256 checksum, the guide sequence, the
+PAM, the bulge budgets, `search.ENGINE_VERSION` and the mismatch budget
+`k`. Each budget gets its own entry, and a query is answered by the entry
+with the smallest budget of at least its own, keeping the hits with at
+most that many mismatches. Hits beyond every cached budget can lie in any
+window, so a larger budget always needs a full scan; only guides without
+a usable entry are scanned, together, in one pass.
+
+An entry's hits are stored as zlib-compressed blocks, written while the
+scan streams them out, so a cold query needs no more memory than an
+uncached one. Once the total stored size exceeds `max_bytes`, the least
+recently used entries are evicted. Genome checksums are remembered by
+path, size and modification time, so an unchanged genome is not
+re-hashed.
+"""
+import heapq
+import json
+import os
+import sqlite3
+import time
+import zlib
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from . import search
+from .catalog import file_stamp, genome_checksum
+
+DEFAULT_MAX_BYTES = 1 << 30
+
+# hits per stored block, summed over the guides of a scan
+BLOCK_HITS = 8192
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS genomes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    checksum TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    checksum TEXT PRIMARY KEY,
+    ids TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    checksum TEXT NOT NULL,
+    guide TEXT NOT NULL,
+    pam TEXT NOT NULL,
+    max_dna_bulges INTEGER NOT NULL,
+    max_rna_bulges INTEGER NOT NULL,
+    engine INTEGER NOT NULL,
+    max_mismatches INTEGER NOT NULL,
+    complete INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_key ON entries (checksum, guide, pam, max_dna_bulges, max_rna_bulges, engine, max_mismatches);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+CREATE TABLE IF NOT EXISTS blocks (
+    entry INTEGER NOT NULL,
+    part INTEGER NOT NULL,
+    hits BLOB NOT NULL,
+    PRIMARY KEY (entry, part)
+);
+"""
+
+_KEY = "checksum = ? AND guide = ? AND pam = ? AND max_dna_bulges = ? AND max_rna_bulges = ? AND engine = ?"
+
+
+def default_cache_dir() -> str:
+    """``$CRISPR_CHECK_CACHE_DIR``, else ``$XDG_CACHE_HOME/crispr-check`` (``~/.cache/crispr-check``)."""
+    path = os.environ.get("CRISPR_CHECK_CACHE_DIR")
+    if path:
+        return path
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "crispr-check")
+
+
+class ResultCache:
+    """Search results of single guides, stored in ``<cache_dir>/results.sqlite``."""
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        if max_bytes < 0:
+            raise ValueError("max_bytes must be non-negative")
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.path = os.path.join(self.cache_dir, "results.sqlite")
+        self._db = sqlite3.connect(self.path, timeout=60)
+        self._db.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def genome_checksum(self, fasta_path: str) -> str:
+        """Checksum of `fasta_path`, re-hashed only when its size or modification time changed."""
+        path = os.path.realpath(fasta_path)
+        stamp = file_stamp(path)
+        row = self._db.execute("SELECT size, mtime_ns, checksum FROM genomes WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[:2] == (stamp["size"], stamp["mtime_ns"]):
+            return row[2]
+        checksum = genome_checksum(path)
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO genomes VALUES (?, ?, ?, ?)", (path, stamp["size"], stamp["mtime_ns"], checksum))
+        return checksum
+
+    def record_ids(self, checksum: str, fasta_path: str) -> List[str]:
+        """Record ids of the genome in file order, remembered per checksum."""
+        row = self._db.execute("SELECT ids FROM records WHERE checksum = ?", (checksum,)).fetchone()
+        if row is not None:
+            return json.loads(row[0])
+        ids = [seq_id for seq_id, _, _ in search.iter_records(fasta_path)]
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO records VALUES (?, ?)", (checksum, json.dumps(ids)))
+        return ids
+
+    def _key(self, checksum: str, guide: str, pam: str, max_dna_bulges: int, max_rna_bulges: int) -> Tuple:
+        return (checksum, guide, search.compile_pam(pam).pattern, max_dna_bulges, max_rna_bulges, search.ENGINE_VERSION)
+
+    def get(self, checksum: str, guide: str, pam: str, max_mismatches: int, max_dna_bulges: int = 0, max_rna_bulges: int = 0) -> Optional[List[Dict]]:
+        """Cached hits of `guide` with at most `max_mismatches` mismatches, or None."""
+        key = self._key(checksum, guide, pam, max_dna_bulges, max_rna_bulges)
+        # the smallest budget that covers the query has the least to filter
+        row = self._db.execute(f"SELECT id, max_mismatches FROM entries WHERE {_KEY} AND max_mismatches >= ? AND complete = 1 ORDER BY max_mismatches LIMIT 1", key + (max_mismatches,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self._db:
+            self._db.execute("UPDATE entries SET used = ? WHERE id = ?", (time.time(), row[0]))
+        hits = []
+        for (blob,) in self._db.execute("SELECT hits FROM blocks WHERE entry = ? ORDER BY part", (row[0],)):
+            hits.extend(json.loads(zlib.decompress(blob)))
+        if row[1] > max_mismatches:
+            hits = [h for h in hits if h["mismatches"] <= max_mismatches]
+        return hits
+
+    def writer(self, checksum: str, guides: Sequence[str], pam: str, max_mismatches: int, max_dna_bulges: int = 0, max_rna_bulges: int = 0) -> "_EntryWriter":
+        """A writer that stores the hits of `guides`, fed one at a time (see `_EntryWriter`)."""
+        return _EntryWriter(self, [self._key(checksum, g, pam, max_dna_bulges, max_rna_bulges) for g in guides], max_mismatches)
+
+    def put(self, checksum: str, guide: str, pam: str, max_mismatches: int, hits: List[Dict], max_dna_bulges: int = 0, max_rna_bulges: int = 0) -> None:
+        """Store the hits of `guide`, replacing an entry with the same budget; then evict down to `max_bytes`."""
+        w = self.writer(checksum, [guide], pam, max_mismatches, max_dna_bulges, max_rna_bulges)
+        try:
+            for h in hits:
+                w.add(0, h)
+            w.commit()
+        finally:
+            w.abort()
+
+    def _delete(self, ids: Sequence[int]) -> None:
+        self._db.executemany("DELETE FROM blocks WHERE entry = ?", [(i,) for i in ids])
+        self._db.executemany("DELETE FROM entries WHERE id = ?", [(i,) for i in ids])
+
+    def _evict(self) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for rowid, size in self._db.execute("SELECT id, size FROM entries ORDER BY used"):
+            if total <= self.max_bytes:
+                break
+            doomed.append(rowid)
+            total -= size
+        self._delete(doomed)
+
+    def stats(self) -> Dict:
+        """Entry count, stored bytes, genome count, size limit and database path."""
+        entries = self._db.execute("SELECT COUNT(*) FROM entries WHERE complete = 1").fetchone()[0]
+        size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        genomes = self._db.execute("SELECT COUNT(DISTINCT checksum) FROM entries WHERE complete = 1").fetchone()[0]
+        return {"path": self.path, "entries": entries, "bytes": size, "genomes": genomes, "max_bytes": self.max_bytes}
+
+    def clear(self) -> int:
+        """Remove every entry; returns the number removed."""
+        with self._db:
+            n = self._db.execute("SELECT COUNT(*) FROM entries WHERE complete = 1").fetchone()[0]
+            self._db.execute("DELETE FROM blocks")
+            self._db.execute("DELETE FROM entries")
+            self._db.execute("DELETE FROM records")
+            self._db.execute("DELETE FROM genomes")
+        self._db.execute("VACUUM")
+        return n
+
+
+class _EntryWriter:
+    """Stores the hits of several guides as they stream in, in blocks of `BLOCK_HITS`.
+
+    Entries are written as incomplete and only become visible to
+    `ResultCache.get` on `commit`, which also replaces older entries with
+    the same budget. `abort` drops whatever has not been committed; an
+    entry that grows beyond the cache's `max_bytes` is dropped early.
+    """
+
+    def __init__(self, cache: ResultCache, keys: Sequence[Tuple], max_mismatches: int):
+        self.cache = cache
+        self.keys = keys
+        self.max_mismatches = max_mismatches
+        now = time.time()
+        with cache._db:
+            self.ids = [cache._db.execute("INSERT INTO entries VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, 0, 0, ?)", key + (max_mismatches, now)).lastrowid for key in keys]
+        self.parts = [0] * len(keys)
+        self.sizes = [0] * len(keys)
+        self.pending: List[List[Dict]] = [[] for _ in keys]
+        self.n_pending = 0
+        self.done = False
+
+    def add(self, i: int, hit: Dict) -> None:
+        """Add a hit of guide `i` (an index into the writer's guides)."""
+        if self.ids[i] is None:
+            return
+        self.pending[i].append(hit)
+        self.n_pending += 1
+        if self.n_pending >= BLOCK_HITS:
+            self._flush()
+
+    def _flush(self) -> None:
+        db, dropped, rows = self.cache._db, [], []
+        for i, hits in enumerate(self.pending):
+            if not hits or self.ids[i] is None:
+                continue
+            blob = zlib.compress(json.dumps(hits, separators=(",", ":")).encode("utf-8"))
+            self.sizes[i] += len(blob)
+            if self.sizes[i] > self.cache.max_bytes:
+                dropped.append(self.ids[i])
+                self.ids[i] = None
+                continue
+            rows.append((self.ids[i], self.parts[i], blob))
+            self.parts[i] += 1
+        with db:
+            db.executemany("INSERT INTO blocks VALUES (?, ?, ?)", rows)
+            db.executemany("UPDATE entries SET size = ? WHERE id = ?", [(self.sizes[i], e) for i, e in enumerate(self.ids) if e is not None])
+            self.cache._delete(dropped)
+        self.pending = [[] for _ in self.keys]
+        self.n_pending = 0
+
+    def commit(self) -> None:
+        self._flush()
+        db = self.cache._db
+        with db:
+            for key, e in zip(self.keys, self.ids):
+                if e is None:
+                    continue
+                older = [r[0] for r in db.execute(f"SELECT id FROM entries WHERE {_KEY} AND max_mismatches = ? AND complete = 1", key + (self.max_mismatches,))]
+                self.cache._delete(older)
+                if db.execute("UPDATE entries SET complete = 1, used = ? WHERE id = ?", (time.time(), e)).rowcount == 0:
+                    # evicted while the scan ran
+                    self.cache._delete([e])
+            self.cache._evict()
+        self.done = True
+
+    def abort(self) -> None:
+        if self.done:
+            return
+        with self.cache._db:
+            self.cache._delete([e for e in self.ids if e is not None])
+        self.done = True
+
+
+def _scan_key(h: Dict, order: Mapping[str, int], max_dna_bulges: int) -> Tuple[int, int, int, int]:
+    # record, strand, position (minus strand back to front), bulge kind: the
+    # order in which search.iter_batch_hits reports hits of one guide
+    if h.get("dna_bulges"):
+        rank = h["dna_bulges"]
+    elif h.get("rna_bulges"):
+        rank = max_dna_bulges + h["rna_bulges"]
+    else:
+        rank = 0
+    plus = h["strand"] == "+"
+    return order[h["seq_id"]], 0 if plus else 1, h["start"] if plus else -h["start"], rank
+
+
+def _scanned_rows(new_writer: Callable[[], _EntryWriter], hits: Iterator[Dict], missing: Sequence[str], positions: Mapping[str, List[Tuple[int, str]]], order: Optional[Mapping[str, int]], max_dna_bulges: int) -> Iterator[Tuple]:
+    # store each scanned hit and yield it once per guide id of its sequence,
+    # as (merge key, guide id, hit); with several guides, hits at one site
+    # are regrouped by guide order, which can differ from `missing`'s order
+    index = {g: i for i, g in enumerate(missing)}
+    writer = new_writer()
+    try:
+        group, group_key = [], None
+        for h in hits:
+            g = h.pop("guide_id")
+            writer.add(index[g], h)
+            if order is None:
+                for gi, gid in positions[g]:
+                    yield (), gid, h
+                continue
+            key = _scan_key(h, order, max_dna_bulges)
+            if key != group_key and group:
+                yield from sorted(group, key=lambda r: r[0])
+                group = []
+            group_key = key
+            group.extend((key + (gi,), gid, h) for gi, gid in positions[g])
+        yield from sorted(group, key=lambda r: r[0])
+        writer.commit()
+    finally:
+        writer.abort()
+
+
+def iter_cached_hits(cache: ResultCache, guides: Union[Mapping[str, str], Sequence[str]], fasta_path: str, pam: str = "NGG", max_mismatches: int = 4, max_dna_bulges: int = 0, max_rna_bulges: int = 0, **scan_options) -> Iterator[Dict]:
+    """`search.iter_batch_hits`, served from `cache` where possible.
+
+    Guides without a usable entry are scanned together in one pass, with
+    `scan_options` (workers, chunk_size, catalog, ...) passed on; their hits
+    are stored as they stream past and yielded in the same order as
+    `search.iter_batch_hits`, merged with the cached hits of the other
+    guides. Only the cached hits are held in memory.
+    """
+    guides = search.normalize_guides(guides)
+    budget = {"max_dna_bulges": max_dna_bulges, "max_rna_bulges": max_rna_bulges}
+    checksum = cache.genome_checksum(fasta_path)
+    found, positions = {}, {}
+    for gi, (gid, g) in enumerate(guides):
+        if g not in found:
+            found[g] = cache.get(checksum, g, pam, max_mismatches, **budget)
+        positions.setdefault(g, []).append((gi, gid))
+    missing = [g for g, hits in found.items() if hits is None]
+    order = {seq_id: i for i, seq_id in enumerate(cache.record_ids(checksum, fasta_path))} if len(guides) > 1 else None
+    streams = [[(_scan_key(h, order, max_dna_bulges) + (gi,) if order is not None else (), gid, h) for h in found[g]] for gi, (gid, g) in enumerate(guides) if found[g] is not None]
+    if missing:
+        scanned = search.iter_batch_hits(missing, fasta_path, pam=pam, max_mismatches=max_mismatches, **budget, **scan_options)
+        streams.append(_scanned_rows(partial(cache.writer, checksum, missing, pam, max_mismatches, **budget), scanned, missing, positions, order, max_dna_bulges))
+    if len(streams) == 1:
+        merged = streams[0]
+    else:
+        merged = heapq.merge(*streams, key=lambda r: r[0])
+    for _, gid, h in merged:
+        yield dict(h, guide_id=gid)
@@ -1,4 +1,40 @@
-from typing import List
+import os
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from . import bulges
+
+
+# Substitution weight modifiers for `cfd_score` (guide_base -> target_base).
+# Values <1 reduce penalty. Only a few common cases are given non-default
+# weights for demonstration; default is 1.0.
+_CFD_SUB_WEIGHTS = {
+    ("G", "A"): 0.9,
+    ("C", "T"): 0.9,
+    ("A", "G"): 0.9,
+    ("T", "C"): 0.9,
+}
+
+# Substitution penalty weights for `cfd_score_full` (guide_base -> target_base).
+# Values in (0,1], where larger means more damaging (higher penalty).
+# These are illustrative and intended for educational MVP; replace with published table for production.
+_CFD_FULL_SUB_WEIGHTS = {
+    ("A", "C"): 0.8,
+    ("A", "G"): 0.6,
+    ("A", "T"): 0.9,
+    ("C", "A"): 0.8,
+    ("C", "G"): 0.7,
+    ("C", "T"): 0.6,
+    ("G", "A"): 0.6,
+    ("G", "C"): 0.7,
+    ("G", "T"): 0.8,
+    ("T", "A"): 0.9,
+    ("T", "C"): 0.6,
+    ("T", "G"): 0.8,
+}
 
 
 def position_weighted_score(guide: str, target: str) -> float:
@@ -55,14 +91,7 @@ def cfd_score(guide: str, target: str, pam: str = "NGG") -> float:
     # Values chosen to mimic stronger effect near PAM without reproducing the full table.
     pos_penalty = [0.02 + (i / max(1, (L - 1))) * 0.18 for i in range(L)]
 
-    # Substitution weight modifiers (guide_base -> target_base). Values <1 reduce penalty.
-    # Only a few common cases are given non-default weights for demonstration; default is 1.0.
-    sub_weights = {
-        ("G", "A"): 0.9,
-        ("C", "T"): 0.9,
-        ("A", "G"): 0.9,
-        ("T", "C"): 0.9,
-    }
+    sub_weights = _CFD_SUB_WEIGHTS
 
     score = 1.0
     for i, (a, b) in enumerate(zip(g, t)):
@@ -97,23 +126,7 @@ def cfd_score_full(guide: str, target: str, pam: str = "NGG") -> float:
     # Using a triangular-like profile for demonstration; in full CFD this is empirical.
     pos_weights = [((i + 1) / float(L)) ** 1.5 for i in range(L)]
 
-    # Substitution penalty weights for mismatch types (guide_base -> target_base).
-    # Values in (0,1], where larger means more damaging (higher penalty).
-    # These are illustrative and intended for educational MVP; replace with published table for production.
-    sub_weights = {
-        ("A", "C"): 0.8,
-        ("A", "G"): 0.6,
-        ("A", "T"): 0.9,
-        ("C", "A"): 0.8,
-        ("C", "G"): 0.7,
-        ("C", "T"): 0.6,
-        ("G", "A"): 0.6,
-        ("G", "C"): 0.7,
-        ("G", "T"): 0.8,
-        ("T", "A"): 0.9,
-        ("T", "C"): 0.6,
-        ("T", "G"): 0.8,
-    }
+    sub_weights = _CFD_FULL_SUB_WEIGHTS
 
     score = 1.0
     for i, (a, b) in enumerate(zip(g, t)):
@@ -129,17 +142,115 @@ def cfd_score_full(guide: str, target: str, pam: str = "NGG") -> float:
     return max(0.0, score * 100.0)
 
 
-def load_cfd_table(path: str) -> dict:
-    """Load a CFD table from a JSON file.
+# weight of a substitution missing from a CFD table
+_CFD_DEFAULT_WEIGHT = 0.85
+_ACGT = "ACGT"
+_ACGT_BYTES = np.frombuffer(b"ACGT", dtype=np.uint8)
 
-    Expected JSON format:
-    {
-      "pos_weights": [float,...],   # length == guide length (e.g., 20)
-      "sub_weights": {"A>G": 0.6, ...}
-    }
 
-    Returns a dict with keys `pos_weights` (list) and `sub_weights` (dict mapping tuples).
+def _cfd_profile(L: int) -> List[float]:
+    """Positional profile used when a table has no `pos_weights` for the guide length."""
+    return [((i + 1) / float(L)) ** 1.5 for i in range(L)]
+
+
+class CfdTable:
+    """A CFD table compiled for fast scoring.
+
+    `penalties` is a dense ``(L, 4, 4)`` array of ``pos_weights[i] *
+    sub_weight(guide_base, target_base)`` over ACGT (zero on the diagonal),
+    so a mismatch costs one lookup. Scores computed from it equal
+    `cfd_score_with_table` on the equivalent table dict.
     """
+
+    __slots__ = ("pos_weights", "sub_weights", "penalties", "_dense", "_by_length", "_extra")
+
+    def __init__(self, pos_weights: Optional[List[float]], sub_weights: Dict[Tuple[str, str], float], penalties: np.ndarray = None):
+        self.pos_weights = list(pos_weights) if pos_weights else None
+        self.sub_weights = dict(sub_weights)
+        dense = np.full((4, 4), _CFD_DEFAULT_WEIGHT, dtype=np.float64)
+        # substitutions involving other characters (N, IUPAC codes) are
+        # looked up individually, by guide base
+        self._extra: Dict[str, List[Tuple[str, float]]] = {}
+        for (a, b), w in self.sub_weights.items():
+            if a in _ACGT and b in _ACGT and len(a) == len(b) == 1:
+                dense[_ACGT.index(a), _ACGT.index(b)] = w
+            elif len(b) == 1 and ord(b) < 256:
+                self._extra.setdefault(a, []).append((b, w))
+        np.fill_diagonal(dense, 0.0)
+        self._dense = dense
+        self._by_length: Dict[int, np.ndarray] = {}
+        if penalties is None and self.pos_weights:
+            penalties = np.asarray(self.pos_weights, dtype=np.float64)[:, None, None] * dense
+        self.penalties = penalties
+        if penalties is not None:
+            self._by_length[len(penalties)] = penalties
+
+    @classmethod
+    def from_dict(cls, table: dict) -> "CfdTable":
+        """Compile a table dict in the `load_cfd_table` format."""
+        return cls(table.get("pos_weights"), table.get("sub_weights") or {})
+
+    def as_dict(self) -> dict:
+        """The table in the `load_cfd_table` dict format (a fresh copy)."""
+        return {"pos_weights": list(self.pos_weights) if self.pos_weights else self.pos_weights, "sub_weights": dict(self.sub_weights)}
+
+    def positions(self, L: int) -> List[float]:
+        """Positional weights for an `L`-nt guide, as `cfd_score_with_table` picks them."""
+        if self.pos_weights and len(self.pos_weights) == L:
+            return self.pos_weights
+        return _cfd_profile(L)
+
+    def penalty_array(self, L: int) -> np.ndarray:
+        """The dense ``(L, 4, 4)`` penalty array for an `L`-nt guide."""
+        arr = self._by_length.get(L)
+        if arr is None:
+            arr = np.asarray(self.positions(L), dtype=np.float64)[:, None, None] * self._dense
+            self._by_length[L] = arr
+        return arr
+
+    def factors(self, guide: str) -> np.ndarray:
+        """``(L, 256)`` multiplicative factor per guide position and target byte."""
+        g = guide.upper()
+        L = len(g)
+        pos = self.positions(L)
+        penalties = self.penalty_array(L)
+        factors = np.repeat(np.maximum(0.0, 1.0 - np.asarray(pos, dtype=np.float64) * _CFD_DEFAULT_WEIGHT)[:, None], 256, axis=1)
+        for i, a in enumerate(g):
+            c = _ACGT.find(a)
+            if c >= 0:
+                factors[i, _ACGT_BYTES] = np.maximum(0.0, 1.0 - penalties[i, c])
+            for b, w in self._extra.get(a, ()):
+                factors[i, ord(b)] = max(0.0, 1.0 - pos[i] * w)
+            if ord(a) < 256:
+                factors[i, ord(a)] = 1.0
+        return factors
+
+    def save_npz(self, path: str) -> None:
+        """Write the compiled table to a ``.npz`` file (see `load_compiled_cfd_table`)."""
+        pairs = list(self.sub_weights.items())
+        np.savez(
+            path,
+            pos_weights=np.asarray(self.pos_weights or [], dtype=np.float64),
+            sub_keys=np.array([f"{a}>{b}" for (a, b), _ in pairs], dtype=str),
+            sub_values=np.array([w for _, w in pairs], dtype=np.float64),
+            penalties=self.penalties if self.penalties is not None else np.zeros((0, 4, 4)),
+        )
+
+    @classmethod
+    def load_npz(cls, path: str) -> "CfdTable":
+        with np.load(path, allow_pickle=False) as data:
+            pos = data["pos_weights"].tolist()
+            sub = {tuple(k.split(">", 1)): float(v) for k, v in zip(data["sub_keys"].tolist(), data["sub_values"].tolist())}
+            penalties = data["penalties"] if len(data["penalties"]) else None
+        return cls(pos or None, sub, penalties)
+
+
+# parsed CFD tables, keyed by (real path, mtime_ns); least recently used last out
+_CFD_CACHE_SIZE = 16
+_cfd_cache: "OrderedDict[Tuple[str, int], CfdTable]" = OrderedDict()
+
+
+def _parse_cfd_json(path: str) -> CfdTable:
     import json
 
     with open(path, "r", encoding="utf-8") as fh:
@@ -154,7 +265,64 @@ def load_cfd_table(path: str) -> dict:
             if isinstance(k, str) and ">" in k:
                 a, b = k.split(">")
                 sub_norm[(a.upper(), b.upper())] = float(v)
-    return {"pos_weights": pos, "sub_weights": sub_norm}
+    return CfdTable(pos, sub_norm)
+
+
+def load_compiled_cfd_table(path: str) -> CfdTable:
+    """Load a CFD table (JSON or ``.npz``) as a compiled `CfdTable`, through a process-wide cache.
+
+    Tables are cached by path and modification time, so an edited file is
+    re-read. For a JSON table, a ``<path>.npz`` sidecar written by
+    `save_cfd_sidecar` is used instead when it is at least as new. The
+    returned table is shared: do not modify it.
+    """
+    real = os.path.realpath(path)
+    mtime = os.stat(real).st_mtime_ns
+    key = (real, mtime)
+    table = _cfd_cache.get(key)
+    if table is not None:
+        _cfd_cache.move_to_end(key)
+        return table
+    sidecar = real + ".npz"
+    if real.endswith(".npz"):
+        table = CfdTable.load_npz(real)
+    elif os.path.exists(sidecar) and os.stat(sidecar).st_mtime_ns >= mtime:
+        table = CfdTable.load_npz(sidecar)
+    else:
+        table = _parse_cfd_json(real)
+    # drop entries for older versions of the same file
+    for old in [k for k in _cfd_cache if k[0] == real]:
+        del _cfd_cache[old]
+    _cfd_cache[key] = table
+    while len(_cfd_cache) > _CFD_CACHE_SIZE:
+        _cfd_cache.popitem(last=False)
+    return table
+
+
+def save_cfd_sidecar(path: str) -> str:
+    """Compile the JSON table at `path` into a ``<path>.npz`` sidecar; returns the sidecar path."""
+    sidecar = path + ".npz"
+    _parse_cfd_json(path).save_npz(sidecar)
+    return sidecar
+
+
+def clear_cfd_table_cache() -> None:
+    _cfd_cache.clear()
+
+
+def load_cfd_table(path: str) -> dict:
+    """Load a CFD table from a JSON file.
+
+    Expected JSON format:
+    {
+      "pos_weights": [float,...],   # length == guide length (e.g., 20)
+      "sub_weights": {"A>G": 0.6, ...}
+    }
+
+    Returns a dict with keys `pos_weights` (list) and `sub_weights` (dict mapping tuples).
+    Parsed tables are cached (see `load_compiled_cfd_table`); each call returns a fresh dict.
+    """
+    return load_compiled_cfd_table(path).as_dict()
 
 
 def load_published_cfd() -> dict:
@@ -171,8 +339,8 @@ def load_published_cfd() -> dict:
     return load_cfd_table(p)
 
 
-def cfd_score_with_table(guide: str, target: str, table: dict, pam: str = "NGG") -> float:
-    """Compute CFD score using a provided table dict (from `load_cfd_table`).
+def cfd_score_with_table(guide: str, target: str, table: Union[dict, "CfdTable"] = None, pam: str = "NGG") -> float:
+    """Compute CFD score using a provided table dict (from `load_cfd_table`) or `CfdTable`.
 
     Table dict must contain `pos_weights` (list) and `sub_weights` (dict keyed by (a,b)).
     If table is None, falls back to `cfd_score_full` behavior.
@@ -185,13 +353,17 @@ def cfd_score_with_table(guide: str, target: str, table: dict, pam: str = "NGG")
     assert len(g) == len(t)
     L = len(g)
 
-    pos_weights = table.get("pos_weights")
-    sub_weights = table.get("sub_weights") or {}
+    if isinstance(table, CfdTable):
+        pos_weights = table.positions(L)
+        sub_weights = table.sub_weights
+    else:
+        pos_weights = table.get("pos_weights")
+        sub_weights = table.get("sub_weights") or {}
 
-    # validate or fallback
-    if not pos_weights or len(pos_weights) != L:
-        # fallback to generated positional profile
-        pos_weights = [((i + 1) / float(L)) ** 1.5 for i in range(L)]
+        # validate or fallback
+        if not pos_weights or len(pos_weights) != L:
+            # fallback to generated positional profile
+            pos_weights = _cfd_profile(L)
 
     score = 1.0
     for i, (a, b) in enumerate(zip(g, t)):
@@ -204,3 +376,436 @@ def cfd_score_with_table(guide: str, target: str, table: dict, pam: str = "NGG")
         score *= 0.92
 
     return max(0.0, score * 100.0)
+
+
+# Batch scoring -------------------------------------------------------------
+#
+# `score_batch` scores many targets of one guide at once. Targets are an
+# (n_hits x L) uint8 matrix of upper-case ASCII codes (see `encode_targets`).
+# The per-guide weights are turned into lookup tables up front, and the
+# arithmetic is done in the same order as the scalar functions, so the
+# results are bit-for-bit identical to them.
+
+SCORE_METHODS = ("pw", "mit", "cfd", "cfd_full")
+
+# ASCII byte -> upper-case byte
+_UPPER = np.frombuffer(bytes(range(256)).upper(), dtype=np.uint8)
+
+
+def encode_targets(targets: Sequence[str]) -> np.ndarray:
+    """Encode equal-length target sequences as an (n, L) matrix of upper-case ASCII codes."""
+    targets = list(targets)
+    if not targets:
+        return np.zeros((0, 0), dtype=np.uint8)
+    L = len(targets[0])
+    if any(len(t) != L for t in targets):
+        raise ValueError("targets must all have the same length")
+    raw = np.frombuffer("".join(targets).encode("ascii"), dtype=np.uint8)
+    return _UPPER[raw].reshape(len(targets), L)
+
+
+def _factor_table(g: str, pos: List[float], sub: dict, default: float) -> np.ndarray:
+    """Per-position multiplicative factor for every target byte, as in the CFD scorers."""
+    L = len(g)
+    factors = np.empty((L, 256), dtype=np.float64)
+    for i, a in enumerate(g):
+        factors[i, :] = max(0.0, 1.0 - pos[i] * default)
+        for (x, b), w in sub.items():
+            if x == a and len(b) == 1 and ord(b) < 256:
+                factors[i, ord(b)] = max(0.0, 1.0 - pos[i] * w)
+        if ord(a) < 256:
+            factors[i, ord(a)] = 1.0
+    return factors
+
+
+def _product(factors: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    # multiply position by position, like the scalar loops; a match
+    # contributes an exact factor of 1.0
+    score = np.ones(len(targets), dtype=np.float64)
+    for i in range(factors.shape[0]):
+        score *= factors[i, targets[:, i]]
+    return score
+
+
+def score_batch(guide: str, targets: Union[np.ndarray, Sequence[str]], method: str = "pw", table: dict = None, pam: str = "NGG") -> np.ndarray:
+    """Score every row of `targets` against `guide`; returns a float64 vector.
+
+    `targets` is an (n_hits x L) matrix from `encode_targets` (a list of
+    strings is encoded on the fly). `method` is one of `SCORE_METHODS`; for
+    ``cfd_full`` a `table` (a `CfdTable` or a `load_cfd_table` dict) switches
+    to `cfd_score_with_table`. Each value equals the matching scalar function's.
+    """
+    if method not in SCORE_METHODS:
+        raise ValueError(f"unknown score method {method!r}; expected one of {', '.join(SCORE_METHODS)}")
+    if not isinstance(targets, np.ndarray):
+        targets = encode_targets(targets)
+    g = guide.upper()
+    L = len(g)
+    if not len(targets):
+        return np.zeros(0, dtype=np.float64)
+    targets = _UPPER[targets]
+    if targets.ndim != 2 or targets.shape[1] != L:
+        raise ValueError(f"targets must be an (n, {L}) matrix for a {L}-nt guide")
+
+    if method == "pw":
+        weights = np.arange(1, L + 1, dtype=np.int64)
+        total = int(weights.sum())
+        mismatches = targets != np.frombuffer(g.encode("ascii"), dtype=np.uint8)
+        penalty = (mismatches * weights).sum(axis=1) / total
+        return np.maximum(0.0, 1.0 - penalty) * 100.0
+
+    if method == "mit":
+        # base penalty p contributes the factor 1 - 1 * p
+        pos = [0.01 + (i / (L * 5.0)) for i in range(L)]
+        factors = _factor_table(g, pos, {}, 1.0)
+        return np.maximum(0.0, _product(factors, targets) * 100.0)
+
+    if method == "cfd":
+        pos = [0.02 + (i / max(1, (L - 1))) * 0.18 for i in range(L)]
+        score = _product(_factor_table(g, pos, _CFD_SUB_WEIGHTS, 1.0), targets)
+        if pam.upper() != "NGG":
+            score *= 0.9
+        return np.maximum(0.0, score * 100.0)
+
+    if table is None:
+        table = _CFD_FULL_TABLE
+    elif not isinstance(table, CfdTable):
+        table = CfdTable.from_dict(table)
+    score = _product(table.factors(g), targets)
+    if pam.upper() != "NGG":
+        score *= 0.92
+    return np.maximum(0.0, score * 100.0)
+
+
+# the built-in `cfd_score_full` weights, compiled
+_CFD_FULL_TABLE = CfdTable(None, _CFD_FULL_SUB_WEIGHTS)
+
+# relative slack that keeps a bound above scores whose factors were
+# multiplied in a different order
+_BOUND_SLACK = 1e-9
+
+
+def _product_bounds(factors: np.ndarray, guide: str, max_mismatches: int) -> np.ndarray:
+    """Largest product of ``m`` mismatch factors, for ``m = 0..max_mismatches``."""
+    best = factors.copy()
+    for i, a in enumerate(guide):
+        if ord(a) < 256:
+            best[i, ord(a)] = -np.inf
+    best = np.sort(best.max(axis=1))[::-1] if len(best) else np.zeros(0)
+    bounds = np.concatenate(([1.0], np.cumprod(best)))
+    # more mismatches than positions cannot happen; pad with the last bound
+    m = np.minimum(np.arange(max_mismatches + 1), len(best))
+    return bounds[m]
+
+
+def score_bounds(guide: str, max_mismatches: int, method: str = "pw", table: dict = None, pam: str = "NGG") -> np.ndarray:
+    """Upper bounds on the `method` score of any target with ``m`` mismatches, for ``m = 0..max_mismatches``.
+
+    Bounds never increase with ``m``. They let a search drop hits, or lower
+    its mismatch budget, before scoring: a hit whose bound is below a
+    threshold cannot reach it. Arguments are as in `score_batch`.
+    """
+    if method not in SCORE_METHODS:
+        raise ValueError(f"unknown score method {method!r}; expected one of {', '.join(SCORE_METHODS)}")
+    g = guide.upper()
+    L = len(g)
+    if method == "pw":
+        # the cheapest m mismatches sit at positions 0..m-1
+        m = np.minimum(np.arange(max_mismatches + 1), L)
+        bounds = np.maximum(0.0, 1.0 - (m * (m + 1) // 2) / max(1, L * (L + 1) // 2)) * 100.0
+    elif method == "mit":
+        bounds = _product_bounds(_factor_table(g, [0.01 + (i / (L * 5.0)) for i in range(L)], {}, 1.0), g, max_mismatches) * 100.0
+    elif method == "cfd":
+        pos = [0.02 + (i / max(1, (L - 1))) * 0.18 for i in range(L)]
+        bounds = _product_bounds(_factor_table(g, pos, _CFD_SUB_WEIGHTS, 1.0), g, max_mismatches) * (0.9 if pam.upper() != "NGG" else 1.0) * 100.0
+    else:
+        if table is None:
+            table = _CFD_FULL_TABLE
+        elif not isinstance(table, CfdTable):
+            table = CfdTable.from_dict(table)
+        bounds = _product_bounds(table.factors(g), g, max_mismatches) * (0.92 if pam.upper() != "NGG" else 1.0) * 100.0
+    return np.maximum(0.0, bounds) * (1.0 + _BOUND_SLACK)
+
+
+def max_mismatches_for(bounds: np.ndarray, min_score: float) -> int:
+    """Largest mismatch count whose bound still reaches `min_score` (-1 if none does)."""
+    ok = np.flatnonzero(np.asarray(bounds) >= min_score)
+    return int(ok[-1]) if len(ok) else -1
+
+
+# Scorer registry -----------------------------------------------------------
+#
+# Every score column the CLI can produce is a registered `Scorer`. Scorers
+# that provide a `batch` function are run on a whole block of targets at
+# once; the others are called once per target.
+
+
+class Scorer(NamedTuple):
+    """A named score: a scalar ``score(guide, target, **options)`` and an optional
+    ``batch(guide, encoded_targets, **options)`` returning a NumPy vector.
+
+    `options` lists the keyword arguments (``pam``, ``table``) the scorer
+    takes from the search context. An optional
+    ``bounds(guide, max_mismatches, **options)`` gives upper bounds per
+    mismatch count, as `score_bounds` does, for pruning before scoring.
+    """
+
+    name: str
+    score: Callable[..., float]
+    batch: Optional[Callable[..., np.ndarray]] = None
+    options: Tuple[str, ...] = ()
+    bounds: Optional[Callable[..., np.ndarray]] = None
+
+    @property
+    def supports_batch(self) -> bool:
+        return self.batch is not None
+
+
+SCORERS: Dict[str, Scorer] = {}
+
+
+def register_scorer(name: str, score: Callable[..., float], batch: Callable[..., np.ndarray] = None, options: Sequence[str] = (), bounds: Callable[..., np.ndarray] = None) -> Scorer:
+    """Register (or replace) the scorer called `name` and return it."""
+    scorer = Scorer(name, score, batch, tuple(options), bounds)
+    SCORERS[name] = scorer
+    return scorer
+
+
+def get_scorer(name: str) -> Scorer:
+    try:
+        return SCORERS[name]
+    except KeyError:
+        raise ValueError(f"unknown scorer {name!r}; available: {', '.join(SCORERS)}") from None
+
+
+def score_columns(guide: str, targets: Sequence[str], names: Sequence[str], **context) -> Dict[str, List[float]]:
+    """Score `targets` against `guide` with each named scorer.
+
+    Returns a list of scores per scorer name. `context` supplies the scorer
+    options (e.g. ``pam`` and ``table``); each scorer gets only the ones it
+    declares. Targets are encoded once and shared by all batch scorers.
+    """
+    columns = {}
+    encoded = None
+    for name in names:
+        scorer = get_scorer(name)
+        kwargs = {k: context[k] for k in scorer.options if k in context}
+        if scorer.supports_batch:
+            if encoded is None:
+                encoded = encode_targets(targets)
+            columns[name] = scorer.batch(guide, encoded, **kwargs).tolist()
+        else:
+            columns[name] = [scorer.score(guide, t, **kwargs) for t in targets]
+    return columns
+
+
+def scorer_bounds(name: str, guide: str, max_mismatches: int, **context) -> Optional[np.ndarray]:
+    """`Scorer.bounds` of the named scorer for `guide`, or None if it declares none."""
+    scorer = get_scorer(name)
+    if scorer.bounds is None:
+        return None
+    return scorer.bounds(guide, max_mismatches, **{k: context[k] for k in scorer.options if k in context})
+
+
+register_scorer("pw", position_weighted_score, partial(score_batch, method="pw"), bounds=partial(score_bounds, method="pw"))
+register_scorer("mit", mit_like_score, partial(score_batch, method="mit"), bounds=partial(score_bounds, method="mit"))
+register_scorer("cfd", cfd_score, partial(score_batch, method="cfd"), options=("pam",), bounds=partial(score_bounds, method="cfd"))
+register_scorer("cfd_full", cfd_score_with_table, partial(score_batch, method="cfd_full"), options=("table",), bounds=partial(score_bounds, method="cfd_full"))
+
+
+# Score memo ------------------------------------------------------------------
+
+DEFAULT_SCORE_CACHE_SIZE = 65536
+
+
+class ScoreCache:
+    """Bounded LRU memo of score columns in front of `score_columns`.
+
+    Entries are keyed by ``(guide, target)``. For a fixed guide the target
+    determines the mismatch signature (positions plus substituted bases) and
+    vice versa, and every scorer depends only on that signature and the
+    search context, so repeated targets (e.g. copies of a repeat element)
+    are scored once. `hits` and `misses` count per-target lookups; with
+    ``maxsize=0`` nothing is cached.
+    """
+
+    def __init__(self, names: Sequence[str], maxsize: int = DEFAULT_SCORE_CACHE_SIZE, **context):
+        if maxsize < 0:
+            raise ValueError("maxsize must be non-negative")
+        self.names = list(names)
+        self.maxsize = maxsize
+        self.context = context
+        self.hits = 0
+        self.misses = 0
+        self._memo: "OrderedDict[Tuple[str, str], Tuple[float, ...]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._memo)
+
+    def info(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._memo), "maxsize": self.maxsize}
+
+    def score(self, guide: str, targets: Sequence[str]) -> Dict[str, List[float]]:
+        """Same result as ``score_columns(guide, targets, names, **context)``."""
+        memo = self._memo
+        rows: List[Optional[Tuple[float, ...]]] = []
+        missing: Dict[str, List[int]] = {}
+        for i, t in enumerate(targets):
+            row = memo.get((guide, t))
+            if row is None:
+                # repeats within one call are hits on the first occurrence
+                if t in missing:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                missing.setdefault(t, []).append(i)
+            else:
+                memo.move_to_end((guide, t))
+                self.hits += 1
+            rows.append(row)
+        if missing:
+            # each distinct missing target is scored once, in one batch
+            fresh = score_columns(guide, list(missing), self.names, **self.context)
+            for j, (t, idx) in enumerate(missing.items()):
+                row = tuple(fresh[name][j] for name in self.names)
+                for i in idx:
+                    rows[i] = row
+                if self.maxsize:
+                    memo[(guide, t)] = row
+            while len(memo) > self.maxsize:
+                memo.popitem(last=False)
+        return {name: [row[k] for row in rows] for k, name in enumerate(self.names)}
+
+
+# Guide specificity -----------------------------------------------------------
+
+
+def guide_specificity(off_target_sum: float) -> float:
+    """Guide specificity (0-100) from summed off-target scores: ``100 * 100 / (100 + sum)``.
+
+    This is the MIT guide score of Hsu et al. (2013), used in the same form
+    for CFD; a guide without off-targets scores 100.
+    """
+    return 100.0 * 100.0 / (100.0 + off_target_sum)
+
+
+class SpecificityAggregator:
+    """Running sum of one scorer's hit scores for a guide, mergeable across workers.
+
+    `add` takes the scores of a block of the guide's hits; `merge` folds in
+    an aggregator filled from another part of the hit stream (e.g. genome
+    chunks scanned by another worker), so the hits themselves are never
+    kept. Perfect matches are summed separately as well, so that one of
+    them can be left out as the guide's on-target site.
+    """
+
+    __slots__ = ("name", "total", "count", "perfect", "perfect_total")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.total = 0.0
+        self.count = 0
+        self.perfect = 0
+        self.perfect_total = 0.0
+
+    def add(self, scores: Sequence[float], perfect: Sequence[bool] = None) -> None:
+        """Add hit scores; `perfect` flags the hits that are perfect (gapless, mismatch-free) matches."""
+        self.total += float(sum(scores))
+        self.count += len(scores)
+        if perfect is not None:
+            for s, p in zip(scores, perfect):
+                if p:
+                    self.perfect += 1
+                    self.perfect_total += float(s)
+
+    def merge(self, other: "SpecificityAggregator") -> "SpecificityAggregator":
+        if other.name != self.name:
+            raise ValueError(f"cannot merge {other.name} scores into {self.name} scores")
+        self.total += other.total
+        self.count += other.count
+        self.perfect += other.perfect
+        self.perfect_total += other.perfect_total
+        return self
+
+    def off_target_sum(self, exclude_on_target: bool = True) -> float:
+        """Summed scores, less one perfect match when `exclude_on_target` and there is one."""
+        if exclude_on_target and self.perfect:
+            return self.total - self.perfect_total / self.perfect
+        return self.total
+
+    def specificity(self, exclude_on_target: bool = True) -> float:
+        return guide_specificity(self.off_target_sum(exclude_on_target))
+
+
+class GuideSummary:
+    """Mergeable summary of one guide's hits: counts by mismatches and a `SpecificityAggregator` per scorer."""
+
+    __slots__ = ("hits", "perfect", "by_mismatches", "aggregators")
+
+    def __init__(self, names: Sequence[str]):
+        self.hits = 0
+        self.perfect = 0
+        self.by_mismatches: Dict[int, int] = {}
+        self.aggregators = {name: SpecificityAggregator(name) for name in names}
+
+    def add(self, mismatches: Sequence[int], columns: Dict[str, Sequence[float]], perfect: Sequence[bool]) -> None:
+        """Add a block of hits: their mismatch counts, score columns (as `score_columns` returns) and perfect-match flags."""
+        self.hits += len(mismatches)
+        self.perfect += sum(1 for p in perfect if p)
+        for m in mismatches:
+            self.by_mismatches[m] = self.by_mismatches.get(m, 0) + 1
+        for name, agg in self.aggregators.items():
+            agg.add(columns[name], perfect)
+
+    def merge(self, other: "GuideSummary") -> "GuideSummary":
+        self.hits += other.hits
+        self.perfect += other.perfect
+        for m, n in other.by_mismatches.items():
+            self.by_mismatches[m] = self.by_mismatches.get(m, 0) + n
+        for name, agg in self.aggregators.items():
+            agg.merge(other.aggregators[name])
+        return self
+
+    def row(self, max_mismatches: int, exclude_on_target: bool = True) -> Dict:
+        """``hits``, ``off_targets``, ``mm0`` ... ``mm<max_mismatches>``, and ``<name>_specificity`` and ``<name>_sum`` per scorer.
+
+        With `exclude_on_target`, one perfect match (if any) is taken to be
+        the guide's own site and left out of everything but ``hits``.
+        """
+        own = 1 if exclude_on_target and self.perfect else 0
+        row = {"hits": self.hits, "off_targets": self.hits - own}
+        for m in range(max_mismatches + 1):
+            row[f"mm{m}"] = self.by_mismatches.get(m, 0) - (own if m == 0 else 0)
+        for name, agg in self.aggregators.items():
+            row[f"{name}_specificity"] = agg.specificity(exclude_on_target)
+            row[f"{name}_sum"] = agg.off_target_sum(exclude_on_target)
+        return row
+
+
+def summarize_hits(hits: Iterable[Dict], guides: Mapping[str, str], names: Sequence[str], cache: "ScoreCache" = None, block_size: int = 4096, **context) -> Dict[str, GuideSummary]:
+    """Fold a stream of hit dicts (with ``guide_id``) into a `GuideSummary` per guide id of `guides`.
+
+    Hits are scored `block_size` per guide at a time, through `cache` if
+    given, and then dropped. `context` is passed to the scorers.
+    """
+    cache = cache if cache is not None else ScoreCache(names, **context)
+    summaries = {gid: GuideSummary(names) for gid in guides}
+    pending: Dict[str, List[Dict]] = {gid: [] for gid in guides}
+
+    def flush(gid):
+        block = pending[gid]
+        # bulged hits are scored on the target bases paired with the guide
+        targets = [bulges.paired_target(h["aligned_guide"], h["aligned_target"]) if "aligned_guide" in h else h["target_seq"] for h in block]
+        perfect = [h["mismatches"] == 0 and not h.get("dna_bulges") and not h.get("rna_bulges") for h in block]
+        summaries[gid].add([h["mismatches"] for h in block], cache.score(guides[gid], targets), perfect)
+        pending[gid] = []
+
+    for h in hits:
+        gid = h["guide_id"]
+        pending[gid].append(h)
+        if len(pending[gid]) >= block_size:
+            flush(gid)
+    for gid in guides:
+        if pending[gid]:
+            flush(gid)
+    return summaries
@@ -1,7 +1,64 @@
-from typing import Dict, List, Tuple
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from math import comb
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
 
-from Bio import SeqIO
-from Bio.Seq import Seq
+import numpy as np
+
+from . import bulges, fasta, genome, readers, scoring, sorting
+
+# batches up to this size are checked against every window directly instead
+# of going through the seed table
+_BRUTE_FORCE_GUIDES = 8
+# cap on (guide, seed variant) entries in a batch seed table, and on the
+# variants enumerated for a single guide seed
+_MAX_SEED_TABLE = 20_000_000
+_MAX_SEED_VARIANTS = 4096
+
+# version of the hit semantics (windows, mismatch counting, bulges, hit
+# fields); bump it when they change so cached results are not reused
+ENGINE_VERSION = 1
+
+# callables notified as each record's scan completes (see add_metrics_hook)
+_METRICS_HOOKS: List[Callable[[str, Dict], None]] = []
+
+# largest q for the q-gram prefilter (codes must fit in an int64)
+MAX_PREFILTER_Q = 16
+
+# records are scanned in chunks of this many window starts; chunks are the
+# unit of work for parallel scans
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# allow shorter guides (trimmed from canonical 20 nt) to match when the PAM
+# appears a few bases downstream of the truncated guide. Use a small
+# canonical length to derive a reasonable search offset.
+CANONICAL_GUIDE_LEN = 20
+
+# IUPAC nucleotide codes accepted in PAM patterns. A pattern base also matches
+# its own letter literally (an 'R' in the genome satisfies an 'R' in the PAM);
+# 'N' matches any character.
+IUPAC = {
+    "A": "A",
+    "C": "C",
+    "G": "G",
+    "T": "TU",
+    "U": "TU",
+    "R": "AG",
+    "Y": "CT",
+    "S": "CG",
+    "W": "AT",
+    "K": "GT",
+    "M": "AC",
+    "B": "CGT",
+    "D": "AGT",
+    "H": "ACT",
+    "V": "ACG",
+    "N": None,
+}
 
 
 def _matches_pam(pam_seq: str, pam_pattern: str = "NGG") -> bool:
@@ -10,88 +67,1090 @@ def _matches_pam(pam_seq: str, pam_pattern: str = "NGG") -> bool:
     if len(pam_seq) != len(pam_pattern):
         return False
     for a, b in zip(pam_seq, pam_pattern):
-        if b == "N":
+        allowed = IUPAC.get(b, b)
+        if allowed is None:
             continue
-        if a != b:
+        if a != b and a not in allowed:
             return False
     return True
 
 
+class CompiledPam:
+    """A PAM pattern compiled to per-position byte lookup tables for both strands.
+
+    ``forward[p]`` is a 256-entry boolean table telling whether a byte
+    satisfies pattern position ``p``; ``reverse`` holds the same for the
+    reverse-complemented pattern, so minus-strand PAMs (e.g. ``CCN`` for
+    ``NGG``) are found on the forward sequence. Wildcard positions are
+    skipped entirely.
+    """
+
+    def __init__(self, pattern: str):
+        pattern = pattern.upper()
+        if not pattern:
+            raise ValueError("PAM pattern must not be empty")
+        bad = sorted(set(pattern) - set(IUPAC))
+        if bad:
+            raise ValueError(f"PAM pattern {pattern!r} contains non-IUPAC characters: {''.join(bad)}")
+        self.pattern = pattern
+        self.forward = []
+        self.reverse = []
+        P = len(pattern)
+        for p, b in enumerate(pattern):
+            allowed = IUPAC[b]
+            if allowed is None:
+                continue
+            table = np.zeros(256, dtype=bool)
+            table[np.frombuffer((allowed + b).encode("ascii"), dtype=np.uint8)] = True
+            self.forward.append((p, table))
+            # forward byte c sits opposite pattern base b on the minus strand
+            # when its complement satisfies b
+            self.reverse.append((P - 1 - p, table[genome.COMPLEMENT]))
+
+    def __len__(self) -> int:
+        return len(self.pattern)
+
+    def _scan(self, raw: np.ndarray, tables) -> np.ndarray:
+        n_pos = len(raw) - len(self.pattern) + 1
+        if n_pos <= 0:
+            return np.zeros(0, dtype=bool)
+        ok = np.ones(n_pos, dtype=bool)
+        for p, table in tables:
+            ok &= table[raw[p : p + n_pos]]
+        return ok
+
+    def sites(self, seq, strands: str = "+-") -> Tuple[np.ndarray, np.ndarray]:
+        """Return PAM positions on both strands of an upper-case sequence.
+
+        `seq` is text, bytes, an array of ASCII codes or a
+        `genome.PackedSequence`. Both arrays hold the leftmost forward-strand
+        coordinate of the PAM: plus-strand matches of the pattern, and
+        matches of its reverse complement, which are PAMs on the minus
+        strand. A strand left out of `strands` comes back empty.
+        """
+        if isinstance(seq, str):
+            seq = seq.encode("ascii")
+        elif isinstance(seq, genome.PackedSequence):
+            seq = seq.ascii()
+        raw = np.frombuffer(seq, dtype=np.uint8) if isinstance(seq, (bytes, bytearray, memoryview)) else seq
+        none = np.zeros(0, dtype=np.int64)
+        plus = np.flatnonzero(self._scan(raw, self.forward)) if "+" in strands else none
+        minus = np.flatnonzero(self._scan(raw, self.reverse)) if "-" in strands else none
+        return plus, minus
+
+
+@lru_cache(maxsize=64)
+def compile_pam(pam: str) -> CompiledPam:
+    """Compile (and cache) an IUPAC PAM pattern such as ``NGG``, ``NRG``, ``NNGRRT`` or ``TTTV``."""
+    return CompiledPam(pam)
+
+
 def _hamming_positions(a: str, b: str) -> List[int]:
     assert len(a) == len(b)
     return [i for i, (x, y) in enumerate(zip(a.upper(), b.upper())) if x != y]
 
 
-def scan_fasta_for_guide(guide: str, fasta_path: str, pam: str = "NGG", max_mismatches: int = 4) -> List[Dict]:
-    """Naive PAM-aware scan of a FASTA; returns a list of candidate off-targets
+def _mismatch_mask(guide: str, target: str, max_mismatches: int) -> Optional[int]:
+    """Bitmask of the positions where `guide` and `target` differ (bit p for position p).
 
-    Each hit dict contains: seq_id, start, end (0-based, inclusive), strand ('+'/'-'), target_seq,
-    mismatches (int) and mismatch_positions (list of 0-based positions).
+    Gives up and returns None as soon as more than `max_mismatches` differ.
+    """
+    mask = 0
+    n = 0
+    for p, (x, y) in enumerate(zip(guide, target)):
+        if x != y:
+            n += 1
+            if n > max_mismatches:
+                return None
+            mask |= 1 << p
+    return mask
+
+
+def mask_positions(mask: int) -> List[int]:
+    """Expand a mismatch bitmask into the sorted list of positions."""
+    return [p for p in range(mask.bit_length()) if mask >> p & 1]
+
+
+def _substitutions(target: str, mask: int) -> int:
+    """Pack the target bases at the mismatch positions of `mask`, 8 bits each in position order.
+
+    Together with the mask this identifies the substitutions of a hit
+    against its guide.
+    """
+    subs = 0
+    for j, p in enumerate(mask_positions(mask)):
+        subs |= ord(target[p]) << (8 * j)
+    return subs
+
+
+def _reverse_mask(mask: int, length: int) -> int:
+    return int(format(mask, f"0{length}b")[::-1], 2) if length else 0
+
+
+def _join_words(words: np.ndarray) -> int:
+    return sum(int(w) << (genome.BASES_PER_WORD * i) for i, w in enumerate(words))
+
+
+def _max_pam_offset(guide_len: int) -> int:
+    return max(0, CANONICAL_GUIDE_LEN - guide_len)
+
+
+def _windows_from_sites(plus_sites: np.ndarray, minus_sites: np.ndarray, n: int, guide_len: int, pam_len: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Turn PAM positions into window starts for a guide length.
+
+    A window qualifies when a PAM lies immediately 3' of it on its strand, or
+    up to `_max_pam_offset(guide_len)` bases further. Plus-strand starts come
+    back ascending; minus-strand starts (forward coordinates) descending,
+    which is ascending along the minus strand.
+    """
+    offsets = np.arange(_max_pam_offset(guide_len) + 1)
+    plus = (plus_sites[:, None] - guide_len - offsets).reshape(-1)
+    plus = np.unique(plus[(plus >= 0) & (plus <= n - guide_len - pam_len)])
+    # on the minus strand the PAM sits 5' of the window in forward coordinates
+    minus = (minus_sites[:, None] + pam_len + offsets).reshape(-1)
+    minus = np.unique(minus[(minus >= pam_len) & (minus <= n - guide_len)])[::-1]
+    return plus, minus
+
+
+def pam_windows(seq, guide_len: int, pam: str = "NGG") -> Tuple[np.ndarray, np.ndarray]:
+    """Return the starts of all PAM-adjacent windows on both strands of `seq`.
+
+    See `_windows_from_sites` for ordering; all coordinates are forward-strand.
+    """
+    compiled = compile_pam(pam)
+    plus_sites, minus_sites = compiled.sites(seq)
+    return _windows_from_sites(plus_sites, minus_sites, len(seq), guide_len, len(compiled))
+
+
+def verify_windows(seq: genome.PackedSequence, guide: str, starts, max_mismatches: int, reverse: bool = False) -> Iterator[Tuple[int, str, int, int]]:
+    """Yield ``(start, target, mismatch_mask, substitutions)`` for windows within `max_mismatches`.
+
+    Mismatches are counted on the packed sequence for all windows at once,
+    and the mismatch mask of a passing window is read off the same XOR
+    lanes. With `reverse` the windows are minus-strand targets: their forward
+    bases are compared against the reverse-complemented guide, which gives
+    the same counts without reverse-complementing any sequence. Windows that
+    touch an ambiguous base are re-checked character by character, stopping
+    at ``max_mismatches + 1``, so the result is identical to
+    `_hamming_positions` on the text. See `_mismatch_mask` and
+    `_substitutions` for the encoding.
     """
-    guide = guide.upper()
     L = len(guide)
-    hits = []
-    # allow shorter guides (trimmed from canonical 20 nt) to match when the PAM
-    # appears a few bases downstream of the truncated guide. Use a small
-    # canonical length to derive a reasonable search offset.
-    CANONICAL_GUIDE_LEN = 20
-    max_offset = max(0, CANONICAL_GUIDE_LEN - L)
+    starts = np.asarray(starts, dtype=np.int64)
+    if not len(starts):
+        return
+    oriented = genome.reverse_complement(guide) if reverse else guide
+    words, care, forced = genome.pack_guide(oriented)
+    lanes = genome.mismatch_lanes(genome.window_words(seq, starts, L), words, care)
+    ambiguous = seq.is_ambiguous(starts, L)
+    keep = np.flatnonzero((genome.popcount(lanes).sum(axis=1) + forced <= max_mismatches) | ambiguous)
+    masks = genome.lane_masks(lanes[keep])
+    forced_mask = genome.ambiguous_mask(oriented)
+    for i, m in zip(keep, masks):
+        s = int(starts[i])
+        target = seq.text(s, s + L)
+        if reverse:
+            target = genome.reverse_complement(target)
+        if ambiguous[i]:
+            mask = _mismatch_mask(guide, target, max_mismatches)
+            if mask is None:
+                continue
+        else:
+            # a guide-ambiguous base mismatches every ACGT target base
+            mask = _join_words(m) | forced_mask
+            if reverse:
+                mask = _reverse_mask(mask, L)
+        yield s, target, mask, _substitutions(target, mask)
+
+
+def _iter_chunks(fasta_path: str, pad: int, chunk_size: int, catalog=None, stages: Dict = None) -> Iterator[Tuple[str, int, int, str, int, int, bool, Optional[Tuple[np.ndarray, np.ndarray]]]]:
+    """Split every FASTA record into chunks of window starts, front to back.
+
+    Yields ``(seq_id, n, lo, text, a, b, last, sites)``: the chunk owns the
+    windows of both strands starting in ``[a, b)``; `text` is the record
+    slice starting at `lo`, padded by `pad` bases on each side so that every
+    PAM and target base of an owned window lies inside it. `last` marks the
+    final chunk of a record. With a `catalog.PamCatalog`, `sites` holds the
+    catalogued ``(plus, minus)`` PAM positions inside `text`, relative to
+    `lo`; otherwise it is None and the chunk's PAMs are enumerated.
+
+    For ``.2bit`` input `text` is a `genome.PackedSequence`. Compressed
+    input is read and decompressed in a background thread, a few chunks
+    ahead of the caller (see `readers.prefetch`). Time spent parsing and
+    reading is added to the ``read`` entry of `stages`, if given.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    chunks = _read_chunks(fasta_path, pad, chunk_size, catalog, stages)
+    return readers.prefetch(chunks) if isinstance(fasta_path, str) and readers.is_compressed(fasta_path) else chunks
+
+
+def _read_chunks(fasta_path: str, pad: int, chunk_size: int, catalog=None, stages: Dict = None) -> Iterator[Tuple[str, int, int, str, int, int, bool, Optional[Tuple[np.ndarray, np.ndarray]]]]:
+    P = len(compile_pam(catalog.pam)) if catalog is not None else 0
+    laps = _Laps(stages)
+    records = iter_records(fasta_path)
+    while True:
+        # parsing a record (whole records for non-indexed FASTA) counts as reading
+        laps.restart()
+        try:
+            seq_id, n, read = next(records)
+        except StopIteration:
+            laps("read")
+            return
+        if catalog is not None:
+            if seq_id not in catalog:
+                raise ValueError(f"record '{seq_id}' is not in the PAM catalog")
+            all_sites = catalog.sites(seq_id)
+        for a in range(0, n, chunk_size):
+            b = min(n, a + chunk_size)
+            lo, hi = max(0, a - pad), min(n, b + pad)
+            sites = None
+            if catalog is not None:
+                sites = tuple(x[np.searchsorted(x, lo) : np.searchsorted(x, hi - P, side="right")] - lo for x in all_sites)
+            text = read(lo, hi)
+            laps("read")
+            yield seq_id, n, lo, text, a, b, b == n, sites
+            laps.restart()
+
+
+def iter_records(fasta_path: str) -> Iterator[Tuple[str, int, Callable[[int, int], str]]]:
+    """Yield ``(seq_id, length, read)`` per record, where ``read(lo, hi)`` returns upper-case text.
+
+    Indexable FASTA files are read through a memory map, one slice at a time;
+    other plain FASTA goes through `Bio.SeqIO` one record at a time. gzip,
+    BGZF and ``.2bit`` genomes are read by `readers.iter_records`, whose
+    ``.2bit`` records return a `genome.PackedSequence` instead of text, as
+    do the records of a `ResidentGenome`.
+    """
+    if isinstance(fasta_path, ResidentGenome):
+        yield from fasta_path.iter_records()
+        return
+    fmt = readers.detect_format(fasta_path)
+    if fmt != "fasta":
+        yield from readers.iter_records(fasta_path, fmt)
+        return
+    try:
+        fa = fasta.FastaFile(fasta_path)
+    except fasta.FaiError:
+        fa = None
+    if fa is not None:
+        with fa:
+            for view in fa:
+                yield view.name, len(view), lambda lo, hi, view=view: view[lo:hi].decode("ascii").upper()
+        return
+    # Biopython is only needed here, and is slow to import
+    from Bio import SeqIO
 
     for rec in SeqIO.parse(fasta_path, "fasta"):
         seq = str(rec.seq).upper()
-        n = len(seq)
-        # scan plus strand: guide (L) possibly followed by PAM within a small
-        # downstream offset when guides are shorter than canonical length.
-        for i in range(0, n - L - len(pam) + 1):
-            # check possible offsets for the PAM (0 means immediately adjacent)
-            for off in range(0, max_offset + 1):
-                start_pam = i + L + off
-                pam_seq = seq[start_pam : start_pam + len(pam)]
-                if _matches_pam(pam_seq, pam):
-                    target = seq[i : i + L]
-                    mism_pos = _hamming_positions(guide, target)
-                    if len(mism_pos) <= max_mismatches:
-                        hits.append(
-                            {
-                                "seq_id": rec.id,
-                                "start": i,
-                                "end": i + L - 1,
-                                "strand": "+",
-                                "target_seq": target,
-                                "mismatches": len(mism_pos),
-                                "mismatch_positions": mism_pos,
-                            }
-                        )
-                    # once a PAM is matched for this window, don't record the
-                    # same target multiple times for other offsets
-                    break
-        # scan reverse complement (map coords back to original)
-        rc = str(Seq(seq).reverse_complement())
-        for i in range(0, n - L - len(pam) + 1):
-            for off in range(0, max_offset + 1):
-                start_pam = i + L + off
-                pam_seq = rc[start_pam : start_pam + len(pam)]
-                if _matches_pam(pam_seq, pam):
-                    target_rc = rc[i : i + L]
-                    # rc already contains the forward-oriented guide when the
-                    # original sequence carries the reverse-complemented target.
-                    # So use the substring directly for comparison.
-                    target = target_rc
-                    mism_pos = _hamming_positions(guide, target)
-                    if len(mism_pos) <= max_mismatches:
-                        # map rc coords back to original sequence indices
-                        orig_start = n - i - L
-                        orig_end = n - i - 1
-                        hits.append(
-                            {
-                                "seq_id": rec.id,
-                                "start": orig_start,
-                                "end": orig_end,
-                                "strand": "-",
-                                "target_seq": target,
-                                "mismatches": len(mism_pos),
-                                "mismatch_positions": mism_pos,
-                            }
-                        )
-                    break
-    return hits
+        yield rec.id, len(seq), lambda lo, hi, seq=seq: seq[lo:hi]
+
+
+# bases read from the file at a time while a resident genome is packed
+_RESIDENT_READ = 1 << 20
+
+
+class ResidentGenome:
+    """A genome packed into memory once, accepted by the scan functions in place of a FASTA path.
+
+    Records are read a slice at a time and packed into one
+    `genome.PackedSequence` (2 bits per base plus ambiguity runs), so
+    repeated scans neither re-read nor decompress the file. `save` writes
+    the packed arrays to a directory and `load` memory-maps them, so
+    processes that load the same directory share one copy. Scans of a
+    resident genome return the same hits as scans of its file.
+    """
+
+    def __init__(self, fasta_path: str):
+        self.path = fasta_path
+        self.records: List[Dict] = []
+        builder = genome.PackedBuilder()
+        offset = 0
+        for seq_id, n, read in iter_records(fasta_path):
+            for a in range(0, n, _RESIDENT_READ):
+                builder.append(read(a, min(n, a + _RESIDENT_READ)))
+            self.records.append({"id": seq_id, "offset": offset, "length": n})
+            offset += n
+        self.seq = builder.finish()
+
+    @classmethod
+    def load(cls, path: str) -> "ResidentGenome":
+        """Memory-map a genome written by `save` to `path`."""
+        with open(os.path.join(path, "resident.json"), "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        resident = cls.__new__(cls)
+        resident.path = meta["path"]
+        resident.records = meta["records"]
+        resident.seq = genome.load_packed(path, meta["length"])
+        return resident
+
+    def save(self, out_dir: str) -> None:
+        """Write the packed genome to `out_dir`, for `load`."""
+        os.makedirs(out_dir, exist_ok=True)
+        genome.save_packed(self.seq, out_dir)
+        with open(os.path.join(out_dir, "resident.json"), "w", encoding="utf-8") as fh:
+            json.dump({"path": self.path, "length": self.seq.length, "records": self.records}, fh)
+
+    def __len__(self) -> int:
+        return self.seq.length
+
+    def iter_records(self) -> Iterator[Tuple[str, int, Callable[[int, int], genome.PackedSequence]]]:
+        for rec in self.records:
+            seq_id, offset = rec["id"], rec["offset"]
+            yield seq_id, rec["length"], lambda lo, hi, seq_id=seq_id, offset=offset: self.seq.slice(offset + lo, offset + hi, seq_id)
+
+
+def _check_catalog(catalog, compiled: CompiledPam) -> None:
+    if catalog is not None and catalog.pam != compiled.pattern:
+        raise ValueError(f"PAM catalog is for {catalog.pam}, not {compiled.pattern}")
+
+
+def _chunk_pad(max_guide_len: int, min_guide_len: int, pam_len: int) -> int:
+    # plus windows need their target, the PAM offset and the PAM downstream;
+    # minus windows need the PAM and its offset upstream
+    return max_guide_len + _max_pam_offset(min_guide_len) + pam_len
+
+
+def _chunk_windows(compiled: "CompiledPam", task, guide_lens: Iterable[int], bulge_budget: Tuple[int, int] = (0, 0), stats: Dict = None) -> Tuple[genome.PackedSequence, Dict[int, Tuple[np.ndarray, np.ndarray]], Dict[int, Tuple[np.ndarray, np.ndarray]]]:
+    """Pack a chunk and return its owned ``(plus, minus)`` window starts per guide length, chunk-relative.
+
+    The third element maps each guide length to the chunk-relative
+    ``(plus, minus)`` anchors of bulged targets (see `_bulge_anchors`); it
+    is empty when `bulge_budget` (DNA, RNA) is zero. The PAM sites at
+    positions in ``[a, b)`` are counted in ``stats["pam_sites"]``.
+    """
+    seq_id, n, lo, text, a, b, _, sites = task
+    packed = text if isinstance(text, genome.PackedSequence) else genome.PackedSequence.from_text(seq_id, text)
+    plus_sites, minus_sites = compiled.sites(text) if sites is None else sites
+    if stats is not None:
+        stats["pam_sites"] += sum(int(np.count_nonzero((x >= a - lo) & (x < b - lo))) for x in (plus_sites, minus_sites))
+    windows = {}
+    anchors = {}
+    for L in guide_lens:
+        plus, minus = _windows_from_sites(plus_sites + lo, minus_sites + lo, n, L, len(compiled))
+        windows[L] = tuple(s[(s >= a) & (s < b)] - lo for s in (plus, minus))
+        if any(bulge_budget):
+            anchors[L] = _bulge_anchors(plus_sites + lo, minus_sites + lo, n, L, len(compiled), a, b, *bulge_budget)
+            anchors[L] = tuple(x - lo for x in anchors[L])
+    return packed, windows, anchors
+
+
+def _bulge_anchors(plus_sites: np.ndarray, minus_sites: np.ndarray, n: int, guide_len: int, pam_len: int, a: int, b: int, max_dna_bulges: int, max_rna_bulges: int) -> Tuple[np.ndarray, np.ndarray]:
+    """PAM-proximal target ends that may start a bulged target in ``[a, b)``.
+
+    A plus-strand anchor is the position right after the target (where its
+    PAM, or the PAM offset, begins), a minus-strand anchor the forward start
+    of the target; the PAM may sit up to `_max_pam_offset(guide_len)` bases
+    away, as for gapless windows. Plus anchors come back ascending, minus
+    anchors descending.
+    """
+    offsets = np.arange(_max_pam_offset(guide_len) + 1)
+    plus = np.unique((plus_sites[:, None] - offsets).reshape(-1))
+    plus = plus[(plus >= a + guide_len - max_rna_bulges) & (plus < b + guide_len + max_dna_bulges) & (plus > 0)]
+    minus = np.unique((minus_sites[:, None] + pam_len + offsets).reshape(-1))
+    minus = minus[(minus >= a) & (minus < b) & (minus < n)][::-1]
+    return plus, minus
+
+
+def _verify_bulges(seq: genome.PackedSequence, guide: str, anchors: np.ndarray, max_mismatches: int, bulge_budget: Tuple[int, int], owned: Tuple[int, int], reverse: bool = False) -> Iterator[Tuple[int, int, str, int, int, Tuple[int, int, str, str]]]:
+    """Yield ``(rank, start, target, mismatch_mask, substitutions, bulge)`` for bulged targets.
+
+    `bulge` is ``(dna_bulges, rna_bulges, aligned_guide, aligned_target)``;
+    the mask and substitutions refer to guide positions, as for gapless
+    hits. See `bulges.verify_anchors`.
+    """
+    L = len(guide)
+    for rank, start, target, mism, aligned_guide, aligned_target in bulges.verify_anchors(seq, guide, anchors, max_mismatches, *bulge_budget, reverse=reverse, owned=owned):
+        mask = sum(1 << p for p in mism)
+        paired = bulges.paired_target(aligned_guide, aligned_target)
+        d, r = max(0, len(target) - L), max(0, L - len(target))
+        yield rank, start, target, mask, _substitutions(paired, mask), (d, r, aligned_guide, aligned_target)
+
+
+def _merge_bulged(found: list, bulged: list, reverse: bool) -> list:
+    """Merge gapless ``(start, ...)`` rows and ``(rank, start, ...)`` bulged rows into scan order.
+
+    At the same start gapless rows come first, then bulge kinds by rank.
+    """
+    rows = [((row[0], 0), row) for row in found] + [((row[1], row[0]), row[1:]) for row in bulged]
+    rows.sort(key=(lambda r: (-r[0][0], r[0][1])) if reverse else (lambda r: r[0]))
+    return [row for _, row in rows]
+
+
+def _qgram_need(guide_len: int, q: int, max_mismatches: int) -> int:
+    # a substitution changes at most q of the L - q + 1 positional q-grams
+    return guide_len - q + 1 - max_mismatches * q
+
+
+def _guide_qgrams(guide: str, q: int) -> np.ndarray:
+    """Positional q-gram codes of a guide; q-grams with a non-ACGT base get -1, which never matches."""
+    codes = genome.CODE[np.frombuffer(guide.encode("ascii"), dtype=np.uint8)].astype(np.int64)
+    n = max(0, len(codes) - q + 1)
+    out = np.zeros(n, dtype=np.int64)
+    bad = np.zeros(n, dtype=bool)
+    for j in range(q):
+        part = codes[j : j + n]
+        bad |= part == genome.AMBIGUOUS
+        out |= part << (2 * j)
+    out[bad] = -1
+    return out
+
+
+def _qgram_filter(seq: genome.PackedSequence, qgrams: np.ndarray, starts: np.ndarray, guide_qgrams: np.ndarray, owners: np.ndarray, guide_len: int, need: int) -> np.ndarray:
+    """Which windows may be within the mismatch budget, by the q-gram lemma.
+
+    Window ``i`` (starting at ``starts[i]``) is compared position by position
+    against row ``owners[i]`` of `guide_qgrams`; it is dropped as soon as it
+    can no longer share `need` positional q-grams. Windows touching an
+    ambiguous base always pass, so the filter never drops a hit.
+    """
+    keep = np.ones(len(starts), dtype=bool)
+    if need <= 0 or not len(starts):
+        return keep
+    n_q = guide_qgrams.shape[1]
+    active = np.arange(len(starts))
+    count = np.zeros(len(starts), dtype=np.int64)
+    for j in range(n_q):
+        count += qgrams[starts[active] + j] == guide_qgrams[owners[active], j]
+        alive = count + (n_q - 1 - j) >= need
+        if not alive.all():
+            active = active[alive]
+            count = count[alive]
+    keep[:] = False
+    keep[active] = True
+    return keep | seq.is_ambiguous(starts, guide_len)
+
+
+def _prefilter(seq: genome.PackedSequence, qgrams: np.ndarray, starts: np.ndarray, guide: str, q: int, max_mismatches: int, stats: Dict[str, int]) -> np.ndarray:
+    """Drop windows of `starts` that the q-gram lemma rules out for `guide` (already strand-oriented)."""
+    gq = _guide_qgrams(guide, q)[None, :]
+    keep = _qgram_filter(seq, qgrams, starts, gq, np.zeros(len(starts), dtype=np.int64), len(guide), _qgram_need(len(guide), q, max_mismatches))
+    stats["prefiltered"] += int(len(starts) - keep.sum())
+    return starts[keep]
+
+
+def _new_stats(task) -> Dict:
+    return {"bases": task[5] - task[4], "windows": 0, "pam_sites": 0, "candidates": 0, "prefiltered": 0, "stages": {}}
+
+
+class _Laps:
+    """Adds the wall and CPU time since the previous lap to a stage of `stages` (a no-op without `stages`)."""
+
+    def __init__(self, stages: Optional[Dict[str, List[float]]]):
+        self.stages = stages
+        self.restart()
+
+    def restart(self) -> None:
+        if self.stages is not None:
+            self.wall, self.cpu = time.perf_counter(), time.thread_time()
+
+    def __call__(self, stage: str) -> None:
+        if self.stages is None:
+            return
+        wall, cpu = time.perf_counter(), time.thread_time()
+        total = self.stages.setdefault(stage, [0.0, 0.0])
+        total[0] += wall - self.wall
+        total[1] += cpu - self.cpu
+        self.wall, self.cpu = wall, cpu
+
+
+def _scan_chunk(guide: str, pam: str, max_mismatches: int, prefilter_q: int, bulge_budget: Tuple[int, int], task) -> Tuple[str, bool, list, list, Dict[str, int]]:
+    """Scan both strands of one chunk for one guide.
+
+    Returns ``(seq_id, last, plus_found, minus_found, stats)`` where the
+    found lists hold ``(start, target, mismatch_mask, substitutions)`` in
+    scan order, with a fifth ``bulge`` element (see `_verify_bulges`) on
+    bulged hits, and `stats` counts the chunk's windows and those rejected
+    by the q-gram prefilter (see `scan_fasta_for_guide`), and the wall and
+    CPU time of each scan stage under ``stats["stages"]``.
+    """
+    seq_id, lo, last = task[0], task[2], task[6]
+    stats = _new_stats(task)
+    laps = _Laps(stats["stages"])
+    packed, windows, anchors = _chunk_windows(compile_pam(pam), task, [len(guide)], bulge_budget, stats)
+    plus, minus = windows[len(guide)]
+    stats["windows"] = stats["candidates"] = len(plus) + len(minus)
+    laps("pam")
+    if prefilter_q and _qgram_need(len(guide), prefilter_q, max_mismatches) > 0:
+        qgrams = genome.qgram_codes(packed, prefilter_q)
+        plus = _prefilter(packed, qgrams, plus, guide, prefilter_q, max_mismatches, stats)
+        # minus windows are compared on their forward bases
+        minus = _prefilter(packed, qgrams, minus, genome.reverse_complement(guide), prefilter_q, max_mismatches, stats)
+        laps("prefilter")
+    found = [[(s + lo, t, m, x) for s, t, m, x in verify_windows(packed, guide, starts, max_mismatches, reverse=reverse)] for starts, reverse in ((plus, False), (minus, True))]
+    laps("verify")
+    if anchors:
+        owned = (task[4] - lo, task[5] - lo)
+        for j, reverse in ((0, False), (1, True)):
+            bulged = [(k, s + lo, t, m, x, bulge) for k, s, t, m, x, bulge in _verify_bulges(packed, guide, anchors[len(guide)][j], max_mismatches, bulge_budget, owned, reverse=reverse)]
+            found[j] = _merge_bulged(found[j], bulged, reverse)
+        laps("bulges")
+    return seq_id, last, found[0], found[1], stats
+
+
+def _check_prefilter(prefilter_q: int) -> None:
+    if not 0 <= prefilter_q <= MAX_PREFILTER_Q:
+        raise ValueError(f"prefilter_q must be between 0 (off) and {MAX_PREFILTER_Q}")
+
+
+def check_bulges(max_dna_bulges: int, max_rna_bulges: int, guide_lens: Iterable[int]) -> None:
+    """Raise ValueError for negative bulge budgets or guides too long to align with bulges."""
+    if max_dna_bulges < 0 or max_rna_bulges < 0:
+        raise ValueError("bulge budgets must be non-negative")
+    if (max_dna_bulges or max_rna_bulges) and max(guide_lens, default=0) > bulges.MAX_GUIDE_LEN:
+        raise ValueError(f"bulge search supports guides of at most {bulges.MAX_GUIDE_LEN} bases")
+
+
+def _bulge_fields(bulge, guide: str, target: str) -> Dict:
+    d, r, aligned_guide, aligned_target = bulge if bulge is not None else (0, 0, guide, target)
+    return {"dna_bulges": d, "rna_bulges": r, "aligned_guide": aligned_guide, "aligned_target": aligned_target}
+
+
+def _add_stats(total: Optional[Dict], chunk: Dict) -> None:
+    if total is not None:
+        for k, v in chunk.items():
+            if isinstance(v, dict):
+                _add_stats(total.setdefault(k, {}), v)
+            elif isinstance(v, list):
+                total[k] = [x + y for x, y in zip(total.get(k, [0.0] * len(v)), v)]
+            else:
+                total[k] = total.get(k, 0) + v
+
+
+def add_metrics_hook(hook: Callable[[str, Dict], None]) -> None:
+    """Call ``hook(seq_id, counters)`` each time a scan finishes a record.
+
+    `counters` holds the record's ``bases``, ``windows`` (PAM-adjacent
+    windows examined), ``pam_sites``, ``candidates`` (window/guide pairs
+    reaching verification or the prefilter), ``prefiltered``, ``verified``
+    (candidates checked base by base), ``hits`` (hits yielded),
+    ``seconds`` (wall time from the end of the previous record to the
+    record's last hit, as seen by the consumer) and ``bases_per_second``.
+    Hooks run in the scanning process, for every scan, in the order added.
+    """
+    _METRICS_HOOKS.append(hook)
+
+
+def remove_metrics_hook(hook: Callable[[str, Dict], None]) -> None:
+    """Stop calling a hook added with `add_metrics_hook`."""
+    _METRICS_HOOKS.remove(hook)
+
+
+class _ScanMeter:
+    """Per-record counters of one scan, reported to `stats` and the metrics hooks."""
+
+    _COUNTERS = ("bases", "windows", "pam_sites", "candidates", "prefiltered")
+
+    def __init__(self, stats: Optional[Dict]):
+        self.stats = stats
+        self.counts = {}
+        self.hits = 0
+        self.start = time.perf_counter()
+
+    def chunk(self, chunk_stats: Dict) -> None:
+        _add_stats(self.stats, chunk_stats)
+        for k in self._COUNTERS:
+            self.counts[k] = self.counts.get(k, 0) + chunk_stats[k]
+
+    def done(self, seq_id: str) -> None:
+        if self.stats is None and not _METRICS_HOOKS:
+            self.counts, self.hits = {}, 0
+            return
+        now = time.perf_counter()
+        counters = {k: self.counts.get(k, 0) for k in self._COUNTERS}
+        counters["verified"] = counters["candidates"] - counters["prefiltered"]
+        counters["hits"] = self.hits
+        counters["seconds"] = now - self.start
+        counters["bases_per_second"] = counters["bases"] / counters["seconds"] if counters["seconds"] > 0 else 0.0
+        if self.stats is not None:
+            self.stats["verified"] = self.stats.get("verified", 0) + counters["verified"]
+            self.stats["hits"] = self.stats.get("hits", 0) + self.hits
+            self.stats.setdefault("contigs", {})[seq_id] = counters
+        for hook in list(_METRICS_HOOKS):
+            hook(seq_id, dict(counters))
+        self.counts, self.hits, self.start = {}, 0, now
+
+
+def _ordered_map(func: Callable, tasks: Iterable, workers: int = 1, initializer: Callable = None, initargs: tuple = ()) -> Iterator:
+    """Map `func` over `tasks`, in a process pool when ``workers > 1``.
+
+    Results are yielded in task order. At most ``2 * workers`` tasks are in
+    flight, so chunks are not all materialized up front.
+    """
+    if workers <= 1:
+        for task in tasks:
+            yield func(task)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as ex:
+        pending = deque()
+        for task in tasks:
+            pending.append(ex.submit(func, task))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_hits(guide: str, fasta_path: str, pam: str = "NGG", max_mismatches: int = 4, workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE, catalog=None, prefilter_q: int = 0, stats: Dict[str, int] = None, max_dna_bulges: int = 0, max_rna_bulges: int = 0) -> Iterator[Dict]:
+    """Yield the hits of `scan_fasta_for_guide` one by one, as they are found.
+
+    Each record is read once: both strands are scanned from the same chunk
+    buffer. Plus-strand hits are yielded as they are found; minus-strand hits
+    are reported back to front once the record is done, held in a
+    `sorting.ReversedChunks` that spills to disk, so memory use does not grow
+    with the number of hits.
+    """
+    guide = guide.upper()
+    L = len(guide)
+    compiled = compile_pam(pam)
+    _check_catalog(catalog, compiled)
+    _check_prefilter(prefilter_q)
+    check_bulges(max_dna_bulges, max_rna_bulges, [L])
+    bulge_budget = (max_dna_bulges, max_rna_bulges)
+    tasks = _iter_chunks(fasta_path, _chunk_pad(L + max_dna_bulges, L, len(compiled)), chunk_size, catalog, stats.setdefault("stages", {}) if stats is not None else None)
+    meter = _ScanMeter(stats)
+
+    def hit(seq_id, strand, start, target, mask, subs, bulge=None):
+        # mismatch positions are only expanded here, at output
+        mism_pos = mask_positions(mask)
+        h = {
+            "seq_id": seq_id,
+            "start": start,
+            "end": start + len(target) - 1,
+            "strand": strand,
+            "target_seq": target,
+            "mismatches": len(mism_pos),
+            "mismatch_positions": mism_pos,
+        }
+        if any(bulge_budget):
+            h.update(_bulge_fields(bulge, guide, target))
+        return h
+
+    minus = sorting.ReversedChunks()
+    for seq_id, last, plus_found, minus_found, chunk_stats in _ordered_map(partial(_scan_chunk, guide, compiled.pattern, max_mismatches, prefilter_q, bulge_budget), tasks, workers):
+        meter.chunk(chunk_stats)
+        meter.hits += len(plus_found)
+        for found in plus_found:
+            yield hit(seq_id, "+", *found)
+        minus.add(minus_found)
+        meter.hits += len(minus_found)
+        if last:
+            for found in minus.drain():
+                yield hit(seq_id, "-", *found)
+            meter.done(seq_id)
+
+
+def scan_fasta_for_guide(guide: str, fasta_path: str, pam: str = "NGG", max_mismatches: int = 4, workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE, catalog=None, prefilter_q: int = 0, stats: Dict[str, int] = None, max_dna_bulges: int = 0, max_rna_bulges: int = 0) -> List[Dict]:
+    """Naive PAM-aware scan of a FASTA; returns a list of candidate off-targets
+
+    Each hit dict contains: seq_id, start, end (0-based, inclusive), strand ('+'/'-'), target_seq,
+    mismatches (int) and mismatch_positions (list of 0-based positions).
+
+    Records are scanned in chunks of `chunk_size` window starts; with
+    ``workers > 1`` chunks run in a process pool. Hits and their order are the
+    same for any `workers` and `chunk_size`. Use `iter_hits` to stream them.
+
+    `fasta_path` may also be a `ResidentGenome` already read into memory.
+    `catalog` is an optional `catalog.PamCatalog` for this FASTA and PAM;
+    its sites are used instead of enumerating PAMs.
+
+    With ``prefilter_q > 0`` windows are first screened with the q-gram
+    lemma: a window within k mismatches of an L-nt guide shares at least
+    ``L - q + 1 - k * q`` positional q-grams with it. The filter is lossless
+    and does nothing when that bound is not positive. A `stats` dict, if
+    given, accumulates ``windows`` (PAM-adjacent windows), ``candidates``
+    (window/guide pairs reaching the prefilter, here one per window) and
+    ``prefiltered`` (candidates the prefilter rejected), along with
+    ``bases``, ``pam_sites``, ``verified`` and ``hits``; ``contigs`` maps
+    each record to its own counters (see `add_metrics_hook`), and
+    ``stages`` maps each scan stage (``read``, ``pam``, ``prefilter``,
+    ``verify``, ``bulges``) to its ``[wall, cpu]`` seconds, summed over
+    worker processes. Reverse-complement comparisons count as ``verify``.
+
+    With `max_dna_bulges` or `max_rna_bulges`, targets with up to that many
+    extra target bases (DNA bulges) or unpaired guide bases (RNA bulges)
+    and at most `max_mismatches` substitutions are reported too (see
+    `bulges`); every hit then also carries ``dna_bulges``, ``rna_bulges``,
+    ``aligned_guide`` and ``aligned_target``, the last two with ``-``
+    opposite bulged bases. Bulged hits follow the gapless hit with the same
+    start. The prefilter only applies to gapless windows.
+    """
+    return list(iter_hits(guide, fasta_path, pam=pam, max_mismatches=max_mismatches, workers=workers, chunk_size=chunk_size, catalog=catalog, prefilter_q=prefilter_q, stats=stats, max_dna_bulges=max_dna_bulges, max_rna_bulges=max_rna_bulges))
+
+
+def _neighbourhood_size(q: int, radius: int) -> int:
+    return sum(comb(q, i) * 3**i for i in range(radius + 1))
+
+
+def _choose_seeds(guide_len: int, max_mismatches: int, n_guides: int) -> Tuple[int, int]:
+    """Pick ``(n_seeds, seed_length)`` for a batch of guides of one length.
+
+    With ``s`` disjoint seeds one of them carries at most ``k // s``
+    mismatches. More seeds shrink the neighbourhood each guide contributes to
+    the table, fewer seeds make each lookup more selective; take the most
+    selective split whose table still fits `_MAX_SEED_TABLE` and
+    `_MAX_SEED_VARIANTS`.
+    """
+    best = None
+    for n_seeds in range(-(-guide_len // (genome.BASES_PER_WORD - 1)), guide_len + 1):
+        q = guide_len // n_seeds
+        size = _neighbourhood_size(q, max_mismatches // n_seeds)
+        table = n_guides * n_seeds * size
+        fits = table <= _MAX_SEED_TABLE and size <= _MAX_SEED_VARIANTS
+        key = (not fits, n_seeds * size / 4.0**q if fits else table)
+        if best is None or key < best[0]:
+            best = (key, n_seeds, q)
+    return best[1], best[2]
+
+
+class _GuideGroup:
+    """Guides of one length sharing a seed table for batch verification."""
+
+    def __init__(self, guides: List[str], max_mismatches: int, prefilter_q: int = 0, bulge_budget: Tuple[int, int] = (0, 0)):
+        self.guides = guides
+        self.length = len(guides[0])
+        self.max_mismatches = max_mismatches
+        self.prefilter_q = prefilter_q
+        self.bulge_budget = bulge_budget
+        self.qgram_need = _qgram_need(self.length, prefilter_q, max_mismatches) if prefilter_q else 0
+        if self.qgram_need > 0:
+            self.qgrams = np.stack([_guide_qgrams(g, prefilter_q) for g in guides])
+            self.qgrams_rc = np.stack([_guide_qgrams(genome.reverse_complement(g), prefilter_q) for g in guides])
+        packed = [genome.pack_guide(g) for g in guides]
+        self.words = np.stack([p[0] for p in packed])
+        self.care = np.stack([p[1] for p in packed])
+        self.forced = np.array([p[2] for p in packed], dtype=np.int64)
+        # minus-strand windows are compared on their forward bases against
+        # the reverse-complemented guides; forced counts are strand-independent
+        packed_rc = [genome.pack_guide(genome.reverse_complement(g)) for g in guides]
+        self.words_rc = np.stack([p[0] for p in packed_rc])
+        self.care_rc = np.stack([p[1] for p in packed_rc])
+        self.forced_masks = [genome.ambiguous_mask(g) for g in guides]
+        self.seeds = []
+        if len(guides) <= _BRUTE_FORCE_GUIDES:
+            return
+        n_seeds, q = _choose_seeds(self.length, max_mismatches, len(guides))
+        self.seed_length = q
+        radius = max_mismatches // n_seeds
+        for j in range(n_seeds):
+            keys, owners = [], []
+            for gi, g in enumerate(guides):
+                hood = genome.seed_neighbourhood(g[j * q : (j + 1) * q], radius)
+                keys.append(hood)
+                owners.append(np.full(len(hood), gi, dtype=np.int64))
+            keys = np.concatenate(keys)
+            owners = np.concatenate(owners)
+            order = np.argsort(keys, kind="stable")
+            self.seeds.append((keys[order], owners[order]))
+
+    def _candidate_pairs(self, seq: genome.PackedSequence, starts: np.ndarray, reverse: bool) -> Tuple[np.ndarray, np.ndarray]:
+        n_w, n_g = len(starts), len(self.guides)
+        if not self.seeds:
+            return np.repeat(np.arange(n_w), n_g), np.tile(np.arange(n_g), n_w)
+        pairs = []
+        for j, (keys, owners) in enumerate(self.seeds):
+            wkeys = genome.seed_keys(seq, starts, self.length, self.seed_length, j, reverse=reverse)
+            lo = np.searchsorted(keys, wkeys, side="left")
+            hi = np.searchsorted(keys, wkeys, side="right")
+            n_match = hi - lo
+            win = np.repeat(np.arange(n_w), n_match)
+            # position of each match inside its [lo, hi) run
+            within = np.arange(len(win)) - np.repeat(np.cumsum(n_match) - n_match, n_match)
+            pairs.append(win * n_g + owners[np.repeat(lo, n_match) + within])
+        # seed keys read ambiguous bases as A, so such windows are paired with
+        # every guide and settled on the text
+        amb = np.flatnonzero(seq.is_ambiguous(starts, self.length))
+        pairs.append((amb[:, None] * n_g + np.arange(n_g)).reshape(-1))
+        flat = np.unique(np.concatenate(pairs))
+        return flat // n_g, flat % n_g
+
+    def verify(self, seq: genome.PackedSequence, starts, reverse: bool = False, qgrams: np.ndarray = None, stats: Dict[str, int] = None) -> Iterator[Tuple[int, int, str, int, int]]:
+        """Yield ``(guide_index, start, target, mismatch_mask, substitutions)`` in window order.
+
+        Encoding and ambiguity handling are as in `verify_windows`. With the
+        sequence's `qgrams` (see `genome.qgram_codes`), seed candidates are
+        screened with the q-gram prefilter first; `stats` counts them.
+        """
+        L = self.length
+        starts = np.asarray(starts, dtype=np.int64)
+        if not len(starts):
+            return
+        win, gi = self._candidate_pairs(seq, starts, reverse)
+        if stats is not None:
+            stats["candidates"] += len(win)
+        if qgrams is not None and self.qgram_need > 0:
+            keep = _qgram_filter(seq, qgrams, starts[win], self.qgrams_rc if reverse else self.qgrams, gi, L, self.qgram_need)
+            if stats is not None:
+                stats["prefiltered"] += int(len(keep) - keep.sum())
+            win, gi = win[keep], gi[keep]
+        windows = genome.window_words(seq, starts, L)
+        words, care = (self.words_rc, self.care_rc) if reverse else (self.words, self.care)
+        lanes = genome.mismatch_lanes(windows[win], words[gi], care[gi])
+        ambiguous = seq.is_ambiguous(starts[win], L)
+        keep = np.flatnonzero((genome.popcount(lanes).sum(axis=1) + self.forced[gi] <= self.max_mismatches) | ambiguous)
+        masks = genome.lane_masks(lanes[keep])
+        texts = {}
+        for i, m in zip(keep, masks):
+            g = int(gi[i])
+            s = int(starts[win[i]])
+            target = texts.get(s)
+            if target is None:
+                target = seq.text(s, s + L)
+                if reverse:
+                    target = genome.reverse_complement(target)
+                texts[s] = target
+            if ambiguous[i]:
+                mask = _mismatch_mask(self.guides[g], target, self.max_mismatches)
+                if mask is None:
+                    continue
+            elif reverse:
+                mask = _reverse_mask(_join_words(m), L) | self.forced_masks[g]
+            else:
+                mask = _join_words(m) | self.forced_masks[g]
+            yield g, s, target, mask, _substitutions(target, mask)
+
+
+def normalize_guides(guides: Union[Mapping[str, str], Sequence[str]]) -> List[Tuple[str, str]]:
+    """``(guide_id, upper-case guide)`` pairs for a mapping of ids to guides or a sequence of guides (their own ids)."""
+    if isinstance(guides, Mapping):
+        items = list(guides.items())
+    else:
+        items = [(g, g) for g in guides]
+    return [(str(gid), g.upper()) for gid, g in items]
+
+
+# per-process guide batches for parallel batch scans, set by _init_batch_worker
+_WORKER_BATCHES = None
+
+
+def _build_batches(guide_seqs: Mapping[int, List[str]], max_mismatches: int, prefilter_q: int = 0, bulge_budget: Tuple[int, int] = (0, 0)) -> Dict[int, "_GuideGroup"]:
+    return {L: _GuideGroup(seqs, max_mismatches, prefilter_q, bulge_budget) for L, seqs in guide_seqs.items()}
+
+
+def _init_batch_worker(guide_seqs: Mapping[int, List[str]], max_mismatches: int, prefilter_q: int = 0, bulge_budget: Tuple[int, int] = (0, 0)) -> None:
+    global _WORKER_BATCHES
+    _WORKER_BATCHES = _build_batches(guide_seqs, max_mismatches, prefilter_q, bulge_budget)
+
+
+def _scan_batch_chunk(batches: Mapping[int, "_GuideGroup"], pam: str, task) -> Tuple[str, bool, Dict[int, list], Dict[int, list], Dict[str, int]]:
+    """Scan both strands of one chunk for every guide batch.
+
+    Returns ``(seq_id, last, plus_found, minus_found, stats)`` where each
+    found dict maps a guide length to a list of
+    ``(guide_index, start, target, mismatch_mask, substitutions)``, with a
+    sixth ``bulge`` element on bulged hits (not in scan order), and `stats`
+    is as for `_scan_chunk`.
+    """
+    seq_id, lo, last = task[0], task[2], task[6]
+    bulge_budget = next(iter(batches.values())).bulge_budget
+    stats = _new_stats(task)
+    laps = _Laps(stats["stages"])
+    packed, windows, anchors = _chunk_windows(compile_pam(pam), task, batches.keys(), bulge_budget, stats)
+    laps("pam")
+    prefilter_q = max(batch.prefilter_q for batch in batches.values() if batch.qgram_need > 0) if any(batch.qgram_need > 0 for batch in batches.values()) else 0
+    qgrams = genome.qgram_codes(packed, prefilter_q) if prefilter_q else None
+    laps("prefilter")
+    plus_found, minus_found = {}, {}
+    for L, batch in batches.items():
+        plus, minus = windows[L]
+        stats["windows"] += len(plus) + len(minus)
+        # seed lookup and the prefilter itself run inside verify
+        plus_found[L] = [(g, s + lo, t, m, x) for g, s, t, m, x in batch.verify(packed, plus, qgrams=qgrams, stats=stats)]
+        minus_found[L] = [(g, s + lo, t, m, x) for g, s, t, m, x in batch.verify(packed, minus, reverse=True, qgrams=qgrams, stats=stats)]
+        laps("verify")
+        if anchors:
+            owned = (task[4] - lo, task[5] - lo)
+            for g, guide in enumerate(batch.guides):
+                for found, strand_anchors, reverse in ((plus_found[L], anchors[L][0], False), (minus_found[L], anchors[L][1], True)):
+                    found.extend((g, s + lo, t, m, x, bulge) for _, s, t, m, x, bulge in _verify_bulges(packed, guide, strand_anchors, batch.max_mismatches, bulge_budget, owned, reverse=reverse))
+            laps("bulges")
+    return seq_id, last, plus_found, minus_found, stats
+
+
+def _scan_batch_chunk_in_worker(pam: str, task) -> Tuple[str, bool, Dict[int, list], Dict[int, list], Dict[str, int]]:
+    return _scan_batch_chunk(_WORKER_BATCHES, pam, task)
+
+
+# per-process score memo for parallel summaries, set by _init_summary_worker
+_WORKER_SCORES = None
+
+
+def _init_summary_worker(guide_seqs: Mapping[int, List[str]], max_mismatches: int, prefilter_q: int, bulge_budget: Tuple[int, int], names: Sequence[str], context: Dict) -> None:
+    global _WORKER_SCORES
+    _init_batch_worker(guide_seqs, max_mismatches, prefilter_q, bulge_budget)
+    _WORKER_SCORES = scoring.ScoreCache(names, **context)
+
+
+def _summarize_batch_chunk(batches: Mapping[int, "_GuideGroup"], scores: "scoring.ScoreCache", pam: str, task) -> Tuple[str, bool, Dict[Tuple[int, int], "scoring.GuideSummary"], Dict[str, int]]:
+    """Scan one chunk like `_scan_batch_chunk` and fold its hits into a `scoring.GuideSummary` per ``(guide_length, guide_index)``."""
+    seq_id, last, plus_found, minus_found, stats = _scan_batch_chunk(batches, pam, task)
+    summaries = {}
+    for L, batch in batches.items():
+        grouped = {}
+        for found in (plus_found[L], minus_found[L]):
+            for g, _, target, mask, _, *bulge in found:
+                mismatches, targets, perfect = grouped.setdefault(g, ([], [], []))
+                m = bin(mask).count("1")
+                mismatches.append(m)
+                # bulged hits are scored on the target bases paired with the guide
+                targets.append(bulges.paired_target(bulge[0][2], bulge[0][3]) if bulge else target)
+                perfect.append(m == 0 and not bulge)
+        for g, (mismatches, targets, perfect) in grouped.items():
+            summary = summaries[(L, g)] = scoring.GuideSummary(scores.names)
+            summary.add(mismatches, scores.score(batch.guides[g], targets), perfect)
+    return seq_id, last, summaries, stats
+
+
+def _summarize_batch_chunk_in_worker(pam: str, task) -> Tuple[str, bool, Dict[Tuple[int, int], "scoring.GuideSummary"], Dict[str, int]]:
+    return _summarize_batch_chunk(_WORKER_BATCHES, _WORKER_SCORES, pam, task)
+
+
+def summarize_batch_hits(guides: Union[Mapping[str, str], Sequence[str]], fasta_path: str, names: Sequence[str] = ("mit", "cfd"), pam: str = "NGG", max_mismatches: int = 4, workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE, catalog=None, prefilter_q: int = 0, stats: Dict[str, int] = None, max_dna_bulges: int = 0, max_rna_bulges: int = 0, **context) -> Dict[str, "scoring.GuideSummary"]:
+    """Scan like `scan_fasta_for_guides`, but return a `scoring.GuideSummary` per guide id instead of the hits.
+
+    Each chunk's hits are scored with the scorers in `names` (given
+    `context`, e.g. ``pam`` and ``table``) and folded into per-guide
+    summaries where they are found, in the worker process with
+    ``workers > 1``; the chunk summaries are merged in chunk order, so no
+    hit list is ever built.
+    """
+    normalized = normalize_guides(guides)
+    names = list(names)
+    context = dict(context)
+    context.setdefault("pam", pam)
+    summaries = {gid: scoring.GuideSummary(names) for gid, _ in normalized}
+    bulge_budget = (max_dna_bulges, max_rna_bulges)
+    plan = _batch_plan(normalized, fasta_path, pam, chunk_size, catalog, prefilter_q, stats, bulge_budget)
+    if plan is None:
+        return summaries
+    pattern, members, guide_seqs, tasks = plan
+    # a guide listed twice is summarized once
+    first = {}
+    for gi, (gid, _) in enumerate(normalized):
+        first.setdefault(gid, gi)
+    meter = _ScanMeter(stats)
+    if workers <= 1:
+        results = _ordered_map(partial(_summarize_batch_chunk, _build_batches(guide_seqs, max_mismatches, prefilter_q, bulge_budget), scoring.ScoreCache(names, **context), pattern), tasks)
+    else:
+        results = _ordered_map(partial(_summarize_batch_chunk_in_worker, pattern), tasks, workers, initializer=_init_summary_worker, initargs=(guide_seqs, max_mismatches, prefilter_q, bulge_budget, names, context))
+    for seq_id, last, chunk_summaries, chunk_stats in results:
+        meter.chunk(chunk_stats)
+        for (L, g), summary in chunk_summaries.items():
+            gi = members[L][g]
+            meter.hits += summary.hits
+            if first[normalized[gi][0]] == gi:
+                summaries[normalized[gi][0]].merge(summary)
+        if last:
+            meter.done(seq_id)
+    return summaries
+
+
+def _bulge_rank(bulge, max_dna_bulges: int) -> int:
+    # gapless first, then DNA bulges by count, then RNA bulges by count
+    if bulge is None:
+        return 0
+    return bulge[0] if bulge[0] else max_dna_bulges + bulge[1]
+
+
+def _batch_plan(guides: List[Tuple[str, str]], fasta_path: str, pam: str, chunk_size: int, catalog=None, prefilter_q: int = 0, stats: Dict[str, int] = None, bulge_budget: Tuple[int, int] = (0, 0)):
+    """Check a batch scan and return ``(pam_pattern, members, guide_seqs, tasks)``, or None without guides.
+
+    `members` maps each guide length to the indexes of its guides and
+    `guide_seqs` to their sequences; `tasks` are the genome chunks.
+    """
+    compiled = compile_pam(pam)
+    _check_prefilter(prefilter_q)
+    members = {}
+    for gi, (_, g) in enumerate(guides):
+        members.setdefault(len(g), []).append(gi)
+    if not members:
+        return None
+    check_bulges(*bulge_budget, members)
+    guide_seqs = {L: [guides[i][1] for i in idx] for L, idx in members.items()}
+    _check_catalog(catalog, compiled)
+    tasks = _iter_chunks(fasta_path, _chunk_pad(max(members) + bulge_budget[0], min(members), len(compiled)), chunk_size, catalog, stats.setdefault("stages", {}) if stats is not None else None)
+    return compiled.pattern, members, guide_seqs, tasks
+
+
+def _iter_batch_rows(guides: List[Tuple[str, str]], fasta_path: str, pam: str, max_mismatches: int, workers: int, chunk_size: int, catalog=None, prefilter_q: int = 0, stats: Dict[str, int] = None, bulge_budget: Tuple[int, int] = (0, 0)) -> Iterator[Tuple[int, Dict]]:
+    """Yield ``(guide_index, hit)`` for normalized guides, in scan order."""
+    plan = _batch_plan(guides, fasta_path, pam, chunk_size, catalog, prefilter_q, stats, bulge_budget)
+    if plan is None:
+        return
+    pattern, members, guide_seqs, tasks = plan
+    meter = _ScanMeter(stats)
+    if workers <= 1:
+        results = _ordered_map(partial(_scan_batch_chunk, _build_batches(guide_seqs, max_mismatches, prefilter_q, bulge_budget), pattern), tasks)
+    else:
+        results = _ordered_map(partial(_scan_batch_chunk_in_worker, pattern), tasks, workers, initializer=_init_batch_worker, initargs=(guide_seqs, max_mismatches, prefilter_q, bulge_budget))
+
+    def chunk_rows(found, strand):
+        rows = []
+        for L, hits in found.items():
+            for g, start, target, mask, subs, *bulge in hits:
+                gid = members[L][g]
+                bulge = bulge[0] if bulge else None
+                rows.append(((start if strand == "+" else -start, _bulge_rank(bulge, bulge_budget[0]), gid), L, gid, start, target, mask, subs, bulge))
+        # merge guide lengths back into scan order
+        rows.sort(key=lambda r: r[0])
+        return [r[1:] for r in rows]
+
+    def hit(seq_id, strand, L, gid, start, target, mask, subs, bulge):
+        mism_pos = mask_positions(mask)
+        h = {
+            "guide_id": guides[gid][0],
+            "seq_id": seq_id,
+            "start": start,
+            "end": start + len(target) - 1,
+            "strand": strand,
+            "target_seq": target,
+            "mismatches": len(mism_pos),
+            "mismatch_positions": mism_pos,
+        }
+        if any(bulge_budget):
+            h.update(_bulge_fields(bulge, guides[gid][1], target))
+        return gid, h
+
+    minus = sorting.ReversedChunks()
+    for seq_id, last, plus_found, minus_found, chunk_stats in results:
+        meter.chunk(chunk_stats)
+        meter.hits += sum(len(f) for f in plus_found.values()) + sum(len(f) for f in minus_found.values())
+        for row in chunk_rows(plus_found, "+"):
+            yield hit(seq_id, "+", *row)
+        minus.add(chunk_rows(minus_found, "-"))
+        if last:
+            for row in minus.drain():
+                yield hit(seq_id, "-", *row)
+            meter.done(seq_id)
+
+
+def iter_batch_hits(guides: Union[Mapping[str, str], Sequence[str]], fasta_path: str, pam: str = "NGG", max_mismatches: int = 4, workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE, catalog=None, prefilter_q: int = 0, stats: Dict[str, int] = None, max_dna_bulges: int = 0, max_rna_bulges: int = 0) -> Iterator[Dict]:
+    """Yield batch hits (see `scan_fasta_for_guides`) one by one, in scan order.
+
+    Hits of all guides are interleaved as the genome is scanned: by record,
+    strand and position, and by guide order within a window.
+    """
+    for _, hit in _iter_batch_rows(normalize_guides(guides), fasta_path, pam, max_mismatches, workers, chunk_size, catalog, prefilter_q, stats, (max_dna_bulges, max_rna_bulges)):
+        yield hit
+
+
+def scan_fasta_for_guides(guides: Union[Mapping[str, str], Sequence[str]], fasta_path: str, pam: str = "NGG", max_mismatches: int = 4, workers: int = 1, chunk_size: int = DEFAULT_CHUNK_SIZE, catalog=None, prefilter_q: int = 0, stats: Dict[str, int] = None, max_dna_bulges: int = 0, max_rna_bulges: int = 0) -> List[Dict]:
+    """Scan a FASTA for many guides in a single pass.
+
+    `guides` is either a mapping of guide id to sequence or a sequence of
+    guide strings (each used as its own id). Every record is parsed once and
+    its PAM sites enumerated once; candidate windows are matched against all
+    guides of the same length through a shared seed table. `workers`,
+    `chunk_size`, `catalog`, `prefilter_q`, `stats` and the bulge budgets
+    behave as in `scan_fasta_for_guide`; the prefilter screens the seed table's
+    window/guide candidates.
+
+    Returns the hits `scan_fasta_for_guide` would report for each guide, in
+    guide order, each with an extra ``guide_id`` key. Use `iter_batch_hits` to
+    stream them in scan order instead.
+    """
+    guides = normalize_guides(guides)
+    per_guide = [[] for _ in guides]
+    for gi, hit in _iter_batch_rows(guides, fasta_path, pam, max_mismatches, workers, chunk_size, catalog, prefilter_q, stats, (max_dna_bulges, max_rna_bulges)):
+        per_guide[gi].append(hit)
+    return [h for hits in per_guide for h in hits]
@@ -0,0 +1,486 @@
+"""Search server that keeps genomes loaded between requests (`crispr-check serve`).
+
+FASTA genomes are packed once at startup into a `search.ResidentGenome`
+saved under a temporary directory, and index directories are opened as
+`index.SeedIndex`. Both are memory-mapped, by the server and by a pool of
+worker processes that search them, so all processes share one copy of
+each genome whatever the start method. The server speaks a
+small JSON-over-HTTP/1.1 protocol on a TCP port or a Unix socket:
+
+- ``POST /search``: ``{"genome": name, "guides": {id: seq} | [seq, ...],
+  "pam", "max_mismatches", "max_dna_bulges", "max_rna_bulges",
+  "prefilter_q", "scores": [name, ...]}`` returns ``{"hits": [...]}``,
+  the hits `search.scan_fasta_for_guides` returns, with a ``score_<name>``
+  column per requested scorer. ``"guide": seq`` searches one guide;
+  ``"fasta": path`` selects the genome loaded from that file.
+- ``POST /score``: ``{"guide", "targets": [...], "scores", "pam"}``
+  returns ``{"scores": {name: [...]}}``.
+- ``GET /health`` and ``GET /metrics``.
+
+Search requests for the same genome and options that arrive within
+`batch_window` seconds of each other are coalesced: their guides are
+searched together in one pass over the genome and the hits split back per
+request. `client.Client` talks to this server.
+"""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from . import bulges, index, scoring, search
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# requests for one genome arriving within this many seconds share a scan
+DEFAULT_BATCH_WINDOW = 0.01
+MAX_BODY = 64 << 20
+MAX_HEADERS = 100
+
+_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+_SEARCH_DEFAULTS = {"pam": "NGG", "max_mismatches": 4, "max_dna_bulges": 0, "max_rna_bulges": 0, "prefilter_q": 0}
+
+# (locations, genomes) opened in this process; set before the pool forks
+# and by _init_worker in spawned workers
+_LOADED: Optional[Tuple[Tuple[Tuple[str, str], ...], Dict]] = None
+
+
+class RequestError(ValueError):
+    """A malformed request; reported to the client with an HTTP error status."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_genome_spec(spec: str) -> Tuple[str, str]:
+    """``"NAME=PATH"`` or ``"PATH"`` -> ``(name, path)``; the name defaults to the file name without extensions."""
+    name, sep, path = spec.partition("=")
+    if not sep:
+        path = spec
+        name = os.path.basename(os.path.normpath(spec)).split(".")[0]
+    if not name or not path:
+        raise ValueError(f"invalid genome '{spec}', expected NAME=PATH or PATH")
+    return name, path
+
+
+def pack_genomes(specs: Mapping[str, str], store_dir: str) -> Dict[str, str]:
+    """Pack every FASTA of ``name -> path`` into a directory under `store_dir`; returns ``name -> directory``.
+
+    Seed index directories are kept where they are. FASTA files are packed
+    one at a time and dropped once saved, so only one packed genome is in
+    memory at once.
+    """
+    locations = {}
+    for i, (name, path) in enumerate(specs.items()):
+        if os.path.isdir(path):
+            locations[name] = path
+        else:
+            locations[name] = os.path.join(store_dir, str(i))
+            search.ResidentGenome(path).save(locations[name])
+    return locations
+
+
+def open_genomes(locations: Mapping[str, str]) -> Dict:
+    """Memory-map the directories of `pack_genomes`: `search.ResidentGenome` or `index.SeedIndex`."""
+    genomes = {}
+    for name, path in locations.items():
+        if os.path.isfile(os.path.join(path, "resident.json")):
+            genomes[name] = search.ResidentGenome.load(path)
+        else:
+            genomes[name] = index.load_index(path)
+    return genomes
+
+
+def _set_loaded(locations: Mapping[str, str]) -> Dict:
+    global _LOADED
+    key = tuple(sorted(locations.items()))
+    if _LOADED is None or _LOADED[0] != key:
+        _LOADED = (key, open_genomes(locations))
+    return _LOADED[1]
+
+
+def _init_worker(locations: Mapping[str, str]) -> None:
+    # forked workers inherit the parent's maps; spawned ones map their own
+    _set_loaded(locations)
+
+
+def _add_scores(guide: str, hits: List[Dict], names: List[str], pam: str) -> None:
+    if not names or not hits:
+        return
+    # bulged hits are scored on the target bases paired with the guide
+    targets = [bulges.paired_target(h["aligned_guide"], h["aligned_target"]) if "aligned_guide" in h else h["target_seq"] for h in hits]
+    columns = scoring.ScoreCache(names, pam=pam).score(guide, targets)
+    for name, values in columns.items():
+        for h, v in zip(hits, values):
+            h[f"score_{name}"] = float(v)
+
+
+def run_search(target, guides: List[str], pam: str = "NGG", max_mismatches: int = 4, max_dna_bulges: int = 0, max_rna_bulges: int = 0, prefilter_q: int = 0, scores=(), stats: Dict = None) -> List[List[Dict]]:
+    """Search `guides` in one pass over `target` and return each guide's hits, in guide order.
+
+    `target` is a FASTA path, a `search.ResidentGenome` or a
+    `index.SeedIndex` (gapless searches with the index's PAM only). Hits
+    carry no ``guide_id``; a ``score_<name>`` column is added for every
+    scorer in `scores`.
+    """
+    guides = [g.upper() for g in guides]
+    per_guide = [[] for _ in guides]
+    if isinstance(target, index.SeedIndex):
+        if max_dna_bulges or max_rna_bulges or prefilter_q:
+            raise RequestError("bulges and the prefilter are not available for seed index genomes")
+        if pam != target.pam:
+            raise RequestError(f"the seed index was built for PAM {target.pam}, not {pam}")
+        for gi, g in enumerate(guides):
+            try:
+                per_guide[gi] = target.search(g, max_mismatches=max_mismatches)
+            except ValueError as e:
+                raise RequestError(str(e)) from None
+    else:
+        ids = {str(gi): g for gi, g in enumerate(guides)}
+        for hit in search.iter_batch_hits(ids, target, pam=pam, max_mismatches=max_mismatches, prefilter_q=prefilter_q, stats=stats, max_dna_bulges=max_dna_bulges, max_rna_bulges=max_rna_bulges):
+            per_guide[int(hit.pop("guide_id"))].append(hit)
+    for g, hits in zip(guides, per_guide):
+        _add_scores(g, hits, list(scores), pam)
+    return per_guide
+
+
+def _search_in_worker(name: str, guides: List[str], options: Dict) -> Tuple[List[List[Dict]], Dict]:
+    stats = {}
+    per_guide = run_search(_LOADED[1][name], guides, stats=stats, **options)
+    return per_guide, {"bases": stats.get("bases", 0), "hits": sum(len(h) for h in per_guide)}
+
+
+def score_targets(guide: str, targets: List[str], names: List[str], pam: str = "NGG") -> Dict[str, List[float]]:
+    """Score every target against `guide` with each scorer in `names`, as plain floats."""
+    columns = scoring.ScoreCache(names, pam=pam).score(guide.upper(), [t.upper() for t in targets])
+    return {name: [float(v) for v in values] for name, values in columns.items()}
+
+
+def _search_options(body: Dict) -> Dict:
+    options = {}
+    for key, default in _SEARCH_DEFAULTS.items():
+        value = body.get(key, default)
+        if key == "pam":
+            try:
+                options[key] = search.compile_pam(str(value)).pattern
+            except ValueError as e:
+                raise RequestError(f"pam: {e}") from None
+        elif not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise RequestError(f"{key} must be a non-negative integer")
+        else:
+            options[key] = value
+    if options["prefilter_q"] > search.MAX_PREFILTER_Q:
+        raise RequestError(f"prefilter_q must be between 0 and {search.MAX_PREFILTER_Q}")
+    options["scores"] = tuple(_score_names(body.get("scores", ())))
+    return options
+
+
+def _score_names(value) -> List[str]:
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, (list, tuple)):
+        raise RequestError("scores must be a list of scorer names")
+    for name in value:
+        if name not in scoring.SCORERS:
+            raise RequestError(f"unknown scorer '{name}' (known: {', '.join(scoring.SCORERS)})")
+    return list(dict.fromkeys(value))
+
+
+def _request_guides(body: Dict) -> List[Tuple[str, str]]:
+    guides = body.get("guides")
+    if guides is None and "guide" in body:
+        guides = [body["guide"]]
+    if isinstance(guides, dict):
+        items = list(guides.items())
+    elif isinstance(guides, list):
+        items = [(g, g) for g in guides]
+    else:
+        raise RequestError("expected 'guide' or 'guides'")
+    if not items or not all(isinstance(g, str) and g for _, g in items):
+        raise RequestError("guides must be non-empty strings")
+    return [(str(gid), g.upper()) for gid, g in items]
+
+
+class SearchServer:
+    """Serve searches of resident genomes; see the module docstring for the protocol.
+
+    `genomes` maps names to FASTA paths or seed index directories. Searches
+    run in a pool of `workers` processes.
+    """
+
+    def __init__(self, genomes: Mapping[str, str], workers: int = 1, batch_window: float = DEFAULT_BATCH_WINDOW):
+        if not genomes:
+            raise ValueError("at least one genome is required")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.specs = dict(genomes)
+        self.workers = workers
+        self.batch_window = batch_window
+        self._store = tempfile.mkdtemp(prefix="crispr-check-serve-")
+        try:
+            self.locations = pack_genomes(self.specs, self._store)
+        except BaseException:
+            shutil.rmtree(self._store, ignore_errors=True)
+            raise
+        self.genomes = _set_loaded(self.locations)
+        self._paths = {os.path.realpath(path): name for name, path in self.specs.items()}
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.locations,))
+        self._pending: Dict[tuple, List] = {}
+        # asyncio keeps only weak references to tasks
+        self._tasks = set()
+        self._server = None
+        self.started = time.time()
+        self.counters = {"requests": {}, "errors": 0, "in_flight": 0, "batches": 0, "coalesced_requests": 0, "guides": 0, "hits": 0, "bases": 0, "search_seconds": 0.0, "scored_targets": 0}
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None):
+        """Start listening on `socket_path` if given, else on `host`:`port`; returns the `asyncio.Server`."""
+        if socket_path:
+            if not hasattr(asyncio, "start_unix_server"):
+                raise ValueError("Unix sockets are not supported on this platform")
+            self._server = await asyncio.start_unix_server(self._handle, path=socket_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    async def serve_forever(self) -> None:
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        self._pool.shutdown()
+        # drop the maps before removing their files
+        global _LOADED
+        if _LOADED is not None and _LOADED[1] is self.genomes:
+            _LOADED = None
+        self.genomes = {}
+        shutil.rmtree(self._store, ignore_errors=True)
+
+    def health(self) -> Dict:
+        genomes = {}
+        for name, g in self.genomes.items():
+            if isinstance(g, index.SeedIndex):
+                genomes[name] = {"kind": "index", "path": self.specs[name], "records": len(g.records), "pam": g.pam, "guide_length": g.guide_length}
+            else:
+                genomes[name] = {"kind": "fasta", "path": self.specs[name], "records": len(g.records), "bases": len(g)}
+        return {"status": "ok", "version": _version(), "workers": self.workers, "uptime_seconds": time.time() - self.started, "genomes": genomes}
+
+    def metrics(self) -> Dict:
+        report = dict(self.counters, requests=dict(self.counters["requests"]))
+        report["uptime_seconds"] = time.time() - self.started
+        report["pending_batches"] = len(self._pending)
+        return report
+
+    def _genome_name(self, body: Dict) -> str:
+        name = body.get("genome")
+        if name is None and body.get("fasta"):
+            name = self._paths.get(os.path.realpath(body["fasta"]))
+            if name is None:
+                raise RequestError(f"genome '{body['fasta']}' is not loaded", 404)
+        if name is None:
+            if len(self.genomes) != 1:
+                raise RequestError(f"several genomes are loaded, name one of: {', '.join(self.genomes)}")
+            name = next(iter(self.genomes))
+        if name not in self.genomes:
+            raise RequestError(f"genome '{name}' is not loaded", 404)
+        return name
+
+    async def search(self, body: Dict) -> Dict:
+        name = self._genome_name(body)
+        guides = _request_guides(body)
+        options = _search_options(body)
+        # a bad guide must fail its own request, not the batch it would join
+        target = self.genomes[name]
+        if isinstance(target, index.SeedIndex):
+            if options["max_dna_bulges"] or options["max_rna_bulges"] or options["prefilter_q"]:
+                raise RequestError("bulges and the prefilter are not available for seed index genomes")
+            if options["pam"] != target.pam:
+                raise RequestError(f"the seed index was built for PAM {target.pam}, not {options['pam']}")
+            if any(len(g) != target.guide_length for _, g in guides):
+                raise RequestError(f"the seed index was built for {target.guide_length}-nt protospacers")
+        else:
+            try:
+                search.check_bulges(options["max_dna_bulges"], options["max_rna_bulges"], {len(g) for _, g in guides})
+            except ValueError as e:
+                raise RequestError(str(e)) from None
+        per_guide = await self._coalesced(name, [g for _, g in guides], options)
+        hits = [{"guide_id": gid, **h} for (gid, _), found in zip(guides, per_guide) for h in found]
+        return {"genome": name, "hits": hits}
+
+    async def _coalesced(self, name: str, guides: List[str], options: Dict) -> List[List[Dict]]:
+        loop = asyncio.get_running_loop()
+        key = (name, tuple(sorted(options.items())))
+        future = loop.create_future()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = []
+            task = loop.create_task(self._flush(key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        batch.append((guides, future))
+        return await future
+
+    async def _flush(self, key: tuple) -> None:
+        # requests arriving within the window join `batch`
+        batch = self._pending[key]
+        name, options = key[0], dict(key[1])
+        try:
+            await asyncio.sleep(self.batch_window)
+            del self._pending[key]
+            unique = list(dict.fromkeys(g for guides, _ in batch for g in guides))
+            t0 = time.perf_counter()
+            per_guide, stats = await asyncio.get_running_loop().run_in_executor(self._pool, _search_in_worker, name, unique, options)
+        except asyncio.CancelledError:
+            self._pending.pop(key, None)
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        c = self.counters
+        c["batches"] += 1
+        c["coalesced_requests"] += len(batch)
+        c["guides"] += len(unique)
+        c["hits"] += stats["hits"]
+        c["bases"] += stats["bases"]
+        c["search_seconds"] += time.perf_counter() - t0
+        at = {g: i for i, g in enumerate(unique)}
+        for guides, future in batch:
+            if not future.done():
+                future.set_result([per_guide[at[g]] for g in guides])
+
+    async def score(self, body: Dict) -> Dict:
+        guide, targets = body.get("guide"), body.get("targets")
+        if not isinstance(guide, str) or not guide:
+            raise RequestError("expected a 'guide' string")
+        if not isinstance(targets, list) or not all(isinstance(t, str) for t in targets):
+            raise RequestError("expected a 'targets' list of strings")
+        names = _score_names(body.get("scores", list(scoring.SCORERS)))
+        pam = str(body.get("pam", "NGG"))
+        scores = await asyncio.get_running_loop().run_in_executor(self._pool, score_targets, guide, targets, names, pam)
+        self.counters["scored_targets"] += len(targets)
+        return {"scores": scores}
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        routes = {"/health": ("GET", None), "/metrics": ("GET", None), "/search": ("POST", self.search), "/score": ("POST", self.score)}
+        if path not in routes:
+            return 404, {"error": f"no such endpoint {path}"}
+        allowed, handler = routes[path]
+        if method != allowed:
+            return 405, {"error": f"{path} expects {allowed}"}
+        self.counters["requests"][path] = self.counters["requests"].get(path, 0) + 1
+        if path == "/health":
+            return 200, self.health()
+        if path == "/metrics":
+            return 200, self.metrics()
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError as e:
+            return 400, {"error": f"invalid JSON: {e}"}
+        if not isinstance(payload, dict):
+            return 400, {"error": "expected a JSON object"}
+        return 200, await handler(payload)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                # readline raises ValueError for lines over the reader's limit
+                try:
+                    request_line = await reader.readline()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "request line too long"}, close=True)
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, close=True)
+                    break
+                headers = {}
+                try:
+                    for _ in range(MAX_HEADERS + 1):
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        k, _, v = line.decode("latin-1").partition(":")
+                        headers[k.strip().lower()] = v.strip()
+                    else:
+                        raise ValueError("too many header lines")
+                except ValueError:
+                    await self._respond(writer, 431, {"error": f"header line too long or more than {MAX_HEADERS} headers"}, close=True)
+                    break
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "invalid Content-Length"}, close=True)
+                    break
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": "request body too large"}, close=True)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                self.counters["in_flight"] += 1
+                try:
+                    status, payload = await self._route(method, path.split("?", 1)[0], body)
+                except RequestError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                finally:
+                    self.counters["in_flight"] -= 1
+                if status != 200:
+                    self.counters["errors"] += 1
+                await self._respond(writer, status, payload, close)
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Dict, close: bool = False) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        head = f"HTTP/1.1 {status} {_STATUS.get(status, 'Error')}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\nConnection: {'close' if close else 'keep-alive'}\r\n\r\n"
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+
+def _version() -> str:
+    from . import __version__
+
+    return __version__
+
+
+async def _serve(server: SearchServer, host: str, port: int, socket_path: str) -> None:
+    await server.start(host, port, socket_path)
+    where = f"unix:{socket_path}" if socket_path else f"http://{host}:{port}"
+    print(f"Serving {len(server.genomes)} genome(s) ({', '.join(server.genomes)}) on {where} with {server.workers} worker(s)", file=sys.stderr)
+    await server.serve_forever()
+
+
+def serve(genomes: Mapping[str, str], host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None, workers: int = 1, batch_window: float = DEFAULT_BATCH_WINDOW) -> None:
+    """Load `genomes` and serve requests until interrupted."""
+    server = SearchServer(genomes, workers=workers, batch_window=batch_window)
+    try:
+        asyncio.run(_serve(server, host, port, socket_path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
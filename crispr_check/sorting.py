@@ -0,0 +1,160 @@
+"""External merge sort for hit streams.
+
+Rows are buffered up to `run_size` at a time; each full buffer is sorted and
+spilled to a temporary file as a "run", and the runs are merged lazily with
+`heapq.merge`. Peak memory is bounded by `run_size` rows plus one row per run,
+however many rows pass through. The sort is stable, like `list.sort`.
+
+`TopK` keeps only the best rows of a stream in a bounded heap, with the same
+result as sorting everything and truncating.
+
+`ReversedChunks` uses the same spilling to replay chunked output back to
+front, e.g. minus-strand hits found while scanning a record forwards.
+"""
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+DEFAULT_RUN_SIZE = 100_000
+
+
+def _spill(rows: List[Any], path: str) -> None:
+    with open(path, "wb") as fh:
+        for r in rows:
+            pickle.dump(r, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_run(path: str) -> Iterator[Any]:
+    with open(path, "rb") as fh:
+        while True:
+            try:
+                yield pickle.load(fh)
+            except EOFError:
+                return
+
+
+def external_sort(rows: Iterable[Any], key: Callable[[Any], Any], reverse: bool = False, run_size: int = DEFAULT_RUN_SIZE, tmp_dir: str = None) -> Iterator[Any]:
+    """Yield `rows` sorted by `key`, spilling sorted runs to disk as needed.
+
+    `tmp_dir` is the parent directory for the spill files (default: the
+    system temporary directory); they are removed once the generator is
+    exhausted or closed.
+    """
+    if run_size <= 0:
+        raise ValueError("run_size must be positive")
+    buf = []
+    runs = []
+    spill_dir = None
+    try:
+        for r in rows:
+            buf.append(r)
+            if len(buf) >= run_size:
+                if spill_dir is None:
+                    spill_dir = tempfile.mkdtemp(prefix="crispr_check_sort_", dir=tmp_dir)
+                buf.sort(key=key, reverse=reverse)
+                path = os.path.join(spill_dir, f"run{len(runs)}.pkl")
+                _spill(buf, path)
+                runs.append(path)
+                buf = []
+        buf.sort(key=key, reverse=reverse)
+        if not runs:
+            yield from buf
+            return
+        # earlier runs win ties in heapq.merge, which keeps the sort stable
+        streams = [_read_run(p) for p in runs] + [iter(buf)]
+        yield from heapq.merge(*streams, key=key, reverse=reverse)
+    finally:
+        if spill_dir is not None:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+class ReversedChunks:
+    """Collect lists of rows chunk by chunk and replay them last chunk first.
+
+    Rows inside a chunk keep their order. Up to `max_rows` rows are held in
+    memory; once that is exceeded, chunks are spilled to a temporary file and
+    read back by offset, so memory stays bounded however many rows a record
+    produces.
+    """
+
+    def __init__(self, max_rows: int = DEFAULT_RUN_SIZE, tmp_dir: str = None):
+        self.max_rows = max_rows
+        self.tmp_dir = tmp_dir
+        self._chunks: List[List[Any]] = []
+        self._rows = 0
+        self._file = None
+        self._offsets: List[int] = []
+
+    def add(self, rows: List[Any]) -> None:
+        if not rows:
+            return
+        self._chunks.append(rows)
+        self._rows += len(rows)
+        if self._rows > self.max_rows:
+            if self._file is None:
+                self._file = tempfile.TemporaryFile(prefix="crispr_check_chunks_", dir=self.tmp_dir)
+            self._file.seek(0, os.SEEK_END)
+            for chunk in self._chunks:
+                self._offsets.append(self._file.tell())
+                pickle.dump(chunk, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+            self._chunks = []
+            self._rows = 0
+
+    def drain(self) -> Iterator[Any]:
+        """Yield every row added so far, chunks in reverse order, and reset."""
+        chunks, offsets = self._chunks, self._offsets
+        self._chunks, self._rows, self._offsets = [], 0, []
+        for chunk in reversed(chunks):
+            yield from chunk
+        for off in reversed(offsets):
+            self._file.seek(off)
+            yield from pickle.load(self._file)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TopK:
+    """Keep the `k` rows with the largest `key`, in O(k) memory.
+
+    `rows()` returns exactly ``sorted(pushed, key=key, reverse=True)[:k]``:
+    among equal keys, earlier rows win, as with a stable sort.
+    """
+
+    def __init__(self, k: int, key: Callable[[Any], Any]):
+        if k <= 0:
+            raise ValueError("k must be positive")
+        self.k = k
+        self.key = key
+        self._heap: List[Any] = []
+        self._seen = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def threshold(self) -> Optional[Any]:
+        """Key of the weakest kept row once `k` rows are held, else None.
+
+        A new row only gets in with a key strictly greater than this.
+        """
+        return self._heap[0][0] if len(self._heap) >= self.k else None
+
+    def push(self, row: Any) -> bool:
+        """Offer a row; returns whether it is (for now) among the best `k`."""
+        # later rows rank below earlier rows with the same key
+        item = (self.key(row), -self._seen, row)
+        self._seen += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+            return True
+        if item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+            return True
+        return False
+
+    def rows(self) -> List[Any]:
+        return [item[2] for item in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
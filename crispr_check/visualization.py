@@ -1,16 +1,16 @@
 def print_summary_statistics(csv_path):
     """
-    Print summary statistics (mean, median, std, min, max) for efficiency/score columns in a results CSV.
+    Print summary statistics (mean, median, std, min, max) for efficiency/score columns in a results file.
     Args:
-        csv_path (str): Path to the results CSV file.
+        csv_path (str): Path to the results file (CSV, TSV.gz, Parquet or Arrow).
     """
-    import pandas as pd
-    df = pd.read_csv(csv_path)
-    # Find columns with efficiency or score
-    eff_cols = [col for col in df.columns if 'eff' in col.lower() or 'score' in col.lower()]
+    from .hits import read_results, result_columns
+    # Find columns with efficiency or score; only those are loaded
+    eff_cols = [col for col in result_columns(csv_path) if 'eff' in col.lower() or 'score' in col.lower()]
     if not eff_cols:
         print("No efficiency or score columns found in results CSV.")
         return
+    df = read_results(csv_path, columns=eff_cols)
     for col in eff_cols:
         print(f"\nSummary statistics for '{col}':")
         print(df[col].describe())
@@ -20,20 +20,20 @@ Visualization utilities for CRISPR results.
 
 def plot_efficiency(csv_path, output_path=None, show=False):
     """
-    Plot efficiency results from a CSV file.
+    Plot efficiency results from a results file.
     Args:
-        csv_path (str): Path to the results CSV file.
+        csv_path (str): Path to the results file (CSV, TSV.gz, Parquet or Arrow).
         output_path (str, optional): Path to save the plot image. If None, does not save.
         show (bool): Whether to display the plot interactively.
     """
     import matplotlib.pyplot as plt
-    import pandas as pd
-    df = pd.read_csv(csv_path)
+    from .hits import read_results, result_columns
     # Try to find a column with efficiency or score
-    eff_cols = [col for col in df.columns if 'eff' in col.lower() or 'score' in col.lower()]
+    eff_cols = [col for col in result_columns(csv_path) if 'eff' in col.lower() or 'score' in col.lower()]
     if not eff_cols:
         raise ValueError("No efficiency or score column found in results CSV.")
     eff_col = eff_cols[0]
+    df = read_results(csv_path, columns=[eff_col])
     plt.figure(figsize=(8, 5))
     plt.hist(df[eff_col], bins=20, color='skyblue', edgecolor='black')
     plt.title(f'Efficiency Distribution ({eff_col})')
@@ -0,0 +1,52 @@
+import csv
+import os
+import tempfile
+from types import SimpleNamespace
+
+from crispr_check import cli, genome, search
+
+
+def test_batch_scan_matches_single_guide_scans():
+    here = os.path.dirname(__file__)
+    fasta = os.path.join(here, "data", "small.fa")
+    guides = {"g20": "GAGTCCGAGCAGAAGAAGA", "g18": "GAGTCCGAGCAGAAGAAG", "mut": "AAAGTCCGAGCAGAAGAAGA"}
+    hits = search.scan_fasta_for_guides(guides, fasta, pam="NGG", max_mismatches=2)
+    expected = []
+    for gid, g in guides.items():
+        for h in search.scan_fasta_for_guide(g, fasta, pam="NGG", max_mismatches=2):
+            expected.append(dict(h, guide_id=gid))
+    assert hits == expected
+
+
+def test_batch_seed_table_is_lossless():
+    # more guides than the brute-force threshold forces the seed-table path
+    guide = "GAGTCCGAGCAGAAGAAGAA"
+    bases = "ACGT"
+    guides = []
+    for i in range(3 * search._BRUTE_FORCE_GUIDES):
+        g = list(guide)
+        g[i % 20] = bases[(bases.index(g[i % 20]) + 1 + i // 20) % 4]
+        guides.append("".join(g))
+    with tempfile.TemporaryDirectory() as tmp:
+        fasta = os.path.join(tmp, "g.fa")
+        with open(fasta, "w") as fh:
+            fh.write(">a\n" + "TTTT" + guide + "TGG" + "CCA" + genome.reverse_complement(guide) + "AAAA\n")
+        hits = search.scan_fasta_for_guides(guides, fasta, max_mismatches=3)
+        expected = [dict(h, guide_id=g) for g in guides for h in search.scan_fasta_for_guide(g, fasta, max_mismatches=3)]
+        assert hits == expected
+        assert {h["strand"] for h in hits} == {"+", "-"}
+
+
+def test_cli_guides_file_adds_guide_id_column():
+    here = os.path.dirname(__file__)
+    fasta = os.path.join(here, "data", "small.fa")
+    with tempfile.TemporaryDirectory() as tmp:
+        guides_file = os.path.join(tmp, "guides.txt")
+        with open(guides_file, "w") as fh:
+            fh.write("# library\ng1 GAGTCCGAGCAGAAGAAGA\ng2,GAGTCCGAGCAGAAGAAG\n")
+        out = os.path.join(tmp, "out.csv")
+        args = SimpleNamespace(guide=None, guides_file=guides_file, pam="NGG", fasta=fasta, out=out, max_mismatches=1, score_method="pw", pretty=False)
+        cli.search_command(args)
+        with open(out, newline="") as fh:
+            rows = list(csv.DictReader(fh))
+    assert {r["guide_id"] for r in rows} == {"g1", "g2"}
@@ -0,0 +1,29 @@
+from benchmarks import compare, run, synth
+from crispr_check import search
+
+
+def test_synthetic_genome_plants_findable_off_targets(tmp_path):
+    path = str(tmp_path / "g.fa")
+    manifest = synth.write_genome(path, 200_000, seed=3, repeat_fraction=0.3, planted_per_mb=200, contig_size=120_000)
+    assert len(manifest["planted"]) == 40
+    assert {p["seq_id"] for p in manifest["planted"]} == {"chr1", "chr2"}
+    hits = search.scan_fasta_for_guide(manifest["guide"], path, max_mismatches=4)
+    found = {(h["seq_id"], h["start"], h["strand"], h["mismatches"]) for h in hits}
+    assert all((p["seq_id"], p["start"], p["strand"], p["mismatches"]) in found for p in manifest["planted"])
+
+    again = str(tmp_path / "again.fa")
+    assert synth.write_genome(again, 200_000, seed=3, repeat_fraction=0.3, planted_per_mb=200, contig_size=120_000) == manifest
+    with open(path, "rb") as a, open(again, "rb") as b:
+        assert a.read() == b.read()
+    assert synth.parse_size("1G") == 10**9 and synth.format_size(10**7) == "10M"
+
+
+def test_score_case_and_compare_flags_regressions():
+    result = run._rates(run.run_case({"kind": "score", "scorer": "mit", "scalar": False, "seed": 0}))
+    assert result["hits"] == run.SCORE_TARGETS and result["hits_per_second"] > 0
+
+    baseline = {"results": {"scan/1M": {"bp_per_second": 100.0, "hits_per_second": 10.0, "peak_rss_bytes": 1000, "planted_recall": 1.0}}}
+    same = {"results": {"scan/1M": {"bp_per_second": 95.0, "hits_per_second": 9.5, "peak_rss_bytes": 1100, "planted_recall": 1.0}, "cli/1M": {"bp_per_second": 1.0, "hits_per_second": 1.0}}}
+    assert compare.compare(baseline, same, tolerance=0.1) == []
+    worse = {"results": {"scan/1M": {"bp_per_second": 80.0, "hits_per_second": 10.0, "peak_rss_bytes": 2000, "planted_recall": 0.9}}}
+    assert {m for _, m, _, _ in compare.compare(baseline, worse, tolerance=0.1)} == {"bp_per_second", "peak_rss_bytes", "planted_recall"}
@@ -0,0 +1,55 @@
+import os
+import random
+import tempfile
+
+import numpy as np
+
+from crispr_check import bulges, genome, search
+
+
+def _naive_anchored(pattern, text):
+    D = list(range(len(pattern) + 1))
+    out = []
+    for j, c in enumerate(text):
+        row = [j + 1]
+        for i in range(1, len(pattern) + 1):
+            row.append(min(D[i] + 1, row[i - 1] + 1, D[i - 1] + (pattern[i - 1] != c)))
+        D = row
+        out.append(D[-1])
+    return out
+
+
+def test_anchored_distances_match_dynamic_programming():
+    rng = random.Random(1)
+    for _ in range(100):
+        pattern = "".join(rng.choice("ACGT") for _ in range(rng.randint(1, bulges.MAX_GUIDE_LEN)))
+        text = "".join(rng.choice("ACGT") for _ in range(rng.randint(1, 70)))
+        codes = genome.CODE[np.frombuffer(text.encode("ascii"), dtype=np.uint8)][None, :]
+        got = bulges.anchored_distances(bulges._pattern_masks(pattern), len(pattern), codes)
+        assert got[0].tolist() == _naive_anchored(pattern, text)
+
+
+def test_planted_bulges_are_found_on_both_strands():
+    guide = "GAGTCCGAGCAGAAGAAGAA"
+    dna = guide[:10] + "T" + guide[10:]
+    rna = guide[:7] + guide[8:]
+    rng = random.Random(2)
+
+    def filler(n):
+        return "".join(rng.choice("AT") for _ in range(n))
+
+    seq = filler(30) + dna + "TGG" + filler(30) + genome.reverse_complement(rna + "AGG") + filler(30)
+    with tempfile.TemporaryDirectory() as tmp:
+        fasta = os.path.join(tmp, "g.fa")
+        with open(fasta, "w") as fh:
+            fh.write(">chr\n" + seq + "\n")
+        assert search.scan_fasta_for_guide(guide, fasta, max_mismatches=0) == []
+        hits = search.scan_fasta_for_guide(guide, fasta, max_mismatches=0, max_dna_bulges=1, max_rna_bulges=1, chunk_size=25)
+        batch = search.scan_fasta_for_guides({"g": guide}, fasta, max_mismatches=0, max_dna_bulges=1, max_rna_bulges=1, chunk_size=25)
+    assert batch == [dict(h, guide_id="g") for h in hits]
+    assert [(h["strand"], h["target_seq"], h["dna_bulges"], h["rna_bulges"], h["mismatches"]) for h in hits] == [("+", dna, 1, 0, 0), ("-", rna, 0, 1, 0)]
+    plus, minus = hits
+    assert plus["start"] == 30 and plus["end"] == 30 + len(dna) - 1
+    assert plus["aligned_guide"].replace("-", "") == guide and plus["aligned_target"] == dna
+    assert minus["aligned_guide"] == guide and minus["aligned_target"].replace("-", "") == rna
+    assert bulges.paired_target(minus["aligned_guide"], minus["aligned_target"]).count("-") == 1
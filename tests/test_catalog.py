@@ -0,0 +1,47 @@
+import os
+import shutil
+
+import pytest
+
+from crispr_check import catalog, search
+
+
+def _fasta(tmp_path):
+    here = os.path.dirname(__file__)
+    path = tmp_path / "multi.fa"
+    shutil.copy(os.path.join(here, "multi.fa"), path)
+    return str(path)
+
+
+def test_catalog_search_matches_pam_enumeration(tmp_path):
+    fasta = _fasta(tmp_path)
+    cat_path = str(tmp_path / "ngg.cat")
+    cat = catalog.build_catalog(fasta, cat_path, pam="NGG")
+    loaded = catalog.load_catalog(cat_path, fasta_path=fasta, pam="NGG")
+    assert len(loaded) == len(cat) > 0
+    for rec in loaded.records:
+        plus, minus = loaded.sites(rec["id"])
+        assert (plus[1:] > plus[:-1]).all() and (minus[1:] > minus[:-1]).all()
+
+    guides = ["GAGTCCGAGCAGAAGAAGA", "ACGTTGCAAGGCTTAACGTA"]
+    for chunk_size in (7, search.DEFAULT_CHUNK_SIZE):
+        expected = search.scan_fasta_for_guides(guides, fasta, pam="NGG", max_mismatches=4, chunk_size=chunk_size)
+        assert search.scan_fasta_for_guides(guides, fasta, pam="NGG", max_mismatches=4, chunk_size=chunk_size, catalog=loaded) == expected
+    with pytest.raises(ValueError):
+        search.scan_fasta_for_guide(guides[0], fasta, pam="NAG", catalog=loaded)
+
+
+def test_catalog_is_invalidated_when_fasta_or_pam_changes(tmp_path):
+    fasta = _fasta(tmp_path)
+    cat_path = str(tmp_path / "ngg.cat")
+    catalog.build_catalog(fasta, cat_path, pam="NGG")
+    with pytest.raises(catalog.StaleCatalogError):
+        catalog.load_catalog(cat_path, fasta_path=fasta, pam="NRG")
+
+    with open(fasta, "a") as fh:
+        fh.write(">extra\nACGTACGTACGTACGTACGTAGG\n")
+    with pytest.raises(catalog.StaleCatalogError):
+        catalog.load_catalog(cat_path, fasta_path=fasta)
+    cat, built = catalog.ensure_catalog(cat_path, fasta, pam="NGG")
+    assert built and "extra" in cat
+    assert catalog.ensure_catalog(cat_path, fasta, pam="NGG")[1] is False
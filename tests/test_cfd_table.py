@@ -14,3 +14,49 @@ def test_cfd_table_loader_and_usage():
     # Using a table should produce a defined score and differ from fallback
     assert 0 <= s_table <= 100
     assert s_table != s_fallback
+
+
+def test_compiled_table_is_cached_and_matches_dict_scoring(tmp_path):
+    here = os.path.dirname(__file__)
+    src = os.path.join(here, "data", "cfd_small.json")
+    path = tmp_path / "cfd.json"
+    path.write_text(open(src).read())
+    table = scoring.load_compiled_cfd_table(str(path))
+    assert scoring.load_compiled_cfd_table(str(path)) is table
+    assert table.penalties.shape == (19, 4, 4)
+
+    guide = "GAGTCCGAGCAGAAGAAGA"
+    targets = ["AAGTCCGAGCAGAAGAAGA", "GAGTCCGAGCAGAAGAAGT", guide]
+    as_dict = scoring.load_cfd_table(str(path))
+    expected = [scoring.cfd_score_with_table(guide, t, as_dict) for t in targets]
+    assert scoring.score_batch(guide, targets, "cfd_full", table=table).tolist() == expected
+
+    # a compiled sidecar is picked up, and an edited table is re-read
+    sidecar = scoring.save_cfd_sidecar(str(path))
+    scoring.clear_cfd_table_cache()
+    from_npz = scoring.load_compiled_cfd_table(str(path))
+    assert from_npz.as_dict() == as_dict and (from_npz.penalties == table.penalties).all()
+    os.remove(sidecar)
+    path.write_text(open(src).read().replace('"A>G": 0.6', '"A>G": 0.1'))
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+    assert scoring.load_compiled_cfd_table(str(path)).sub_weights[("A", "G")] == 0.1
+
+
+def test_cli_cfd_full_uses_cfd_table(tmp_path):
+    import csv
+    from types import SimpleNamespace
+
+    from crispr_check import cli
+
+    here = os.path.dirname(__file__)
+    table_path = os.path.join(here, "data", "cfd_small.json")
+    guide = "GAGTCCGAGCAGAAGAAGA"
+    out = tmp_path / "out.csv"
+    args = SimpleNamespace(guide=guide, pam="NGG", fasta=os.path.join(here, "data", "small.fa"), out=str(out), max_mismatches=4, score_method="cfd_full", cfd_table=table_path, pretty=False)
+    cli.search_command(args)
+    with open(out, newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    table = scoring.load_cfd_table(table_path)
+    assert rows
+    for r in rows:
+        assert float(r["score"]) == scoring.cfd_score_with_table(guide, r["target_seq"], table)
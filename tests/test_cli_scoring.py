@@ -47,3 +47,46 @@ def test_cli_scores_cfd():
         target = r["target_seq"]
         expected = scoring.cfd_score(guide, target, pam="NGG")
         assert abs(float(r["score"]) - expected) < 1e-6
+
+
+def test_cli_extra_score_columns():
+    here = os.path.dirname(__file__)
+    guide = "GAGTCCGAGCAGAAGAAGA"
+    with tempfile.NamedTemporaryFile("w+", delete=False, suffix=".csv") as tmp:
+        out = tmp.name
+    args = SimpleNamespace(guide=guide, pam="NGG", fasta=os.path.join(here, "data", "small.fa"), out=out, max_mismatches=4, score_method="pw", scores="mit,cfd_full", pretty=False)
+    cli.search_command(args)
+    with open(out, newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    assert rows and "score_cfd" not in rows[0]
+    for r in rows:
+        assert float(r["score_mit"]) == scoring.mit_like_score(guide, r["target_seq"])
+        assert float(r["score_cfd_full"]) == scoring.cfd_score_full(guide, r["target_seq"])
+
+
+def test_registered_scalar_scorer_runs_per_target():
+    scorer = scoring.register_scorer("test_len", lambda guide, target: float(len(target)))
+    try:
+        assert not scorer.supports_batch and scoring.get_scorer("pw").supports_batch
+        columns = scoring.score_columns("ACGT", ["ACGT", "ACGA"], ["test_len", "pw"])
+        assert columns == {"test_len": [4.0, 4.0], "pw": [100.0, scoring.position_weighted_score("ACGT", "ACGA")]}
+    finally:
+        del scoring.SCORERS["test_len"]
+
+
+def test_cli_top_and_min_score_match_truncated_full_sort(tmp_path):
+    here = os.path.dirname(__file__)
+    guide = "GAGTCCGAGCAGAAGAAGA"
+
+    def run(**opts):
+        out = tmp_path / "out.csv"
+        args = SimpleNamespace(guide=guide, pam="NGG", fasta=os.path.join(here, "data", "small.fa"), out=str(out), max_mismatches=6, score_method="cfd", pretty=False, **opts)
+        cli.search_command(args)
+        with open(out, newline="") as fh:
+            return list(csv.DictReader(fh))
+
+    full = run()
+    assert len(full) >= 2
+    assert run(top=1) == full[:1]
+    cut = float(full[0]["score"])
+    assert run(min_score=cut) == [r for r in full if float(r["score"]) >= cut]
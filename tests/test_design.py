@@ -0,0 +1,47 @@
+import csv
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from crispr_check import cli, design, index, scoring, search
+
+SMALL = os.path.join(os.path.dirname(__file__), "data", "small.fa")
+
+
+def test_parse_region():
+    assert design.parse_region("chr1:1,001-2,000") == ("chr1", 1000, 2000)
+    for bad in ("chr1", "chr1:0-10", "chr1:20-10"):
+        with pytest.raises(ValueError):
+            design.parse_region(bad)
+
+
+def test_enumerated_guides_hit_their_own_site():
+    guides = design.enumerate_guides(design.region_sequence(SMALL, "chr1_exact", 0, 42), "chr1_exact")
+    assert {g["strand"] for g in guides} == {"+", "-"}
+    for g in guides:
+        own = [(h["seq_id"], h["start"], h["strand"]) for h in search.scan_fasta_for_guide(g["guide_seq"], SMALL, max_mismatches=0)]
+        assert (g["seq_id"], g["start"], g["strand"]) in own
+        assert search._matches_pam(g["pam_seq"])
+
+
+def test_design_scores_off_targets_and_matches_index(tmp_path):
+    rows = design.design_guides(SMALL, "chr1_exact:1-42", max_mismatches=4)
+    assert rows
+    for r in rows:
+        hits = [h for h in search.scan_fasta_for_guide(r["guide_seq"], SMALL, max_mismatches=4) if (h["seq_id"], h["start"], h["strand"]) != (r["seq_id"], r["start"], r["strand"])]
+        assert r["off_targets"] == len(hits) == sum(r[f"mm{m}"] for m in range(5))
+        columns = scoring.score_columns(r["guide_seq"], [h["target_seq"] for h in hits], ["mit", "cfd"], pam="NGG")
+        assert r["mit_specificity"] == pytest.approx(scoring.guide_specificity(sum(columns["mit"])))
+        assert r["cfd_sum"] == pytest.approx(sum(columns["cfd"]))
+
+    index.build_index(SMALL, str(tmp_path / "idx"))
+    assert design.design_guides(index.load_index(str(tmp_path / "idx")), "chr1_exact:1-42", max_mismatches=4) == rows
+
+    out = str(tmp_path / "design.csv")
+    args = SimpleNamespace(region="chr1_exact:1-42", fasta=SMALL, index=None, catalog=None, pam="NGG", guide_length=20, max_mismatches=4, workers=1, cfd_table=None, sort_by="mit_specificity", out=out, format=None, pretty=False)
+    cli.design_command(args)
+    with open(out, newline="") as fh:
+        written = list(csv.DictReader(fh))
+    assert [w["guide_id"] for w in written] == [r["guide_id"] for r in design.rank(rows)]
+    assert float(written[0]["mit_specificity"]) >= float(written[-1]["mit_specificity"])
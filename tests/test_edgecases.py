@@ -89,3 +89,14 @@ def test_multiple_nearby_hits():
 
     hits = search.scan_fasta_for_guide(guide, tmp, pam="NGG", max_mismatches=0)
     assert len(hits) >= 2
+
+
+def test_parallel_chunked_scan_matches_serial():
+    here = os.path.dirname(__file__)
+    fasta = os.path.join(here, "data", "small.fa")
+    guide = "GAGTCCGAGCAGAAGAAGA"
+    serial = search.scan_fasta_for_guide(guide, fasta, pam="NGG", max_mismatches=4)
+    # tiny chunks put chunk boundaries inside targets and PAMs
+    for chunk_size in (1, 7, 25):
+        assert search.scan_fasta_for_guide(guide, fasta, pam="NGG", max_mismatches=4, chunk_size=chunk_size) == serial
+    assert search.scan_fasta_for_guide(guide, fasta, pam="NGG", max_mismatches=4, workers=2, chunk_size=7) == serial
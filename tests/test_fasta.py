@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+import pytest
+
+from crispr_check import fasta, search
+
+
+def _write(path, text):
+    with open(path, "w", newline="") as fh:
+        fh.write(text)
+
+
+def test_fai_views_handle_line_wrapping():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "wrapped.fa")
+        _write(path, ">a desc\nACGTACGTAC\nGTTTACGTAA\nCCG\n>b\r\nGGGG\r\nTT\r\n")
+        with fasta.FastaFile(path) as fa:
+            assert [(e.name, e.length) for e in fa.entries] == [("a", 23), ("b", 6)]
+            assert fa.fetch("a") == "ACGTACGTACGTTTACGTAACCG"
+            assert fa.fetch("a", 8, 21) == "ACGTTTACGTAAC"
+            assert fa.fetch("b", 3) == "GTT"
+        # the index is written next to the FASTA and reused
+        assert fasta.read_fai(path + ".fai") == fasta.build_fai(path)
+
+
+def test_ragged_fasta_is_not_indexable_but_still_scans():
+    guide = "GAGTCCGAGCAGAAGAAGA"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ragged.fa")
+        _write(path, ">r\nAAAAAAAAAAGAGTCC\nGAGCAGAAGAAGAAGGAAAAAAAAAA\nAAA\n")
+        with pytest.raises(fasta.FaiError):
+            fasta.build_fai(path)
+        wrapped = os.path.join(tmp, "wrapped.fa")
+        _write(wrapped, ">r\nAAAAAAAAAAGAGTCC\nGAGCAGAAGAAGAAGG\nAAAAAAAAAAAAA\n")
+        ragged_hits = search.scan_fasta_for_guide(guide, path, max_mismatches=1, chunk_size=8)
+        wrapped_hits = search.scan_fasta_for_guide(guide, wrapped, max_mismatches=1, chunk_size=8)
+        assert ragged_hits == wrapped_hits
+        assert any(h["mismatches"] == 0 for h in wrapped_hits)
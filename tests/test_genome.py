@@ -0,0 +1,50 @@
+from crispr_check import genome, search
+
+
+def test_packed_sequence_round_trip_with_ambiguity():
+    seq = "ACGTNNNNRACGTTGCAYGATTACAN"
+    packed = genome.PackedSequence.from_text("chr", seq)
+    assert len(packed.packed) == (len(seq) + 3) // 4
+    assert packed.text() == seq
+    assert packed.text(3, 11) == seq[3:11]
+    assert packed.is_ambiguous([0, 5, 9, 16], 4).tolist() == [False, True, False, True]
+
+
+def test_packed_builder_matches_packing_the_joined_text():
+    parts = ["ACG", "TNN", "NNRAC", "GTTGCAYG", "", "ATTACAN"]
+    builder = genome.PackedBuilder("chr")
+    for i, part in enumerate(parts):
+        builder.append(genome.PackedSequence.from_text("", part) if i % 2 else part)
+    built, joined = builder.finish(), genome.PackedSequence.from_text("chr", "".join(parts))
+    assert built.text() == joined.text() and built.length == joined.length
+    for field in ("packed", "amb_starts", "amb_ends", "amb_chars"):
+        assert getattr(built, field).tolist() == getattr(joined, field).tolist()
+
+
+def test_packed_mismatch_counts_match_hamming():
+    seq = "GAGTCCGAGCAGAAGAAGAAGGTTCTTCTTCTGCTCGGACTCAAAT"
+    guide = "GAGTCCGAGCAGAAGAAGAA"
+    packed = genome.PackedSequence.from_text("chr", seq)
+    starts = list(range(len(seq) - len(guide) + 1))
+    words, care, forced = genome.pack_guide(guide)
+    for reverse in (False, True):
+        counts = genome.count_mismatches(genome.window_words(packed, starts, len(guide), reverse=reverse), words, care, forced)
+        for s, c in zip(starts, counts):
+            target = seq[s : s + len(guide)]
+            if reverse:
+                target = genome.reverse_complement(target)
+            assert c == len(search._hamming_positions(guide, target))
+
+
+def test_lane_masks_and_early_exit_encoding():
+    guide = "GAGTCCGAGCAGAAGAAGAAGAGTCCGAGCAGAAGAA"  # spans two words
+    target = "GTGTCCGAGCAGAAGAAGAAGAGTCCGAGCAGAAGAT"
+    packed = genome.PackedSequence.from_text("chr", target)
+    words, care, _ = genome.pack_guide(guide)
+    lanes = genome.mismatch_lanes(genome.window_words(packed, [0], len(guide)), words, care)
+    mask = search._join_words(genome.lane_masks(lanes)[0])
+    expected = search._hamming_positions(guide, target)
+    assert search.mask_positions(mask) == expected
+    assert search._mismatch_mask(guide, target, 2) == mask
+    assert search._mismatch_mask(guide, target, 1) is None
+    assert search._substitutions(target, mask) == ord("T") | ord("T") << 8
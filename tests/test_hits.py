@@ -0,0 +1,83 @@
+import csv
+import gzip
+
+import pytest
+
+from crispr_check import hits, search
+
+FIELDS = ["guide_id", "seq_id", "start", "end", "strand", "target_seq", "mismatches", "mismatch_positions", "dna_bulges", "aligned_guide", "score", "score_mit"]
+
+
+def _rows():
+    rows = []
+    for i in range(50):
+        rows.append({
+            "guide_id": f"g{i % 3}",
+            "seq_id": "chr1" if i < 30 else "chr2",
+            "start": 1000 * i,
+            "end": 1000 * i + 19 + i % 2,
+            "strand": "+-"[i % 2],
+            "target_seq": "ACGT" * 5 + "A" * (i % 2),
+            "mismatches": i % 4,
+            "mismatch_positions": list(range(0, 3 * (i % 4), 3)),
+            "dna_bulges": i % 2,
+            "aligned_guide": "ACGTACGTAC-GTACGTACGT" if i % 2 else "ACGT" * 5,
+            "score": 100.0 / (i + 1),
+            "score_mit": i / 7,
+        })
+    return rows
+
+
+def test_hit_table_round_trips_rows_compactly():
+    rows = _rows()
+    table = hits.HitTable.from_rows(rows, FIELDS)
+    assert len(table) == 50
+    assert list(table) == rows
+    assert table.column("mismatch_positions")[3] == [0, 3, 6]
+    assert table.nbytes < 150 * len(rows)
+    assert list(hits.HitTable.from_rows([], FIELDS)) == []
+
+
+def test_delimited_formats(tmp_path):
+    rows = _rows()
+    out = str(tmp_path / "r.csv")
+    assert hits.write_hits(out, iter(rows), FIELDS, block_size=7) == 50
+    with open(out, newline="") as fh:
+        expected = [{k: str(v) for k, v in r.items()} for r in rows]
+        assert list(csv.DictReader(fh)) == expected
+    out = str(tmp_path / "r.tsv.gz")
+    assert hits.format_from_path(out) == "tsv.gz"
+    assert hits.write_hits(out, iter(rows), FIELDS, fmt="tsv.gz", block_size=7) == 50
+    with gzip.open(out, "rt", newline="") as fh:
+        got = list(csv.DictReader(fh, delimiter="\t"))
+    assert [r["mismatch_positions"] for r in got[:4]] == ["", "0", "0,3", "0,3,6"]
+    assert hits.result_columns(out) == FIELDS
+    with pytest.raises(ValueError):
+        hits.write_hits(out, rows, FIELDS, fmt="xlsx")
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_arrow_formats_keep_types(tmp_path, fmt):
+    pytest.importorskip("pyarrow")
+    pytest.importorskip("pandas")
+    rows = _rows()
+    out = str(tmp_path / f"r.{fmt}")
+    assert hits.format_from_path(out) == fmt
+    assert hits.write_hits(out, iter(rows), FIELDS, fmt=fmt, block_size=7) == 50
+    assert hits.result_columns(out) == FIELDS
+    df = hits.read_results(out)
+    assert df["start"].tolist() == [r["start"] for r in rows]
+    assert [list(p) for p in df["mismatch_positions"]] == [r["mismatch_positions"] for r in rows]
+    assert df["seq_id"].astype(str).tolist() == [r["seq_id"] for r in rows]
+    assert hits.read_results(out, columns=["score"]).columns.tolist() == ["score"]
+    empty = str(tmp_path / f"empty.{fmt}")
+    assert hits.write_hits(empty, [], FIELDS, fmt=fmt) == 0
+    assert hits.result_columns(empty) == FIELDS
+
+
+def test_scan_hits_round_trip(tmp_path):
+    fasta = tmp_path / "g.fa"
+    fasta.write_text(">chr\nTTGAGTCCGAGCAGAAGAAGAAGGTTTCCTTTCTTCTTCTGCTCGGACTCAA\n")
+    found = search.scan_fasta_for_guide("GAGTCCGAGCAGAAGAAGAA", str(fasta), max_mismatches=2, max_dna_bulges=1)
+    fields = list(found[0])
+    assert list(hits.HitTable.from_rows(found, fields)) == found
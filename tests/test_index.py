@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+from crispr_check import index, search
+
+
+def test_index_search_matches_scan():
+    here = os.path.dirname(__file__)
+    fasta = os.path.join(here, "data", "small.fa")
+    guide = "GAGTCCGAGCAGAAGAAGA"
+    with tempfile.TemporaryDirectory() as out:
+        index.build_index(fasta, out, pam="NGG", guide_length=len(guide), seed_length=8)
+        idx = index.load_index(out)
+        for k in range(0, 5):
+            assert idx.search(guide, max_mismatches=k) == search.scan_fasta_for_guide(guide, fasta, pam="NGG", max_mismatches=k)
+
+
+def test_index_finds_reverse_strand_hit():
+    guide = "GAGTCCGAGCAGAAGAAGAA"
+    comp = {"A": "T", "T": "A", "G": "C", "C": "G"}
+    rc_target = "".join(comp[c] for c in reversed(guide))
+    with tempfile.TemporaryDirectory() as tmp:
+        fasta = os.path.join(tmp, "rev.fa")
+        with open(fasta, "w") as fh:
+            fh.write(">rev\n" + "ACGTACGTAC" + "CCA" + rc_target + "TTTGACCA\n")
+        out = os.path.join(tmp, "idx")
+        index.build_index(fasta, out)
+        hits = index.load_index(out).search(guide, max_mismatches=1)
+        assert hits == search.scan_fasta_for_guide(guide, fasta, max_mismatches=1)
+        assert any(h["strand"] == "-" and h["target_seq"] == guide for h in hits)
+
+
+def test_index_rejects_other_guide_length():
+    here = os.path.dirname(__file__)
+    fasta = os.path.join(here, "data", "small.fa")
+    with tempfile.TemporaryDirectory() as out:
+        index.build_index(fasta, out, guide_length=20)
+        with __import__("pytest").raises(ValueError):
+            index.load_index(out).search("GAGTCCGAGCAGAAGAAGA")
+
+
+def test_index_is_checked_against_its_fasta(tmp_path):
+    fasta = tmp_path / "g.fa"
+    fasta.write_text(">g\nACGTACGTACCCAGAGTCCGAGCAGAAGAAGAATTTGACCA\n")
+    out = str(tmp_path / "idx")
+    index.build_index(str(fasta), out)
+    index.load_index(out, fasta_path=str(fasta))
+    # touched but unchanged: re-hashed and accepted
+    os.utime(fasta, ns=(0, 0))
+    index.load_index(out, fasta_path=str(fasta))
+    fasta.write_text(">g\nACGTACGTACCCAGAGTCCGAGCAGAAGAAGAATTTGACCT\n")
+    with __import__("pytest").raises(index.StaleIndexError):
+        index.load_index(out, fasta_path=str(fasta))
+    # without a FASTA the index loads as before
+    assert index.load_index(out).records[0]["id"] == "g"
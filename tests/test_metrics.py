@@ -0,0 +1,66 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from crispr_check import cli, metrics, search
+
+
+def test_scan_counters_and_metrics_hook():
+    fasta = os.path.join(os.path.dirname(__file__), "multi.fa")
+    guides = ["GAGTCCGAGCAGAAGAAGA", "ACGTTGCAAGGCTTAACGTA"]
+    seen = []
+
+    def hook(seq_id, counters):
+        seen.append((seq_id, counters))
+
+    search.add_metrics_hook(hook)
+    try:
+        for workers in (1, 2):
+            seen.clear()
+            stats = {}
+            found = search.scan_fasta_for_guides(guides, fasta, max_mismatches=4, workers=workers, chunk_size=7, stats=stats)
+            assert stats["hits"] == len(found) > 0
+            assert stats["verified"] == stats["candidates"] - stats["prefiltered"]
+            assert set(stats["stages"]) >= {"pam", "verify"}
+            assert [s for s, _ in seen] == list(stats["contigs"])
+            assert sum(c["hits"] for _, c in seen) == stats["hits"]
+            assert sum(c["bases"] for _, c in seen) == stats["bases"]
+            assert sum(c["windows"] for _, c in seen) == stats["windows"]
+        stats = {}
+        assert len(search.scan_fasta_for_guide(guides[0], fasta, max_mismatches=4, stats=stats)) == stats["hits"]
+        assert stats["pam_sites"] > 0 and stats["windows"] > 0
+    finally:
+        search.remove_metrics_hook(hook)
+
+
+def test_profiler_charges_time_exclusively():
+    profiler = metrics.Profiler()
+    profiler.start()
+
+    def slow(n):
+        for i in range(n):
+            time.sleep(0.01)
+            yield i
+
+    with profiler.stage("writing"):
+        assert list(profiler.iterate("scan", slow(5))) == list(range(5))
+    profiler.stop()
+    report = profiler.report({"bases": 100, "hits": 5})
+    assert list(report["stages"]) == ["setup", "scan", "writing"]
+    assert report["stages"]["scan"]["wall_seconds"] >= 0.05 > report["stages"]["writing"]["wall_seconds"]
+    assert report["counters"]["hits"] == 5
+    assert metrics.Profiler(enabled=False).iterate("scan", [1]) == [1]
+
+
+def test_cli_metrics_json(tmp_path):
+    fasta = os.path.join(os.path.dirname(__file__), "data", "small.fa")
+    path = str(tmp_path / "metrics.json")
+    args = SimpleNamespace(guide="GAGTCCGAGCAGAAGAAGA", pam="NGG", fasta=fasta, out=str(tmp_path / "r.csv"), max_mismatches=4, score_method="pw", pretty=False, metrics_json=path)
+    cli.search_command(args)
+    with open(path) as fh:
+        report = json.load(fh)
+    assert set(report["stages"]) >= {"scan", "scoring", "sorting", "writing"}
+    assert report["counters"]["hits"] >= 1
+    assert all(st["peak_bytes"] > 0 for st in report["stages"].values())
+    assert report["contigs"]
@@ -0,0 +1,40 @@
+import pytest
+
+from crispr_check import search
+
+
+def test_iupac_pam_patterns():
+    assert search._matches_pam("AGG", "NRG")
+    assert search._matches_pam("TAG", "NRG")
+    assert not search._matches_pam("TCG", "NRG")
+    assert search._matches_pam("TTTA", "TTTV")
+    assert not search._matches_pam("TTTT", "TTTV")
+    assert search._matches_pam("CAGAAT", "NNGRRT")
+
+
+def test_compiled_pam_sites_on_both_strands():
+    #           0123456789012
+    seq = "CCATTTAGGTTTT"
+    plus, minus = search.compile_pam("NRG").sites(seq)
+    # plus: TAG at 5, AGG at 6; minus: CCA at 0 is the reverse complement of TGG
+    assert plus.tolist() == [5, 6]
+    assert minus.tolist() == [0]
+
+
+def test_vectorized_windows_match_scalar_pam_check():
+    seq = "ACGTTTAGGCATTTCCTAGGNACCGTTTCAAGGTACCCATTTG"
+    for pam in ("NGG", "NRG", "TTTV", "NNGRRT"):
+        for guide_len in (5, 18):
+            plus, _ = search.pam_windows(seq, guide_len, pam)
+            max_offset = search._max_pam_offset(guide_len)
+            expected = [
+                i
+                for i in range(len(seq) - guide_len - len(pam) + 1)
+                if any(search._matches_pam(seq[i + guide_len + off : i + guide_len + off + len(pam)], pam) for off in range(max_offset + 1))
+            ]
+            assert plus.tolist() == expected
+
+
+def test_invalid_pam_rejected():
+    with pytest.raises(ValueError):
+        search.compile_pam("NGX")
@@ -0,0 +1,149 @@
+import gzip
+import os
+import random
+import re
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
+from crispr_check import catalog, genome, index, readers, search
+
+
+def _write_bgzf(path, data, block=1000):
+    with open(path, "wb") as fh:
+        for i in range(0, len(data), block):
+            chunk = data[i : i + block]
+            comp = zlib.compressobj(6, zlib.DEFLATED, -15)
+            body = comp.compress(chunk) + comp.flush()
+            header = b"\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00" + struct.pack("<H", 18 + len(body) + 8 - 1)
+            fh.write(header + body + struct.pack("<II", zlib.crc32(chunk), len(chunk)))
+        # empty end-of-file block
+        fh.write(bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000"))
+
+
+def _write_2bit(path, records):
+    to_bits = {"T": 0, "C": 1, "A": 2, "G": 3}
+    index = b""
+    offset = 16 + sum(1 + len(name) + 4 for name, _ in records)
+    body = b""
+    for name, seq in records:
+        index += bytes([len(name)]) + name.encode("ascii") + struct.pack("<I", offset + len(body))
+        n_runs = [(m.start(), m.end() - m.start()) for m in re.finditer("N+", seq.upper())]
+        lower = [(m.start(), m.end() - m.start()) for m in re.finditer("[acgtn]+", seq)]
+        packed = bytearray()
+        for i in range(0, len(seq), 4):
+            byte = 0
+            for k, c in enumerate(seq[i : i + 4].upper().ljust(4, "T")):
+                byte |= to_bits.get(c, 0) << (6 - 2 * k)
+            packed.append(byte)
+        rec = struct.pack("<II", len(seq), len(n_runs))
+        rec += b"".join(struct.pack("<I", s) for s, _ in n_runs) + b"".join(struct.pack("<I", n) for _, n in n_runs)
+        rec += struct.pack("<I", len(lower)) + b"".join(struct.pack("<I", s) for s, _ in lower) + b"".join(struct.pack("<I", n) for _, n in lower)
+        rec += struct.pack("<I", 0) + bytes(packed)
+        body += rec
+    with open(path, "wb") as fh:
+        fh.write(struct.pack("<IIII", 0x1A412743, 0, len(records), 0) + index + body)
+
+
+def _genome(seed=4):
+    rng = random.Random(seed)
+    guide = "GAGTCCGAGCAGAAGAAGAA"
+    records = []
+    for r in range(3):
+        parts = []
+        for _ in range(40):
+            parts.append("".join(rng.choice("ACGT") for _ in range(rng.randint(20, 200))))
+            g = list(guide)
+            g[rng.randrange(20)] = rng.choice("ACGT")
+            parts.append("".join(g) + rng.choice(["AGG", "TGG", "CCT"]))
+            if rng.random() < 0.2:
+                parts.append("N" * rng.randint(1, 30))
+        seq = "".join(parts)
+        records.append((f"chr{r}", seq.lower() if r == 1 else seq))
+    return guide, records
+
+
+def _fasta_text(records, width=60):
+    return "".join(f">{name} description\n" + "".join(seq[i : i + width] + "\n" for i in range(0, len(seq), width)) for name, seq in records)
+
+
+def test_compressed_and_twobit_inputs_scan_like_plain_fasta():
+    guide, records = _genome()
+    text = _fasta_text(records).encode("ascii")
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = os.path.join(tmp, "g.fa")
+        with open(plain, "wb") as fh:
+            fh.write(text)
+        gz = os.path.join(tmp, "g.fa.gz")
+        with gzip.open(gz, "wb") as fh:
+            fh.write(text)
+        bgz = os.path.join(tmp, "g.bgz.fa.gz")
+        _write_bgzf(bgz, text)
+        twobit = os.path.join(tmp, "g.2bit")
+        _write_2bit(twobit, records)
+        assert [readers.detect_format(p) for p in (plain, gz, bgz, twobit)] == ["fasta", "gzip", "bgzf", "2bit"]
+        expected = search.scan_fasta_for_guide(guide, plain, max_mismatches=2, chunk_size=500)
+        assert len(expected) > 40
+        for path in (gz, bgz, twobit):
+            assert search.scan_fasta_for_guide(guide, path, max_mismatches=2, chunk_size=500) == expected
+            assert search.scan_fasta_for_guide(guide, path, max_mismatches=2, chunk_size=500, workers=2) == expected
+            assert search.scan_fasta_for_guides({"g": guide}, path, max_mismatches=2, chunk_size=500) == [dict(h, guide_id="g") for h in expected]
+        # the BGZF block index and .fai were saved for the next run
+        assert os.path.exists(bgz + ".gzi") and os.path.exists(bgz + ".fai")
+        assert search.scan_fasta_for_guide(guide, bgz, max_mismatches=2, chunk_size=500) == expected
+        cat = catalog.build_catalog(twobit, os.path.join(tmp, "g.cat"))
+        assert search.scan_fasta_for_guide(guide, twobit, max_mismatches=2, catalog=cat) == expected
+        index.build_index(twobit, os.path.join(tmp, "idx"))
+        assert index.load_index(os.path.join(tmp, "idx")).search(guide, 2) == expected
+
+
+def test_bgzf_and_twobit_random_access():
+    _, records = _genome(seed=9)
+    with tempfile.TemporaryDirectory() as tmp:
+        bgz = os.path.join(tmp, "g.fa.gz")
+        _write_bgzf(bgz, _fasta_text(records, width=50).encode("ascii"), block=333)
+        twobit = os.path.join(tmp, "g.2bit")
+        _write_2bit(twobit, records)
+        rng = random.Random(1)
+        with readers.BgzfFasta(bgz) as fa, readers.TwoBitFile(twobit) as tb:
+            for name, seq in records:
+                for _ in range(50):
+                    a = rng.randrange(len(seq))
+                    b = rng.randrange(a, len(seq) + 1)
+                    assert fa.fetch(name, a, b) == seq[a:b]
+                    packed = tb.packed(name, a, b)
+                    assert packed.text() == seq[a:b].upper()
+                    assert np.array_equal(packed.packed, genome.PackedSequence.from_text(name, seq[a:b].upper()).packed)
+
+
+def test_prefetch_propagates_errors_and_stops_early():
+    def items():
+        yield 1
+        yield 2
+        raise RuntimeError("boom")
+
+    it = readers.prefetch(items())
+    assert next(it) == 1 and next(it) == 2
+    try:
+        next(it)
+    except RuntimeError as e:
+        assert str(e) == "boom"
+    else:
+        raise AssertionError("error not propagated")
+    closed = []
+
+    def endless():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            closed.append(True)
+
+    it = readers.prefetch(endless())
+    assert [next(it) for _ in range(5)] == [0, 1, 2, 3, 4]
+    it.close()
+    assert closed == [True]
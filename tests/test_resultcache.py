@@ -0,0 +1,91 @@
+import os
+import random
+import shutil
+
+from crispr_check import resultcache, search
+
+
+def _fasta(tmp_path):
+    here = os.path.dirname(__file__)
+    path = tmp_path / "multi.fa"
+    shutil.copy(os.path.join(here, "multi.fa"), path)
+    return str(path)
+
+
+def test_cached_results_match_scan_and_derive_smaller_budgets(tmp_path, monkeypatch):
+    fasta = _fasta(tmp_path)
+    guides = {"a": "GAGTCCGAGCAGAAGAAGA", "b": "ACGTTGCAAGGCTTAACGTA", "c": "GAGTCCGAGCAGAAGAAGA"}
+    with resultcache.ResultCache(str(tmp_path / "cache")) as cache:
+        first = list(resultcache.iter_cached_hits(cache, guides, fasta, max_mismatches=4, max_dna_bulges=1))
+        assert first == list(search.iter_batch_hits(guides, fasta, max_mismatches=4, max_dna_bulges=1))
+        assert first and (cache.hits, cache.misses) == (0, 2)
+
+        # later queries with a budget of at most 4 never scan
+        def no_scan(*args, **kwargs):
+            raise AssertionError("scanned")
+
+        real_scan = search.iter_batch_hits
+        monkeypatch.setattr(search, "iter_batch_hits", no_scan)
+        assert list(resultcache.iter_cached_hits(cache, guides, fasta, max_mismatches=4, max_dna_bulges=1)) == first
+        for k in range(4):
+            expected = list(real_scan(guides, fasta, max_mismatches=k, max_dna_bulges=1))
+            assert list(resultcache.iter_cached_hits(cache, guides, fasta, max_mismatches=k, max_dna_bulges=1)) == expected
+        monkeypatch.setattr(search, "iter_batch_hits", real_scan)
+
+        # a larger budget rescans and is kept beside the smaller one
+        assert list(resultcache.iter_cached_hits(cache, {"a": guides["a"]}, fasta, max_mismatches=5, max_dna_bulges=1)) == list(search.iter_batch_hits({"a": guides["a"]}, fasta, max_mismatches=5, max_dna_bulges=1))
+        assert cache.stats()["entries"] == 3
+        # other bulge budgets, PAMs and genomes are separate entries
+        list(resultcache.iter_cached_hits(cache, guides, fasta, max_mismatches=4))
+        assert cache.stats()["entries"] == 5
+        with open(fasta, "a") as fh:
+            fh.write(">extra\nGAGTCCGAGCAGAAGAAGAAGG\n")
+        assert list(resultcache.iter_cached_hits(cache, guides, fasta, max_mismatches=4)) == list(search.iter_batch_hits(guides, fasta, max_mismatches=4))
+        assert cache.stats()["genomes"] == 2
+        assert cache.clear() == 7
+        assert cache.stats()["entries"] == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    fasta = _fasta(tmp_path)
+    with resultcache.ResultCache(str(tmp_path / "cache")) as cache:
+        checksum = cache.genome_checksum(fasta)
+        hits = [{"seq_id": "multi", "start": i, "mismatches": 0} for i in range(200)]
+        cache.put(checksum, "AAAA", "NGG", 2, hits)
+        size = cache.stats()["bytes"]
+        cache.max_bytes = 2 * size
+        cache.put(checksum, "CCCC", "NGG", 2, hits)
+        assert cache.get(checksum, "AAAA", "NGG", 2) == hits
+        cache.put(checksum, "GGGG", "NGG", 2, hits)
+        assert cache.stats()["entries"] == 2
+        assert cache.get(checksum, "CCCC", "NGG", 2) is None
+        assert cache.get(checksum, "AAAA", "NGG", 1) == hits
+
+
+def test_cold_scan_streams_into_blocks(tmp_path, monkeypatch):
+    guides = {"a": "GAGTCCGAGCAGAAGAAGA", "b": "ACGTTGCAAGGCTTAACGTA", "c": "GAGTCCGAGCAGAAGAAGA"}
+    # planted copies of the guides with a substitution each
+    rng = random.Random(7)
+    parts = []
+    for i in range(40):
+        g = list(guides["ab"[i % 2]])
+        g[rng.randrange(len(g))] = rng.choice("ACGT")
+        parts.append("".join(rng.choice("ACGT") for _ in range(15)) + "".join(g) + "TGG")
+    fasta = str(tmp_path / "planted.fa")
+    with open(fasta, "w") as fh:
+        fh.write(">one\n" + "".join(parts[:25]) + "\n>two\n" + "".join(parts[25:]) + "\n")
+    expected = list(search.iter_batch_hits(guides, fasta, max_mismatches=5))
+    monkeypatch.setattr(resultcache, "BLOCK_HITS", 3)
+    with resultcache.ResultCache(str(tmp_path / "cache")) as cache:
+        # a scan stopped early stores nothing
+        stream = resultcache.iter_cached_hits(cache, guides, fasta, max_mismatches=5)
+        assert next(stream) == expected[0]
+        stream.close()
+        assert cache.stats() == dict(cache.stats(), entries=0, bytes=0)
+
+        assert list(resultcache.iter_cached_hits(cache, guides, fasta, max_mismatches=5)) == expected
+        assert cache._db.execute("SELECT COUNT(*) FROM blocks").fetchone()[0] > 2
+        # half cached, half scanned
+        mixed = dict(guides, d="TTTTGCAAGGCTTAACGTAA")
+        assert list(resultcache.iter_cached_hits(cache, mixed, fasta, max_mismatches=5)) == list(search.iter_batch_hits(mixed, fasta, max_mismatches=5))
+        assert cache.hits == 2
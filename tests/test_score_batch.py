@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+
+from crispr_check import scoring
+
+
+def _random_targets(rng, guide, n):
+    return ["".join(c if rng.random() < 0.8 else rng.choice("ACGTN") for c in guide) for _ in range(n)]
+
+
+def test_score_batch_matches_scalar_scores_exactly():
+    rng = random.Random(0)
+    table = scoring.load_published_cfd()
+    for L in (19, 20):
+        guide = "".join(rng.choice("ACGT") for _ in range(L))
+        targets = _random_targets(rng, guide, 50)
+        encoded = scoring.encode_targets(targets)
+        for pam in ("NGG", "NRG"):
+            expected = {
+                "pw": [scoring.position_weighted_score(guide, t) for t in targets],
+                "mit": [scoring.mit_like_score(guide, t) for t in targets],
+                "cfd": [scoring.cfd_score(guide, t, pam=pam) for t in targets],
+                "cfd_full": [scoring.cfd_score_full(guide, t, pam=pam) for t in targets],
+            }
+            for method, values in expected.items():
+                got = scoring.score_batch(guide, encoded, method, pam=pam)
+                assert isinstance(got, np.ndarray)
+                assert got.tolist() == values
+            with_table = scoring.score_batch(guide, encoded, "cfd_full", table=table, pam=pam)
+            assert with_table.tolist() == [scoring.cfd_score_with_table(guide, t, table, pam=pam) for t in targets]
+
+
+def test_score_batch_accepts_strings_and_empty_input():
+    guide = "GAGTCCGAGCAGAAGAAGA"
+    assert scoring.score_batch(guide, ["aagtccgagcagaagaaga"], "pw").tolist() == [scoring.position_weighted_score(guide, "AAGTCCGAGCAGAAGAAGA")]
+    assert scoring.score_batch(guide, [], "mit").shape == (0,)
+
+
+def test_score_cache_counts_and_matches_uncached_scores():
+    guide = "GAGTCCGAGCAGAAGAAGA"
+    targets = ["AAGTCCGAGCAGAAGAAGA", guide, "AAGTCCGAGCAGAAGAAGA", "GAGTCCGAGCAGAAGAAGT"]
+    names = ["pw", "cfd"]
+    cache = scoring.ScoreCache(names, maxsize=2, pam="NRG")
+    expected = scoring.score_columns(guide, targets, names, pam="NRG")
+    assert cache.score(guide, targets) == expected
+    assert (cache.hits, cache.misses, len(cache)) == (1, 3, 2)
+    assert cache.score(guide, targets[-1:]) == {n: v[-1:] for n, v in expected.items()}
+    assert cache.info() == {"hits": 2, "misses": 3, "size": 2, "maxsize": 2}
+
+
+def test_score_bounds_cap_scores_by_mismatch_count():
+    rng = random.Random(2)
+    guide = "GAGTCCGAGCAGAAGAAGAA"
+    targets = _random_targets(rng, guide, 200)
+    counts = [sum(a != b for a, b in zip(guide, t)) for t in targets]
+    for method in scoring.SCORE_METHODS:
+        bounds = scoring.score_bounds(guide, len(guide), method, pam="NRG")
+        assert (np.diff(bounds) <= 0).all()
+        scores = scoring.score_batch(guide, targets, method, pam="NRG")
+        assert all(s <= bounds[m] for s, m in zip(scores, counts))
+    assert scoring.max_mismatches_for(scoring.score_bounds(guide, 4, "pw"), 99.6) == 0
+    assert scoring.max_mismatches_for(scoring.score_bounds(guide, 4, "pw"), 101.0) == -1
@@ -11,3 +11,20 @@ def test_scores_drop_with_mismatch():
     m_exact = scoring.mit_like_score(guide, exact)
     m_one = scoring.mit_like_score(guide, one_mismatch)
     assert m_exact > m_one
+
+
+def test_guide_summaries_merge_like_one_pass():
+    assert scoring.guide_specificity(0.0) == 100.0
+    assert scoring.guide_specificity(100.0) == 50.0
+    whole = scoring.GuideSummary(["mit"])
+    whole.add([0, 0, 2, 3], {"mit": [100.0, 100.0, 4.0, 1.0]}, [True, True, False, False])
+    left, right = scoring.GuideSummary(["mit"]), scoring.GuideSummary(["mit"])
+    left.add([0, 2], {"mit": [100.0, 4.0]}, [True, False])
+    right.add([0, 3], {"mit": [100.0, 1.0]}, [True, False])
+    row = left.merge(right).row(3)
+    assert row == whole.row(3)
+    # one perfect match is the on-target site
+    assert (row["hits"], row["off_targets"], row["mm0"], row["mm2"]) == (4, 3, 1, 1)
+    assert row["mit_sum"] == 105.0
+    assert row["mit_specificity"] == scoring.guide_specificity(105.0)
+    assert whole.row(3, exclude_on_target=False)["mit_sum"] == 205.0
@@ -13,3 +13,26 @@ def test_scan_fasta_for_guide_exact_and_one_mismatch():
     counts = sorted([h["mismatches"] for h in hits])
     assert 0 in counts
     assert 1 in counts
+
+
+def test_qgram_prefilter_is_lossless_and_counts_rejections():
+    import random
+    import tempfile
+
+    rng = random.Random(3)
+    seq = "".join(rng.choice("ACGT") for _ in range(3000)) + "NNACGT" + "".join(rng.choice("ACGTN") for _ in range(500))
+    guide = seq[100:120]
+    with tempfile.TemporaryDirectory() as tmp:
+        fasta = os.path.join(tmp, "g.fa")
+        with open(fasta, "w") as fh:
+            fh.write(">a\n" + seq + "\n")
+        expected = search.scan_fasta_for_guide(guide, fasta, max_mismatches=3, chunk_size=700)
+        guides = [guide, guide[::-1], "N" + guide[1:]] + [seq[s : s + 20] for s in range(200, 2000, 37)]
+        expected_batch = search.scan_fasta_for_guides(guides, fasta, max_mismatches=3, chunk_size=700)
+        for q in (1, 2, 3, 6):
+            stats = {}
+            assert search.scan_fasta_for_guide(guide, fasta, max_mismatches=3, chunk_size=700, prefilter_q=q, stats=stats) == expected
+            assert stats["candidates"] == stats["windows"] > 0
+            # with q = 6 the lemma gives no positive bound and nothing is filtered
+            assert (stats["prefiltered"] > 0) == (q < 6)
+            assert search.scan_fasta_for_guides(guides, fasta, max_mismatches=3, chunk_size=700, prefilter_q=q) == expected_batch
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from crispr_check import client, search, server
+
+GUIDES = ["GAGTCCGAGCAGAAGAAGA", "ACGTTGCAAGGCTTAACGTA"]
+
+
+@pytest.fixture
+def running_server():
+    fasta = os.path.join(os.path.dirname(__file__), "data", "small.fa")
+    srv = server.SearchServer({"small": fasta}, batch_window=0.2)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        listening = loop.run_until_complete(srv.start("127.0.0.1", 0))
+        srv.port = listening.sockets[0].getsockname()[1]
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    started.wait(10)
+    yield srv, fasta
+
+    async def shutdown():
+        srv.close()
+        handlers = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for t in handlers:
+            t.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    loop.close()
+
+
+def test_resident_genome_scans_like_its_file(tmp_path):
+    fasta = os.path.join(os.path.dirname(__file__), "multi.fa")
+    resident = search.ResidentGenome(fasta)
+    assert len(resident) == sum(r["length"] for r in resident.records)
+    expected = search.scan_fasta_for_guides(GUIDES, fasta, max_mismatches=4, max_dna_bulges=1)
+    assert search.scan_fasta_for_guides(GUIDES, resident, max_mismatches=4, max_dna_bulges=1, chunk_size=7) == expected
+    resident.save(str(tmp_path / "packed"))
+    mapped = search.ResidentGenome.load(str(tmp_path / "packed"))
+    assert isinstance(mapped.seq.packed, np.memmap)
+    assert search.scan_fasta_for_guides(GUIDES, mapped, max_mismatches=4, max_dna_bulges=1, chunk_size=7) == expected
+
+
+def test_server_search_score_health_and_coalescing(running_server):
+    srv, fasta = running_server
+    c = client.Client(f"http://127.0.0.1:{srv.port}")
+    health = c.health()
+    assert health["status"] == "ok" and health["genomes"]["small"]["kind"] == "fasta"
+    # the server maps the packed genome instead of holding its text
+    assert isinstance(srv.genomes["small"].seq.packed, np.memmap)
+
+    hits = c.search(GUIDES, fasta=fasta, scores=["mit"])
+    expected = search.scan_fasta_for_guides(GUIDES, fasta, max_mismatches=4)
+    assert [{k: v for k, v in h.items() if k != "score_mit"} for h in hits] == expected
+    assert all(0 <= h["score_mit"] <= 100 for h in hits)
+
+    # requests arriving together share one pass over the genome
+    replies = {}
+
+    def ask(i):
+        replies[i] = c.search({f"g{i}": GUIDES[i % 2]}, genome="small")
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for i, found in replies.items():
+        assert [{**h, "guide_id": GUIDES[i % 2]} for h in found] == [h for h in expected if h["guide_id"] == GUIDES[i % 2]]
+    m = c.metrics()
+    assert m["coalesced_requests"] == 7 and m["batches"] < 7
+
+    assert c.score(GUIDES[0], [GUIDES[0]], scores=["mit", "cfd"]) == {"mit": [100.0], "cfd": [100.0]}
+    with pytest.raises(ValueError):
+        c.search(GUIDES, genome="missing")
+    with pytest.raises(ValueError):
+        c.request("POST", "/search", {"guides": GUIDES, "scores": ["nope"]})
+
+
+def test_client_falls_back_to_in_process_search():
+    fasta = os.path.join(os.path.dirname(__file__), "data", "small.fa")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    c = client.Client(f"http://127.0.0.1:{port}")
+    assert c.health() is None
+    hits = c.search({"a": GUIDES[0]}, fasta=fasta, scores=["cfd"])
+    assert [{k: v for k, v in h.items() if k != "score_cfd"} for h in hits] == search.scan_fasta_for_guides({"a": GUIDES[0]}, fasta, max_mismatches=4)
+    assert c.score(GUIDES[0], [GUIDES[0]], scores=["mit"]) == {"mit": [100.0]}
+    with pytest.raises(client.ServerUnavailable):
+        c.search(GUIDES, fasta=fasta, fallback=False)
+
+
+def _raw_reply(port, request):
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as s:
+        s.sendall(request)
+        reply = b""
+        while True:
+            data = s.recv(4096)
+            if not data:
+                break
+            reply += data
+    return reply
+
+
+@pytest.mark.parametrize(
+    "request_bytes, status",
+    [
+        (b"POST /search HTTP/1.1\r\nContent-Length: abc\r\n\r\n", b"400"),
+        (b"POST /search HTTP/1.1\r\nContent-Length: -5\r\n\r\n", b"400"),
+        (b"GET /" + b"a" * 70000 + b" HTTP/1.1\r\n\r\n", b"400"),
+        (b"GET /health HTTP/1.1\r\nX-Big: " + b"a" * 70000 + b"\r\n\r\n", b"431"),
+        (b"GET /health HTTP/1.1\r\n" + b"X-Many: 1\r\n" * (server.MAX_HEADERS + 1) + b"\r\n", b"431"),
+    ],
+)
+def test_server_rejects_malformed_requests(running_server, request_bytes, status):
+    srv, _ = running_server
+    assert _raw_reply(srv.port, request_bytes).startswith(b"HTTP/1.1 " + status + b" ")
+    # the server keeps answering
+    assert client.Client(f"http://127.0.0.1:{srv.port}").health()["status"] == "ok"
+    assert not srv._tasks
+
+
+def test_server_accepts_up_to_max_headers(running_server):
+    srv, _ = running_server
+    request = b"GET /health HTTP/1.1\r\nConnection: close\r\n" + b"X-Many: 1\r\n" * (server.MAX_HEADERS - 1) + b"\r\n"
+    assert _raw_reply(srv.port, request).startswith(b"HTTP/1.1 200 ")
@@ -0,0 +1,46 @@
+import os
+import random
+import tempfile
+
+from crispr_check import search, sorting
+
+
+def test_external_sort_matches_stable_sort():
+    rng = random.Random(0)
+    rows = [{"score": rng.choice([10.0, 50.5, 99.0, 100.0]), "i": i} for i in range(257)]
+    expected = sorted(rows, key=lambda r: r["score"], reverse=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        got = list(sorting.external_sort(iter(rows), key=lambda r: r["score"], reverse=True, run_size=10, tmp_dir=tmp))
+        # spill files are cleaned up once the merge is done
+        assert os.listdir(tmp) == []
+    assert got == expected
+
+
+def test_iter_hits_streams_scan_results():
+    here = os.path.dirname(__file__)
+    fasta = os.path.join(here, "data", "small.fa")
+    guide = "GAGTCCGAGCAGAAGAAGA"
+    stream = search.iter_hits(guide, fasta, pam="NGG", max_mismatches=2)
+    assert not isinstance(stream, list)
+    assert list(stream) == search.scan_fasta_for_guide(guide, fasta, pam="NGG", max_mismatches=2)
+
+
+def test_reversed_chunks_replays_back_to_front_with_spill():
+    buf = sorting.ReversedChunks(max_rows=3)
+    for chunk in ([1, 2], [3], [], [4, 5, 6, 7], [8]):
+        buf.add(chunk)
+    assert list(buf.drain()) == [8, 4, 5, 6, 7, 3, 1, 2]
+    buf.add([9])
+    assert list(buf.drain()) == [9]
+
+
+def test_top_k_matches_sort_then_truncate():
+    rng = random.Random(1)
+    rows = [{"score": rng.choice([1.0, 2.0, 3.0, 4.0]), "i": i} for i in range(200)]
+    expected = sorted(rows, key=lambda r: r["score"], reverse=True)
+    for k in (1, 5, 37, 500):
+        top = sorting.TopK(k, key=lambda r: r["score"])
+        for r in rows:
+            top.push(r)
+        assert top.rows() == expected[:k]
+        assert len(top) == min(k, len(rows))
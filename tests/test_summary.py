@@ -0,0 +1,40 @@
+import csv
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from crispr_check import cli, scoring, search
+
+MULTI = os.path.join(os.path.dirname(__file__), "multi.fa")
+GUIDES = {"a": "GAGTCCGAGCAGAAGAAGA", "b": "ACGTTGCAAGGCTTAACGTA"}
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_summaries_match_summarized_hits(workers):
+    kwargs = dict(max_mismatches=4, max_dna_bulges=1, chunk_size=7)
+    expected = scoring.summarize_hits(search.iter_batch_hits(GUIDES, MULTI, **kwargs), GUIDES, ["mit", "cfd"], pam="NGG")
+    summaries = search.summarize_batch_hits(GUIDES, MULTI, workers=workers, **kwargs)
+    assert set(summaries) == set(GUIDES)
+    for gid in GUIDES:
+        got, want = summaries[gid].row(4), expected[gid].row(4)
+        assert got.keys() == want.keys()
+        for k in want:
+            assert got[k] == pytest.approx(want[k])
+
+
+def test_cli_summary_only_writes_one_row_per_guide(tmp_path):
+    guides = tmp_path / "guides.txt"
+    guides.write_text("".join(f"{gid}\t{g}\n" for gid, g in GUIDES.items()))
+    out = str(tmp_path / "summary.csv")
+    args = SimpleNamespace(guide=None, guides_file=str(guides), pam="NGG", fasta=MULTI, out=out, max_mismatches=4, summary_only=True, pretty=False)
+    cli.search_command(args)
+    with open(out, newline="") as fh:
+        rows = list(csv.DictReader(fh))
+    assert [r["guide_id"] for r in rows] == list(GUIDES)
+    summaries = search.summarize_batch_hits(GUIDES, MULTI, max_mismatches=4)
+    for r in rows:
+        want = summaries[r["guide_id"]].row(4)
+        assert int(r["hits"]) == want["hits"]
+        assert float(r["mit_specificity"]) == pytest.approx(want["mit_specificity"])
+        assert float(r["cfd_specificity"]) == pytest.approx(want["cfd_specificity"])